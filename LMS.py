@@ -2,20 +2,44 @@
 """
 Library Management System - CLI
 Uses JSON file for storage and provides CSV export.
+Optionally keeps mutations in an append-only write-ahead log (--storage wal),
+in an SQLite database (--storage sqlite) or in an mmap'd binary snapshot
+(--storage snapshot).
 No admin login required.
 """
 
-import json
-import csv
+import argparse
 import os
-from typing import List, Dict, Optional
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+
+from storage import (StorageBackend, FileLock, open_backend, migrate_json,
+                     DURABILITY_LEVELS, STORAGE_MODES, LOCK_SUFFIX)
+from search_index import TrigramIndex, FuzzyIndex, fuzzy_matches, normalize
+from indexes import default_indexes, run_query, matches_query, normalize_author, walk_sorted
+from query_cache import QueryCache
+from analytics import CatalogStats
+from sharded import ShardedSearch, THRESHOLD as SHARD_THRESHOLD
+from importer import ImportReport, IMPORT_POLICIES, iter_records, coerce_batch
+from export import ExportReport, write_csv, write_changes
+from changes import ChangeLog, changes_path
+from circulation import refuse_if_on_loan
+import instrumentation
 
 DATA_FILE = "books.json"
+SQLITE_FILE = "books.db"  # default --data-file for --storage sqlite
 EXPORT_FOLDER = "exports"
 EXPORT_FILE = os.path.join(EXPORT_FOLDER, "books.csv")
+CHANGES_EXPORT_FILE = os.path.join(EXPORT_FOLDER, "books_changes.csv")
 
 
 class Book:
+    __slots__ = ("isbn", "title", "author", "year", "copies")
+
     def __init__(self, isbn: str, title: str, author: str, year: int, copies: int = 1):
         self.isbn = isbn
         self.title = title
@@ -37,94 +61,694 @@ class Book:
         return Book(d["isbn"], d["title"], d["author"], d["year"], d.get("copies", 1))
 
 
+UPDATABLE_FIELDS = ("title", "author", "year", "copies")
+SORT_KEYS = ("title", "author", "year", "copies", "isbn")
+
+
+class Page:
+    """
+    One page of books, produced lazily while it is iterated (once).
+    Afterwards `cursor` resumes right after the last book yielded (pass it
+    back as cursor= for the next page) and `more` tells whether another
+    page follows. Cursors are opaque: a row count in catalog or ranked
+    order, the last (sort key, isbn) pair in sorted order.
+    """
+
+    def __init__(self, rows: Iterator[Tuple[object, Book]], page_size: Optional[int], cursor=None):
+        self._rows = rows
+        self.page_size = page_size
+        self.cursor = cursor
+        self.more = False
+
+    def __iter__(self) -> Iterator[Book]:
+        taken = 0
+        for cursor, book in self._rows:
+            if self.page_size is not None and taken >= self.page_size:
+                self.more = True
+                return
+            taken += 1
+            self.cursor = cursor
+            yield book
+
+
+class GroupCommit:
+    """
+    Background flusher for LibrarySystem(group_commit=window).
+
+    Writers apply their change in memory and then wait(). The flusher
+    sleeps for window seconds after the first waiting writer so that
+    changes from concurrent writers pile up, persists them all with one
+    commit and wakes every writer that commit covered.
+    """
+
+    def __init__(self, flush, window: float):
+        self.flush = flush
+        self.window = window
+        self.flushes = 0
+        self._cond = threading.Condition()
+        self._requested = 0  # tickets handed to waiting writers
+        self._done = 0       # tickets covered by a finished flush
+        self._failures: List = []  # (first, last, exception) of failed flushes
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def wait(self):
+        """Block until a flush that started after this call has finished; re-raise its error."""
+        with self._cond:
+            self._requested += 1
+            ticket = self._requested
+            self._cond.notify_all()
+            while self._done < ticket:
+                self._cond.wait()
+            for first, last, exc in self._failures:
+                if first <= ticket <= last:
+                    raise exc
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._requested == self._done and not self._closed:
+                    self._cond.wait()
+                if self._requested == self._done:
+                    return
+            if self.window:
+                time.sleep(self.window)
+            with self._cond:
+                first, last = self._done + 1, self._requested
+            error = None
+            try:
+                self.flush()
+            except Exception as e:
+                error = e
+            with self._cond:
+                self.flushes += 1
+                if error is not None:
+                    self._failures = self._failures[-15:] + [(first, last, error)]
+                self._done = last
+                self._cond.notify_all()
+
+    def close(self):
+        """Flush outstanding writers and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+
 class LibrarySystem:
-    def __init__(self, data_file: str = DATA_FILE):
+    """
+    Book catalog kept in memory and persisted through a storage backend.
+
+    storage="json" rewrites the whole file on every mutation.
+    storage="wal" appends each mutation to data_file + ".wal" and folds the
+    log into a fresh JSON snapshot every compact_every records.
+    storage="sqlite" keeps one row per book in an SQLite database.
+    storage="snapshot" memory-maps a binary snapshot for instant startup.
+    durability: every write reaches the OS before the file lock is released;
+    "fsync" also syncs each log append to disk, "flush" only the snapshots,
+    and "none" nothing (sqlite: synchronous FULL, NORMAL or OFF).
+    A ready-made StorageBackend can be passed as backend instead.
+    shards=N mirrors catalogs of shard_threshold books or more into N
+    worker processes that run substring searches in parallel (sharded.py).
+    track_changes=True numbers every committed change in a sidecar log
+    (books.changes.jsonl, see changes.py) so export_changes() can write
+    just the books changed since an earlier export's checkpoint.
+
+    Several processes may share one catalog: mutations take an exclusive
+    lock on data_file + ".lock" (loads a shared one) and first reload the
+    catalog if someone else committed since we last read it. Set
+    locking=False only when a single process owns the files.
+    group_commit=seconds makes the system safe to share between threads
+    that write concurrently: a background thread commits everything that
+    arrives within that window in one write (see GroupCommit).
+    columnar=True keeps the catalog in a ColumnarCatalog (columnar.py),
+    which uses far less memory per book but hands out slower field views.
+
+    Objects in self.listeners are told about every change through
+    on_change(old_book, new_book) (old is None for adds, new is None for
+    deletes) and about a freshly loaded catalog through on_reset(books).
+    Callables in self.delete_guards are called with a book before it is
+    deleted and may refuse the delete by raising (e.g. circulation.py for
+    books on loan); with none registered, a loan ledger found next to the
+    catalog is checked instead.
+    """
+
+    def __init__(self, data_file: str = DATA_FILE, storage: str = "json",
+                 durability: str = "flush", compact_every: int = 10000,
+                 backend: Optional[StorageBackend] = None, columnar: bool = False,
+                 locking: bool = True, group_commit: Optional[float] = None,
+                 shards: Optional[int] = None, shard_threshold: int = SHARD_THRESHOLD,
+                 track_changes: bool = False):
         self.data_file = data_file
-        self.books: Dict[str, Book] = {}
+        self.backend = backend or open_backend(storage, data_file, durability, compact_every)
+        self.storage = self.backend.name
+        if columnar:
+            from columnar import ColumnarCatalog
+            self.books = ColumnarCatalog()
+        else:
+            self.books: Dict[str, Book] = {}
+        self.search_index = TrigramIndex()
+        self.fuzzy_index = FuzzyIndex()  # ranked, typo-tolerant search; built on first use
+        self.indexes = default_indexes()  # sorted secondary indexes: year, copies, author, title, isbn
+        self.query_cache = QueryCache()  # results of search/find/list_books, dropped precisely on change
+        self.analytics = CatalogStats()  # running totals by author/year/decade; counted on first use
+        self.listeners: List = ([self.search_index, self.fuzzy_index] + list(self.indexes.values())
+                                + [self.query_cache, self.analytics])
+        # shards=N: substring scans of catalogs over shard_threshold run in N worker processes
+        self.sharded = ShardedSearch(shards, shard_threshold) if shards else None
+        if self.sharded is not None:
+            self.listeners.append(self.sharded)
+        # track_changes: change sequence numbers and tombstones for delta exports
+        self.changes = ChangeLog(changes_path(data_file), durability) if track_changes else None
+        if self.changes is not None:
+            self.listeners.append(self.changes)
+        self.delete_guards: List = []
+        self.lock = threading.RLock()  # guards the catalog against concurrent threads
+        self.file_lock = FileLock(data_file + LOCK_SUFFIX) if locking else None
+        self._write_depth = 0
+        self._changes = 0  # mutations recorded so far
+        self._ops: List = []  # deferred mode: changes not yet durable, replayed after a conflict
+        self.committer = GroupCommit(self.commit, group_commit) if group_commit is not None else None
+        self.autocommit = True  # False: mutations stay in memory until the owner calls commit()
         self.load()
 
-    def load(self):
-        if not os.path.exists(self.data_file):
-            self.save()  # create empty file
+    @contextmanager
+    def _file_locked(self, shared: bool = False):
+        """Hold the inter-process lock for the block (no-op if already held or locking is off)."""
+        if self.file_lock is None or self.file_lock.held:
+            yield
+            return
+        self.file_lock.acquire(shared)
         try:
-            with open(self.data_file, "r", encoding="utf-8") as f:
-                content = f.read()
-                data = json.loads(content) if content.strip() else {}
-        except (json.JSONDecodeError, FileNotFoundError):
-            data = {}
-        # If data is a list convert to dict keyed by isbn
-        if isinstance(data, list):
-            data = {b["isbn"]: b for b in data}
-        if isinstance(data, dict):
-            for isbn, b in data.items():
-                self.books[isbn] = Book.from_dict(b)
+            yield
+        finally:
+            self.file_lock.release()
+
+    def _read(self):
+        catalog = self.backend.open_catalog(Book.from_dict)
+        if catalog is not None:
+            self.books = catalog  # lazily decoded by the backend
+        else:
+            self.books.clear()
+            for op, isbn, b in self.backend.load():
+                if op == "put":
+                    self.books[isbn] = Book.from_dict(b)
+                else:
+                    self.books.pop(isbn, None)
+        self._signature = self.backend.signature()
+
+    def load(self):
+        with self.lock:
+            with self._file_locked(shared=True):
+                self._read()
+            if self.backend.needs_checkpoint:
+                with self._file_locked():
+                    self._read()  # again under the write lock, so the checkpoint cannot lose a concurrent change
+                    if self.backend.needs_checkpoint:
+                        self.save()
+            for listener in self.listeners:
+                listener.on_reset(self.books)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload when another process changed the store since we last read or
+        wrote it (checked via file mtime/size/inode). Returns True if reloaded.
+        """
+        with self.lock:
+            if self._write_depth or self._ops or self.backend.signature() == self._signature:
+                return False
+            self.load()
+            return True
+
+    def catch_up(self):
+        """
+        Pick up what other processes committed since we last read the
+        store (reload, or rebase pending changes). A caller holding
+        file_lock can run this on its own thread and then commit()
+        elsewhere, knowing the catalog will not be replaced in between.
+        """
+        with self.lock:
+            self._catch_up()
+
+    def _catch_up(self):
+        """Under the write lock: pick up what other processes committed since we last read the store."""
+        if self.backend.signature() == self._signature:
+            return
+        if self._ops:
+            self._rebase()
+        else:
+            self.load()
 
     def save(self):
-        os.makedirs(os.path.dirname(self.data_file) or ".", exist_ok=True)
-        with open(self.data_file, "w", encoding="utf-8") as f:
-            json.dump({isbn: book.to_dict() for isbn, book in self.books.items()}, f, indent=2)
+        """Write a full snapshot of the catalog."""
+        with self.lock, self._file_locked():
+            self._catch_up()
+            self._flush_changes()
+            self.backend.save_all(self.books)
+            self._ops = []
+            self._signature = self.backend.signature()
+
+    def compact(self):
+        """Fold logged changes into a fresh snapshot (wal) or checkpoint the database (sqlite)."""
+        with self.lock, self._file_locked():
+            self._catch_up()
+            self.backend.compact(self.books)
+            self._signature = self.backend.signature()
+
+    def close(self):
+        """Commit and checkpoint so other readers see a current snapshot."""
+        if self.committer is not None:
+            self.committer.close()
+        if self.sharded is not None:
+            self.sharded.close()
+        with self.lock, self._file_locked():
+            self._catch_up()
+            self._flush_changes()
+            self._ops = []
+            self.backend.close(self.books)
+
+    def _notify(self, old: Optional[Book], new: Optional[Book]):
+        for listener in self.listeners:
+            listener.on_change(old, new)
+
+    @property
+    def deferred(self) -> bool:
+        """True when commits happen later, off the mutating call (group commit or autocommit off)."""
+        return self.committer is not None or not self.autocommit
+
+    @property
+    def pending(self) -> int:
+        """Changes applied in memory but not yet committed (deferred mode only)."""
+        return len(self._ops)
+
+    def _persist(self, op: str, isbn: str, book: Optional[Book] = None):
+        rec = book.to_dict() if book else None
+        self.backend.record(op, isbn, rec)
+        self._changes += 1
+        if self.deferred:
+            self._ops.append((op, isbn, rec))
+
+    @contextmanager
+    def _write(self):
+        """
+        Scope of one mutation or batch. The outermost scope takes the
+        exclusive file lock, reloads if another process committed since we
+        last read the store (optimistic version check) and commits on exit.
+        In deferred mode the flusher (or the owner) locks and commits
+        instead; with group commit the writer waits until its change is
+        durable.
+        """
+        deferred = self.deferred
+        with self.lock:
+            outer = not self._write_depth
+            locked = outer and not deferred
+            changes = self._changes
+            with self._file_locked() if locked else nullcontext():
+                if locked:
+                    self.reload_if_changed()
+                self._write_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._write_depth -= 1
+                    if locked:
+                        self.commit()
+            wait = outer and self.committer is not None and self._changes != changes
+        if wait:
+            self.committer.wait()
+
+    @contextmanager
+    def batch(self):
+        """Hold back persistence inside the block and commit once at the end."""
+        with self._write():
+            yield self
+
+    def commit(self):
+        """Persist everything held back by batch() in one write."""
+        with self.lock, self._file_locked():
+            self._catch_up()
+            self._flush_changes()
+            self._ops = []
+            self.backend.commit(self.books)
+            self._signature = self.backend.signature()
+
+    def _flush_changes(self):
+        # number the changes before the data is durable: a crash in between
+        # repeats a change in the next delta instead of losing it
+        if self.changes is not None:
+            self.changes.flush()
+
+    def _rebase(self):
+        """Deferred-commit conflict: reload what other processes committed and replay our pending changes on top."""
+        ops = self._ops
+        self._read()
+        for op, isbn, rec in ops:
+            if op == "put":
+                self.books[isbn] = Book.from_dict(rec)
+            else:
+                self.books.pop(isbn, None)
+        for listener in self.listeners:
+            listener.on_reset(self.books)
 
     def add_book(self, book: Book) -> bool:
-        if book.isbn in self.books:
-            return False
-        self.books[book.isbn] = book
-        self.save()
-        return True
+        with self._write():
+            if book.isbn in self.books:
+                return False
+            self.books[book.isbn] = book
+            self._persist("put", book.isbn, book)
+            self._notify(None, book)
+            return True
+
+    def put_book(self, book: Book) -> bool:
+        """Insert book, or replace the stored record with the same isbn. Returns True if inserted."""
+        with self._write():
+            old = self.books.get(book.isbn)
+            if old is not None:
+                old = Book.from_dict(old.to_dict())  # the stored record may be a view that is about to change
+            self.books[book.isbn] = book
+            self._persist("put", book.isbn, book)
+            self._notify(old, book)
+            return old is None
+
+    def bulk_import(self, path: str, fmt: Optional[str] = None, policy: str = "insert",
+                    batch_size: int = 1000, commit_every: Optional[int] = None) -> ImportReport:
+        """
+        Stream records from a CSV or JSONL file into the catalog.
+
+        policy: "insert" rejects rows whose isbn already exists, "upsert"
+        replaces them and "skip" ignores them. Rows are validated
+        batch_size at a time; the catalog is committed every commit_every
+        rows (or once at the end when commit_every is None).
+        """
+        if policy not in IMPORT_POLICIES:
+            raise ValueError(f"policy must be one of {IMPORT_POLICIES}")
+        report = ImportReport()
+        start = time.perf_counter()
+        since_commit = 0
+
+        def apply(raw):
+            nonlocal since_commit
+            records, rejected = coerce_batch(raw)
+            report.rejected.extend(rejected)
+            for row_no, rec in records:
+                exists = rec["isbn"] in self.books
+                if exists and policy == "skip":
+                    report.skipped += 1
+                elif exists and policy == "insert":
+                    report.rejected.append((row_no, "duplicate isbn"))
+                elif self.put_book(Book.from_dict(rec)):
+                    report.inserted += 1
+                else:
+                    report.updated += 1
+            since_commit += len(raw)
+            if commit_every and since_commit >= commit_every:
+                since_commit = 0
+                self.commit()
+
+        with self.batch():
+            raw = []
+            for row_no, rec in iter_records(path, fmt):
+                report.rows += 1
+                raw.append((row_no, rec))
+                if len(raw) >= batch_size:
+                    apply(raw)
+                    raw = []
+            if raw:
+                apply(raw)
+        report.seconds = time.perf_counter() - start
+        return report
 
     def update_book(self, isbn: str, **kwargs) -> bool:
-        if isbn not in self.books:
-            return False
-        book = self.books[isbn]
-        for k, v in kwargs.items():
-            if hasattr(book, k) and v is not None:
-                setattr(book, k, int(v) if k in ("year", "copies") else v)
-        self.save()
-        return True
+        with self._write():
+            if isbn not in self.books:
+                return False
+            old = Book.from_dict(self.books[isbn].to_dict())  # a copy: columnar rows are views
+            fields = old.to_dict()
+            for k, v in kwargs.items():
+                # the isbn is the catalog key, so it cannot be changed in place
+                if k in UPDATABLE_FIELDS and v is not None:
+                    fields[k] = v
+            book = Book.from_dict(fields)  # a bad year or copies raises here, before anything changed
+            if book.to_dict() == old.to_dict():
+                return True  # nothing changed, nothing to write
+            self.books[isbn] = book
+            self._persist("put", isbn, book)
+            self._notify(old, book)
+            return True
 
     def delete_book(self, isbn: str) -> bool:
-        if isbn in self.books:
-            del self.books[isbn]
-            self.save()
+        with self._write():
+            if isbn not in self.books:
+                return False
+            if self.delete_guards:
+                for guard in self.delete_guards:
+                    guard(self.books[isbn])
+            else:
+                refuse_if_on_loan(self, self.books[isbn])  # no ledger open here: check the one on disk
+            book = self.books.pop(isbn)
+            self._persist("del", isbn)
+            self._notify(book, None)
             return True
-        return False
 
     def get_book(self, isbn: str) -> Optional[Book]:
         return self.books.get(isbn)
 
-    def search(self, query: str) -> List[Book]:
-        q = query.lower()
-        results = []
-        for book in self.books.values():
-            if q in book.title.lower() or q in book.author.lower() or q in book.isbn.lower():
-                results.append(book)
-        return results
+    def search(self, query: str, limit: Optional[int] = None, ranked: bool = False,
+               max_edits: int = 2, sort: Optional[str] = None, descending: bool = False,
+               offset: int = 0, cursor=None, page_size: Optional[int] = None):
+        """
+        Case-insensitive substring match on title, author or isbn, in
+        catalog order. ranked=True instead scores every book by how well
+        its words match the query's words, tolerating up to max_edits typos
+        per word ("odysey" finds "Odyssey"), and returns the best first;
+        the substring matches are still found, ranked below better word
+        matches, and an empty query lists every book.
+        limit caps the number of books returned (ranked defaults to 20).
+        Results are served from query_cache while the catalog allows.
+        With sort, offset, cursor or page_size a lazy Page of the results
+        is returned instead of a list (see list_books).
+        """
+        q = normalize(query)
+        paged = self._paged(sort, descending, offset, cursor, page_size)
+        if ranked:
+            if sort is not None or descending:
+                raise ValueError("ranked results are ordered by score")
+            if paged:
+                start = (cursor or 0) + offset
+                size = page_size or limit or 20
+                hits = self.search(q, start + size + 1, ranked=True, max_edits=max_edits)
+                return Page(enumerate(hits[start:], start + 1), size, cursor)
+            limit = limit if limit is not None else 20
+            return self.query_cache.cached(
+                ("ranked", q.strip(), limit, max_edits),
+                lambda: [self.books[isbn] for _, isbn in
+                         self.fuzzy_index.ranked(q, limit, max_edits, substring=self._substring)],
+                lambda b: fuzzy_matches(b, q, max_edits))
+        isbns = lambda: self._substring(q, limit)
+        affects = lambda b: q in normalize(b.title) or q in normalize(b.author) or q in normalize(b.isbn)
+        compute = lambda: [self.books[isbn] for isbn in isbns()]
+        if not paged:
+            return self.query_cache.cached(("search", q, limit), compute, affects)
+        # pages read the cached result in place instead of copying it per page
+        hits = self.query_cache.cached(("search", q, limit), compute, affects, copy=False)
+        if sort is None:
+            start = (cursor or 0) + offset
+            return Page(enumerate(islice(hits, start, None), start + 1), page_size, cursor)
+        key = self.indexes[sort].key
+        entries = self.query_cache.cached(("search", q, limit, sort),
+                                          lambda: sorted((key(b), b.isbn) for b in hits), affects, copy=False)
+        return Page(self._sorted_rows(islice(walk_sorted(lambda: entries, cursor, descending), offset, None)),
+                    page_size, cursor)
+
+    def _substring(self, q: str, limit: Optional[int] = None) -> List[str]:
+        """ISBNs of the first limit books containing normalized q, in catalog order."""
+        if self.sharded is not None and self.sharded.active():
+            # the workers scan in parallel; the trigram index is never built
+            return self.sharded.search(q, limit)
+        return self.search_index.search(q, limit)
+
+    def find(self, year=None, copies=None, author: Optional[str] = None,
+             author_prefix: Optional[str] = None) -> List[Book]:
+        """
+        Indexed filter query; all given conditions must hold.
+        year/copies take a value or an inclusive (low, high) tuple, e.g.
+        find(year=(1990, 2000)), find(copies=(None, 1)), find(author="jane austen").
+        Author matching ignores case and repeated spaces.
+        """
+        year = tuple(year) if isinstance(year, list) else year
+        copies = tuple(copies) if isinstance(copies, list) else copies
+        if year is None and copies is None and author is None and author_prefix is None:
+            return self.list_books()
+        filters = dict(year=year, copies=copies, author=author, author_prefix=author_prefix)
+        key = ("find", year, copies,
+               normalize_author(author) if author is not None else None,
+               normalize_author(author_prefix) if author_prefix is not None else None)
+        return self.query_cache.cached(
+            key,
+            lambda: [self.books[isbn] for isbn in run_query(self.indexes, **filters)],
+            lambda b: matches_query(b, **filters))
+
+    def list_books(self, sort: Optional[str] = None, descending: bool = False, offset: int = 0,
+                   cursor=None, page_size: Optional[int] = None):
+        """
+        All books in catalog order, as a list. Given sort (one of SORT_KEYS),
+        offset, cursor or page_size, returns a lazy Page instead: up to
+        page_size books, starting offset books past cursor (or the start).
+        Sorted pages resume from the cursor in O(log N) through the sorted
+        index; catalog order skips cursor + offset rows.
+        """
+        if not self._paged(sort, descending, offset, cursor, page_size):
+            return self.query_cache.cached(("list",), lambda: list(self.books.values()), lambda b: True)
+        if sort is None:
+            start = (cursor or 0) + offset
+            return Page(enumerate(islice(self.books.values(), start, None), start + 1), page_size, cursor)
+        entries = islice(self.indexes[sort].walk(cursor, descending), offset, None)
+        return Page(self._sorted_rows(entries), page_size, cursor)
+
+    @staticmethod
+    def _paged(sort, descending, offset, cursor, page_size) -> bool:
+        if sort is not None and sort not in SORT_KEYS:
+            raise ValueError(f"cannot sort by {sort!r}; choose from {', '.join(SORT_KEYS)}")
+        if descending and sort is None:
+            raise ValueError("descending needs a sort key")
+        return sort is not None or bool(offset) or cursor is not None or page_size is not None
+
+    def _sorted_rows(self, entries: Iterable[tuple]) -> Iterator[Tuple[tuple, Book]]:
+        for entry in entries:
+            book = self.books.get(entry[1])
+            if book is not None:  # deleted since the entries were read
+                yield entry, book
+
+    def select(self, query: Optional[str] = None, **filters):
+        """
+        Yield books matching a search query and/or find() filters, in
+        catalog order (all books when neither is given). Lazily streams
+        the catalog when unfiltered.
+        """
+        if not query and not any(v is not None for v in filters.values()):
+            yield from self.books.values()
+            return
+        if query and filters and self.sharded is not None and self.sharded.active():
+            yield from (self.books[isbn] for isbn in self.sharded.search(query, **filters))
+            return
+        books = self.search(query) if query else self.find(**filters)
+        if query and filters:
+            keep = {b.isbn for b in self.find(**filters)}
+            books = [b for b in books if b.isbn in keep]
+        yield from books
+
+    def export(self, path: str = EXPORT_FILE, query: Optional[str] = None,
+               compress: bool = False, part_rows: Optional[int] = None,
+               progress=None, header: Optional[List[str]] = None,
+               isbns: Optional[List[str]] = None, **filters) -> ExportReport:
+        """
+        Stream the catalog (or the subset matching query/filters, see select)
+        to CSV. isbns instead exports exactly those books in that order,
+        e.g. the rows a search table shows. See export.write_csv for
+        compress, part_rows and progress.
+        """
+        if isbns is not None:
+            books, total = (self.books[i] for i in isbns if i in self.books), len(isbns)
+        else:
+            unfiltered = not query and all(v is None for v in filters.values())
+            books, total = self.select(query, **filters), len(self.books) if unfiltered else None
+        checkpoint = self.checkpoint() if self.changes is not None else None
+        report = write_csv(books, path, header=header, compress=compress,
+                           part_rows=part_rows, progress=progress, total=total)
+        report.checkpoint = checkpoint
+        return report
+
+    def checkpoint(self) -> int:
+        """Number of the last change so far; a later export_changes(since=it) returns what follows."""
+        if self.changes is None:
+            raise ValueError("change tracking is off (LibrarySystem(track_changes=True))")
+        with self.lock, self._file_locked():
+            self._catch_up()
+            self._flush_changes()
+            return self.changes.seq
 
-    def list_books(self) -> List[Book]:
-        return list(self.books.values())
+    def export_changes(self, path: str = CHANGES_EXPORT_FILE, since: int = 0,
+                       fmt: Optional[str] = None) -> ExportReport:
+        """
+        Delta export: only the books added, updated or deleted after
+        checkpoint `since` (from an earlier report.checkpoint), each once
+        with its current fields or as a delete, as CSV or JSONL (fmt, or
+        from path's extension). Costs O(changes), not O(catalog).
+        """
+        with self.lock, self._file_locked():
+            checkpoint = self.checkpoint()
+            rows = [(seq, isbn, self.books.get(isbn)) for seq, isbn, _ in self.changes.since(since)]
+        report = write_changes(rows, path, fmt)
+        report.checkpoint = checkpoint
+        return report
 
     def export_to_csv(self, path: str = EXPORT_FILE):
-        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-        with open(path, "w", newline="", encoding="utf-8") as out_file:
-            writer = csv.writer(out_file)
-            writer.writerow(["ISBN", "Title", "Author", "Year", "Copies"])
-            for b in self.list_books():
-                writer.writerow([b.isbn, b.title, b.author, b.year, b.copies])
-        return path
+        return self.export(path).paths[0]
 
 
-def print_table(books: List[Book]):
-    if not books:
-        print("No books to display.")
-        return
+PAGE_ROWS = 20
+MAX_COL_WIDTH = 40
+
+
+def _cell(text: str, width: int) -> str:
+    return text.ljust(width) if len(text) <= width else text[:width - 3] + "..."
+
+
+def print_table(books: Iterable[Book], limit: Optional[int] = None, chunk_rows: int = 1000,
+                max_width: Optional[int] = MAX_COL_WIDTH) -> int:
+    """
+    Print books as a table while streaming them: rows are formatted
+    chunk_rows at a time, column widths come from the first chunk (capped
+    at max_width, longer values are cut short; None prints them whole,
+    e.g. for a single book). With limit only the first limit rows are
+    printed, plus a count of the rest for a list. Returns the number of
+    rows printed.
+    """
     headers = ["ISBN", "Title", "Author", "Year", "Copies"]
-    rows = [[b.isbn, b.title, b.author, str(b.year), str(b.copies)] for b in books]
-    col_widths = [max(len(row[i]) for row in ([headers] + rows)) for i in range(len(headers))]
-    header_line = " | ".join(headers[i].ljust(col_widths[i]) for i in range(len(headers)))
-    sep = "-+-".join("-" * col_widths[i] for i in range(len(headers)))
-    print(header_line)
-    print(sep)
-    for row in rows:
-        print(" | ".join(row[i].ljust(col_widths[i]) for i in range(len(row))))
+    rows = iter(books) if limit is None else islice(books, limit)
+    widths = None
+    printed = 0
+    while True:
+        chunk = [[b.isbn, b.title, b.author, str(b.year), str(b.copies)] for b in islice(rows, chunk_rows)]
+        if not chunk:
+            break
+        if widths is None:
+            widths = [max(len(row[i]) for row in [headers] + chunk) for i in range(len(headers))]
+            if max_width is not None:
+                widths = [min(max_width, w) for w in widths]
+            print(" | ".join(_cell(headers[i], widths[i]) for i in range(len(headers))))
+            print("-+-".join("-" * w for w in widths))
+        for row in chunk:
+            print(" | ".join(_cell(row[i], widths[i]) for i in range(len(row))))
+        printed += len(chunk)
+    if not printed:
+        print("No books to display.")
+    elif limit is not None and isinstance(books, list) and len(books) > printed:
+        print(f"... {len(books) - printed} more")
+    return printed
+
+
+def browse(fetch, page_rows: int = PAGE_ROWS):
+    """
+    Show fetch(cursor, page_rows) -> Page one screen at a time with
+    next/previous navigation. The cursor each page started from is kept,
+    so going back fetches that page again.
+    """
+    starts = [None]
+    while True:
+        page = fetch(starts[-1], page_rows)
+        print_table(page)
+        options = (["n=next"] if page.more else []) + (["p=previous"] if len(starts) > 1 else [])
+        if not options:
+            return
+        choice = input(f"Page {len(starts)}: {', '.join(options)}, Enter=done: ").strip().lower()
+        if choice == "n" and page.more:
+            starts.append(page.cursor)
+        elif choice == "p" and len(starts) > 1:
+            starts.pop()
+        else:
+            return
 
 
 def menu():
@@ -136,13 +760,135 @@ def menu():
     print("5. Search books")
     print("6. List all books")
     print("7. Export to CSV")
-    print("8. Exit")
+    print("8. Bulk import (CSV/JSONL)")
+    print("9. Circulation (members, checkout, return, renew, due dates)")
+    print("10. Statistics (by author and decade, low stock)")
+    print("0. Exit")
+
+
+def print_stats(stats: CatalogStats, top: int = 10):
+    """Print the analytics dashboard; every figure is kept up to date, nothing is scanned."""
+    report = stats.report(top=top, low_limit=PAGE_ROWS)
+    print(f"\n{report['titles']} titles, {report['copies']} copies, {report['authors']} authors")
+    print(f"\nTop {top} authors (titles / copies):")
+    for name, titles, copies in report["top_authors"]:
+        print(f"  {name:<30} {titles:>7} {copies:>9}")
+    print("\nBy decade (titles / copies):")
+    for decade, titles, copies in report["decades"]:
+        print(f"  {decade:>5}s {titles:>9} {copies:>9}")
+    print(f"\nLow stock (<= {stats.low_stock} copies): {report['low_stock_total']} books")
+    for isbn, title, copies in report["low_stock"]:
+        print(f"  {isbn:<15} {copies:>3}  {title}")
+    if report["low_stock_total"] > len(report["low_stock"]):
+        print(f"  ... {report['low_stock_total'] - len(report['low_stock'])} more")
+
+
+def circulation_menu(circ):
+    from circulation import CirculationError
+    print("\nCirculation")
+    print("1. Add member")
+    print("2. Check out")
+    print("3. Return")
+    print("4. Renew")
+    print("5. Member's loans")
+    print("6. Overdue loans")
+    print("7. Due in the next N days")
+    choice = input("Choose an option: ").strip()
+    circ.reload_if_changed()  # loans made by other processes meanwhile
+    try:
+        if choice == "1":
+            member = circ.add_member(input("Member ID: ").strip(), input("Name: ").strip())
+            print(f"Member {member.member_id} added.")
+        elif choice == "2":
+            loan = circ.checkout(input("Member ID: ").strip(), input("ISBN: ").strip())
+            print(f"Loan {loan.loan_id} due {loan.due}. Available now: {circ.available(loan.isbn)}.")
+        elif choice == "3":
+            loan = circ.return_book(input("Member ID: ").strip(), input("ISBN: ").strip())
+            print(f"Loan {loan.loan_id} returned.")
+        elif choice == "4":
+            loan = circ.renew(int(input("Loan ID: ").strip()))
+            print(f"Loan {loan.loan_id} now due {loan.due}.")
+        elif choice in ("5", "6", "7"):
+            if choice == "5":
+                loans = circ.loans_for_member(input("Member ID: ").strip())
+            elif choice == "6":
+                loans = circ.overdue()
+            else:
+                loans = circ.due_within(int(input("Days: ").strip() or "7"))
+            if not loans:
+                print("No loans.")
+            for loan in loans:
+                print(f"  #{loan.loan_id}  {loan.member_id}  {loan.isbn}  due {loan.due}")
+        else:
+            print("Invalid choice.")
+    except CirculationError as e:
+        print(e)
+    except ValueError:
+        print("Loan ID and days must be numbers.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Library Management System - CLI")
+    parser.add_argument("--data-file", help="catalog file (default: books.json, books.db with --storage sqlite)")
+    parser.add_argument("--storage", choices=STORAGE_MODES, default="json",
+                        help="json rewrites the file per change, wal appends to a log, "
+                             "sqlite stores rows in a database, snapshot memory-maps a binary "
+                             "snapshot and logs changes")
+    parser.add_argument("--durability", choices=DURABILITY_LEVELS, default="flush",
+                        help="write policy for the wal log or sqlite synchronous mode")
+    parser.add_argument("--compact-every", type=int, default=10000,
+                        help="log records before the snapshot is rewritten")
+    parser.add_argument("--columnar", action="store_true",
+                        help="keep the catalog in compact columns (less memory per book)")
+    parser.add_argument("--shards", type=int, metavar="N",
+                        help="search catalogs over %d books with N worker processes" % SHARD_THRESHOLD)
+    parser.add_argument("--track-changes", action="store_true",
+                        help="number changes in books.changes.jsonl for delta exports (option 7)")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve the catalog over HTTP/JSON instead of the menu (see server.py)")
+    parser.add_argument("--host", default="127.0.0.1", help="address for --serve")
+    parser.add_argument("--port", type=int, default=8080, help="port for --serve")
+    parser.add_argument("--commit-window", type=float, default=5.0, metavar="MS",
+                        help="with --serve, writes arriving within this many ms share one commit")
+    parser.add_argument("--profile", nargs="?", const=instrumentation.STDERR, metavar="JSON_FILE",
+                        help="time load/save/mutations/search/export: summary on stderr, "
+                             "or metrics in JSON_FILE (also: LMS_PROFILE=1 or LMS_PROFILE=file.json)")
+    parser.add_argument("--profile-interval", type=float, metavar="SECONDS",
+                        help="with --profile, report every SECONDS as well as at exit (default 60, 0: exit only)")
+    parser.add_argument("--cprofile", metavar="PSTATS_FILE",
+                        help="also run cProfile and dump its stats to PSTATS_FILE at exit")
+    parser.add_argument("--migrate-from", metavar="JSON_FILE",
+                        help="copy a books.json (dict or list format) into --storage/--data-file and exit")
+    args = parser.parse_args(argv)
+    if args.data_file is None:
+        args.data_file = SQLITE_FILE if args.storage == "sqlite" else DATA_FILE
+    return args
 
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    if instrumentation.enable_from_env(args.profile, args.profile_interval, args.cprofile):
+        instrumentation.instrument_system(LibrarySystem)
+    try:
+        if args.migrate_from:
+            backend = open_backend(args.storage, args.data_file, args.durability, args.compact_every)
+            count = migrate_json(args.migrate_from, backend, Book.from_dict)
+            backend.close({})
+            print(f"Migrated {count} books from {args.migrate_from} to {args.data_file} ({args.storage}).")
+            return
+        system = LibrarySystem(args.data_file, storage=args.storage,
+                               durability=args.durability, compact_every=args.compact_every,
+                               columnar=args.columnar, shards=args.shards, track_changes=args.track_changes)
+    except sqlite3.DatabaseError as e:
+        raise SystemExit(f"Cannot open {args.data_file} as an SQLite database ({e}); "
+                         f"choose one with --data-file (default {SQLITE_FILE}).")
+    if args.serve:
+        from server import serve
+        serve(system, args.host, args.port, args.commit_window / 1000.0)
+        return
     print("Welcome to Library Management System")
     # No login required
-    system = LibrarySystem()
+    circulation = None
 
     while True:
         menu()
@@ -166,7 +912,7 @@ def main():
             isbn = input("Enter ISBN: ").strip()
             b = system.get_book(isbn)
             if b:
-                print_table([b])
+                print_table([b], max_width=None)  # one book: show every field in full
             else:
                 print("Book not found.")
         elif choice == "3":
@@ -196,20 +942,87 @@ def main():
             isbn = input("ISBN to delete: ").strip()
             confirm = input(f"Are you sure you want to delete {isbn}? (y/n): ").strip().lower()
             if confirm == "y":
-                if system.delete_book(isbn):
-                    print("Deleted.")
-                else:
-                    print("Book not found.")
+                try:
+                    deleted = system.delete_book(isbn)
+                except ValueError as e:  # e.g. copies still on loan
+                    print(f"Not deleted: {e}")
+                    continue
+                print("Deleted." if deleted else "Book not found.")
         elif choice == "5":
             q = input("Search query (title/author/isbn): ").strip()
-            results = system.search(q)
-            print_table(results)
+            browse(lambda cursor, rows: system.search(q, ranked=True, cursor=cursor, page_size=rows))
         elif choice == "6":
-            print_table(system.list_books())
+            sort = input(f"Sort by ({'/'.join(SORT_KEYS)}, '-' first for descending, "
+                         "blank for catalog order): ").strip().lower()
+            descending = sort.startswith("-")
+            sort = sort.lstrip("-") or None
+            if sort is not None and sort not in SORT_KEYS:
+                print("Unknown sort key.")
+                continue
+            browse(lambda cursor, rows: system.list_books(sort=sort, descending=descending,
+                                                          cursor=cursor, page_size=rows))
         elif choice == "7":
-            path = system.export_to_csv()
-            print(f"Exported to: {path}")
+            if system.changes is not None:
+                since = input("Only changes since checkpoint (blank for a full export): ").strip()
+                if since:
+                    if not since.isdigit():
+                        print("Checkpoint must be a number.")
+                        continue
+                    print(f"Exported {system.export_changes(CHANGES_EXPORT_FILE, since=int(since))}")
+                    continue
+            q = input("Only books matching (blank for all): ").strip() or None
+            compress = input("Gzip the output? (y/n) [n]: ").strip().lower() == "y"
+            while True:
+                part_rows = input("Rows per file (blank for one file): ").strip()
+                if not part_rows:
+                    part_rows = None
+                    break
+                if part_rows.isdigit() and int(part_rows) >= 1:
+                    part_rows = int(part_rows)
+                    break
+                print("Rows per file must be a whole number of at least 1.")
+
+            def progress(done, total):
+                print(f"\r  {done} rows" + (f" of {total}" if total else ""), end="", flush=True)
+
+            report = system.export(EXPORT_FILE, query=q, compress=compress,
+                                   part_rows=part_rows, progress=progress)
+            print()
+            print(f"Exported {report}")
         elif choice == "8":
+            path = input("File to import (.csv or .jsonl): ").strip()
+            policy = input("Duplicates - insert/upsert/skip [insert]: ").strip().lower() or "insert"
+            if policy not in IMPORT_POLICIES:
+                print("Unknown policy.")
+                continue
+            try:
+                report = system.bulk_import(path, policy=policy)
+            except (OSError, ValueError) as e:
+                print(f"Import failed: {e}")
+                continue
+            print(f"Imported {report}")
+            for row_no, reason in report.rejected[:10]:
+                print(f"  row {row_no}: {reason}")
+        elif choice == "9":
+            if circulation is None:
+                from circulation import Circulation
+                circulation = Circulation(system)
+            circulation_menu(circulation)
+        elif choice == "10":
+            print_stats(system.analytics)
+            if input("Verify against a full scan? (y/n) [n]: ").strip().lower() == "y":
+                problems = system.analytics.verify()
+                for problem in problems[:10]:
+                    print(f"  {problem}")
+                if problems:
+                    system.analytics.rebuild()
+                    print(f"{len(problems)} figures differed; recounted from the catalog.")
+                else:
+                    print("All figures match a full scan.")
+        elif choice == "0":
+            if circulation is not None:
+                circulation.close()
+            system.close()
             print("Goodbye.")
             break
         else:
@@ -0,0 +1,172 @@
+"""
+Running catalog statistics for the CLI and the GUI dashboard.
+
+CatalogStats is a catalog listener: it scans the catalog once, on the
+first question, and from then on follows every add, update and delete in
+O(1), so totals, per-author, per-year and per-decade counts and copy sums
+and the low-stock list are answered without touching the catalog.
+verify() recounts everything from a scan and reports any figure that
+disagrees; rebuild() replaces the running figures with the recount.
+"""
+
+import heapq
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from indexes import normalize_author
+
+LOW_STOCK = 1  # books with this many copies or fewer are low on stock
+
+
+def decade_of(year: int) -> int:
+    return year // 10 * 10
+
+
+class CatalogStats:
+    """
+    Titles and copies overall and grouped by author (ignoring case and
+    repeated spaces), year and decade, plus the books with at most
+    low_stock copies. Groups that become empty are dropped.
+    """
+
+    def __init__(self, low_stock: int = LOW_STOCK):
+        self.low_stock = low_stock
+        self.titles = 0
+        self.copies = 0
+        self.by_author: Dict[str, List[int]] = {}  # normalized author -> [titles, copies]
+        self.author_names: Dict[str, str] = {}     # normalized author -> name as last written
+        self.by_year: Dict[int, List[int]] = {}
+        self.by_decade: Dict[int, List[int]] = {}
+        self.low: Dict[str, int] = {}              # isbn -> copies, for low-stock books
+        self._source: Mapping = {}
+        self.built = False
+
+    # ---------- catalog hooks ----------
+    def on_reset(self, books: Mapping):
+        self._source = books
+        self.built = False
+        self._clear()
+
+    def on_change(self, old, new):
+        if not self.built:
+            return
+        if old is not None:
+            self._count(old, -1)
+        if new is not None:
+            self._count(new, 1)
+
+    # ---------- upkeep ----------
+    def _clear(self):
+        self.titles = self.copies = 0
+        self.by_author, self.author_names = {}, {}
+        self.by_year, self.by_decade, self.low = {}, {}, {}
+
+    @staticmethod
+    def _add(groups: Dict, key, sign: int, copies: int) -> bool:
+        """Adjust one group; True when it became empty and was dropped."""
+        entry = groups.get(key)
+        if entry is None:
+            entry = groups[key] = [0, 0]
+        entry[0] += sign
+        entry[1] += sign * copies
+        if entry[0] <= 0:
+            del groups[key]
+            return True
+        return False
+
+    def _count(self, book, sign: int):
+        copies = book.copies
+        self.titles += sign
+        self.copies += sign * copies
+        author = normalize_author(book.author)
+        if self._add(self.by_author, author, sign, copies):
+            self.author_names.pop(author, None)
+        elif sign > 0:
+            self.author_names[author] = book.author
+        self._add(self.by_year, book.year, sign, copies)
+        self._add(self.by_decade, decade_of(book.year), sign, copies)
+        if sign < 0:
+            self.low.pop(book.isbn, None)
+        elif copies <= self.low_stock:
+            self.low[book.isbn] = copies
+
+    def _ensure_built(self):
+        if not self.built:
+            self.rebuild()
+
+    def rebuild(self):
+        """Recount everything from a scan of the catalog."""
+        self._clear()
+        for book in self._source.values():
+            self._count(book, 1)
+        self.built = True
+
+    def _figures(self) -> Dict:
+        return {"titles": self.titles, "copies": self.copies, "by_author": self.by_author,
+                "by_year": self.by_year, "by_decade": self.by_decade, "low_stock": self.low}
+
+    def verify(self) -> List[str]:
+        """Differences between the running figures and a fresh scan (empty when they agree)."""
+        self._ensure_built()
+        fresh = CatalogStats(self.low_stock)
+        fresh.on_reset(self._source)
+        fresh.rebuild()
+        problems = []
+        ours, theirs = self._figures(), fresh._figures()
+        for name, value in ours.items():
+            expected = theirs[name]
+            if not isinstance(value, dict):
+                if value != expected:
+                    problems.append(f"{name}: {value} != {expected} scanned")
+                continue
+            for key in value.keys() | expected.keys():
+                if value.get(key) != expected.get(key):
+                    problems.append(f"{name}[{key!r}]: {value.get(key)} != {expected.get(key)} scanned")
+        return problems
+
+    # ---------- queries ----------
+    def author(self, name: str) -> Tuple[int, int]:
+        """(titles, copies) by one author."""
+        self._ensure_built()
+        return tuple(self.by_author.get(normalize_author(name), (0, 0)))
+
+    def year(self, year: int) -> Tuple[int, int]:
+        self._ensure_built()
+        return tuple(self.by_year.get(year, (0, 0)))
+
+    def decade(self, decade: int) -> Tuple[int, int]:
+        self._ensure_built()
+        return tuple(self.by_decade.get(decade_of(decade), (0, 0)))
+
+    def top_authors(self, n: int = 10, by: str = "titles") -> List[Tuple[str, int, int]]:
+        """The n authors with the most titles (or copies): (name, titles, copies)."""
+        self._ensure_built()
+        col = 1 if by == "copies" else 0
+        best = heapq.nlargest(n, self.by_author.items(), key=lambda kv: kv[1][col])
+        return [(self.author_names.get(a, a), t, c) for a, (t, c) in best]
+
+    def decades(self) -> List[Tuple[int, int, int]]:
+        """(decade, titles, copies) for every decade with books, oldest first."""
+        self._ensure_built()
+        return [(d, t, c) for d, (t, c) in sorted(self.by_decade.items())]
+
+    def low_stock_books(self, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(isbn, copies) of low-stock books, fewest copies first."""
+        self._ensure_built()
+        items = ((copies, isbn) for isbn, copies in self.low.items())
+        ordered = sorted(items) if limit is None else heapq.nsmallest(limit, items)
+        return [(isbn, copies) for copies, isbn in ordered]
+
+    def report(self, top: int = 10, low_limit: int = 20) -> Dict:
+        """Everything a dashboard shows, as plain data."""
+        self._ensure_built()
+        books = self._source
+        return {
+            "titles": self.titles,
+            "copies": self.copies,
+            "authors": len(self.by_author),
+            "top_authors": self.top_authors(top),
+            "decades": self.decades(),
+            "low_stock": [(isbn, books[isbn].title, copies) for isbn, copies in self.low_stock_books(low_limit)
+                          if isbn in books],
+            "low_stock_total": len(self.low),
+        }
@@ -0,0 +1,281 @@
+"""
+Benchmark harness for the LMS.py and gui.py data paths.
+
+Generates synthetic catalogs (see catalog_gen.py), times each operation
+with warmup and repetition, and writes latency percentiles, throughput
+and peak memory as JSON so runs can be compared between commits:
+
+    python benchmarks/bench.py --sizes 10000 100000 --output before.json
+    python benchmarks/bench.py --sizes 10000 100000 --output after.json
+    python benchmarks/bench.py --compare before.json after.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog_gen import write_catalog  # noqa: E402
+from LMS import LibrarySystem, Book  # noqa: E402
+
+OPERATIONS = ["load", "save", "add_book", "update_book", "delete_book", "search", "search_ranked", "find",
+              "export_to_csv", "gui_read_cold", "gui_read_warm"]
+SEARCH_QUERIES = ["the", "austen", "978000", "river song", "zz-no-match"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Case:
+    """Operations against one generated catalog; the mutating ones share a working copy."""
+
+    def __init__(self, workdir, data_file, storage, size, columnar=False):
+        self.workdir = workdir
+        self.data_file = data_file
+        self.storage = storage
+        self.size = size
+        self.columnar = columnar
+        self.system = None
+        self.counter = 0
+
+    def fresh_copy(self):
+        path = os.path.join(self.workdir, "run_" + os.path.basename(self.data_file))
+        shutil.copyfile(self.data_file, path)
+        for suffix in (".wal", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        return path
+
+    def system_for(self):
+        if self.system is None:
+            self.system = LibrarySystem(self.fresh_copy(), storage=self.storage, columnar=self.columnar)
+        return self.system
+
+    def next_book(self):
+        self.counter += 1
+        return Book(f"bench-{self.counter}", f"Bench Title {self.counter}", "Bench Author", 2024, 1)
+
+    # each op returns the number of records it touched
+    def op_load(self):
+        return len(LibrarySystem(self.data_file, storage=self.storage, columnar=self.columnar).books)
+
+    def op_save(self):
+        system = self.system_for()
+        system.save()
+        return len(system.books)
+
+    def op_add_book(self):
+        self.system_for().add_book(self.next_book())
+        return 1
+
+    def op_update_book(self):
+        system = self.system_for()
+        isbn = next(iter(system.books))
+        self.counter += 1
+        system.update_book(isbn, copies=self.counter % 50 + 1)
+        return 1
+
+    def op_delete_book(self):
+        system = self.system_for()
+        book = self.next_book()
+        system.add_book(book)
+        system.delete_book(book.isbn)
+        return 2
+
+    def op_search(self):
+        system = self.system_for()
+        self.counter += 1
+        return len(system.search(SEARCH_QUERIES[self.counter % len(SEARCH_QUERIES)]))
+
+    def op_search_ranked(self):
+        system = self.system_for()
+        self.counter += 1
+        return len(system.search(SEARCH_QUERIES[self.counter % len(SEARCH_QUERIES)], limit=20, ranked=True))
+
+    def op_find(self):
+        return len(self.system_for().find(year=(1990, 2000), copies=(None, 1)))
+
+    def op_export_to_csv(self):
+        system = self.system_for()
+        system.export_to_csv(os.path.join(self.workdir, "export.csv"))
+        return len(system.books)
+
+    def op_gui_read_cold(self):
+        import gui
+        from pathlib import Path
+        gui.BOOKS_FILE = Path(self.data_file)
+        gui._library = None
+        return len(gui.read_books_as_dict())
+
+    def op_gui_read_warm(self):
+        import gui
+        from pathlib import Path
+        if gui._library is None or gui.BOOKS_FILE != Path(self.data_file):
+            gui.BOOKS_FILE = Path(self.data_file)
+            gui._library = None
+            gui.read_books_as_dict()
+        return len(gui.read_books_as_dict())
+
+
+def measure(case, op, warmup, repeat):
+    fn = getattr(case, "op_" + op)
+    for _ in range(warmup):
+        fn()
+    samples, records = [], 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        records += fn()
+        samples.append(time.perf_counter() - start)
+    # peak memory in a separate traced call so tracing does not skew timings
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total = sum(samples)
+    return {
+        "op": op,
+        "size": case.size,
+        "storage": case.storage,
+        "repeat": repeat,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p90_ms": percentile(samples, 90) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "min_ms": min(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+        "mean_ms": statistics.mean(samples) * 1000,
+        "ops_per_sec": repeat / total if total else None,
+        "records_per_sec": records / total if total else None,
+        "peak_mem_mb": peak / (1 << 20),
+    }
+
+
+def footprint(case):
+    """Memory the loaded catalog keeps alive, per record (indexes are lazy and excluded)."""
+    gc.collect()
+    tracemalloc.start()
+    system = LibrarySystem(case.data_file, storage=case.storage, columnar=case.columnar)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(system.books)
+    del system
+    return {
+        "op": "footprint",
+        "size": case.size,
+        "storage": case.storage,
+        "columnar": case.columnar,
+        "retained_mb": retained / (1 << 20),
+        "bytes_per_record": retained / count if count else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    results = []
+    workdir = tempfile.mkdtemp(prefix="lms-bench-")
+    try:
+        for size in args.sizes:
+            source = os.path.join(workdir, f"books_{size}.json")
+            write_catalog(source, size, args.format, args.seed)
+            data_file = source
+            if args.storage == "sqlite":
+                data_file = os.path.join(workdir, f"books_{size}.db")
+                from storage import SqliteBackend, migrate_json
+                backend = SqliteBackend(data_file)
+                migrate_json(source, backend, Book.from_dict)
+                backend.close({})
+            case = Case(workdir, data_file, args.storage, size, args.columnar)
+            mem = footprint(case)
+            results.append(mem)
+            print(f"{'footprint':>14} n={size:<9} {mem['bytes_per_record']:9.1f} bytes/record "
+                  f"({mem['retained_mb']:.1f}MB)", flush=True)
+            for op in args.ops:
+                if op.startswith("gui_") and args.storage != "json":
+                    continue
+                res = measure(case, op, args.warmup, args.repeat)
+                res["format"] = args.format
+                res["columnar"] = args.columnar
+                results.append(res)
+                print(f"{op:>14} n={size:<9} p50={res['p50_ms']:9.3f}ms p99={res['p99_ms']:9.3f}ms "
+                      f"peak={res['peak_mem_mb']:8.1f}MB", flush=True)
+            case.system = None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": {k: v for k, v in vars(args).items() if k != "compare"},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+
+def compare(old_path, new_path):
+    """Print p50 ratios (new/old) for every op/size present in both files."""
+    with open(old_path, encoding="utf-8") as f:
+        old = {(r["op"], r["size"], r["storage"]): r for r in json.load(f)["results"] if "p50_ms" in r}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    print(f"{'op':>14} {'size':>9} {'old p50':>11} {'new p50':>11} {'ratio':>7}")
+    for r in new:
+        before = old.get((r["op"], r["size"], r["storage"]))
+        if before is None or "p50_ms" not in r:
+            continue
+        ratio = r["p50_ms"] / before["p50_ms"] if before["p50_ms"] else float("inf")
+        flag = "  REGRESSION" if ratio > 1.2 else ""
+        print(f"{r['op']:>14} {r['size']:>9} {before['p50_ms']:10.3f}ms {r['p50_ms']:10.3f}ms {ratio:6.2f}x{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark LibrarySystem and GUI data paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--ops", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument("--format", choices=("dict", "list"), default="dict")
+    parser.add_argument("--storage", choices=("json", "wal", "sqlite", "snapshot"), default="json")
+    parser.add_argument("--columnar", action="store_true", help="use the columnar in-memory catalog")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
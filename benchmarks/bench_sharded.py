@@ -0,0 +1,86 @@
+"""
+Sharded search benchmark: the original single-process substring scan
+against the trigram index and against ShardedSearch with 1..N workers.
+
+    python benchmarks/bench_sharded.py --size 1000000 --shards 1 2 4 8
+
+Speedups are relative to the scan. Worker start-up and the initial
+transfer of the catalog are reported separately from query latency.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import percentile  # noqa: E402
+from catalog_gen import write_catalog  # noqa: E402
+from LMS import LibrarySystem  # noqa: E402
+from sharded import ShardedSearch  # noqa: E402
+
+QUERIES = ["the", "austen", "978000", "river song", "zz-no-match", "a", "20"]
+
+
+def scan(books, q):
+    q = q.lower()
+    return [b.isbn for b in books.values()
+            if q in b.title.lower() or q in b.author.lower() or q in b.isbn.lower()]
+
+
+def time_queries(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        for q in QUERIES:
+            start = time.perf_counter()
+            fn(q)
+            samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1000, sum(samples) / len(samples) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare sharded parallel search with the single-process scan")
+    parser.add_argument("--size", type=int, default=500000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="lms-shard-")
+    try:
+        data_file = os.path.join(workdir, "books.json")
+        write_catalog(data_file, args.size, "dict", args.seed)
+        system = LibrarySystem(data_file, locking=False)
+        books = system.books
+        print(f"{args.size} books, {os.cpu_count()} cores, queries {QUERIES}")
+
+        p50, mean = time_queries(lambda q: scan(books, q), args.repeat)
+        base = mean
+        print(f"{'scan':>12} p50={p50:9.2f}ms mean={mean:9.2f}ms  1.00x")
+
+        start = time.perf_counter()
+        system.search_index.search("x")
+        built = time.perf_counter() - start
+        p50, mean = time_queries(system.search_index.search, args.repeat)
+        print(f"{'trigram':>12} p50={p50:9.2f}ms mean={mean:9.2f}ms {base / mean:5.2f}x (build {built:.1f}s)")
+
+        for n in sorted(set(args.shards)):
+            sharded = ShardedSearch(n, threshold=0)
+            sharded.on_reset(books)
+            start = time.perf_counter()
+            sharded.search("x")
+            ready = time.perf_counter() - start
+            p50, mean = time_queries(sharded.search, args.repeat)
+            print(f"{f'shards={n}':>12} p50={p50:9.2f}ms mean={mean:9.2f}ms {base / mean:5.2f}x "
+                  f"(start+load {ready:.1f}s)")
+            sharded.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Synthetic catalog generator for benchmarks.
+Produces reproducible books.json files of any size in the dict
+(isbn -> book) or list format, with a Zipf-like author distribution.
+"""
+
+import argparse
+import json
+import random
+from typing import Dict, Iterator
+
+FIRST = ["Jane", "James", "Mary", "John", "Leo", "Emily", "Fyodor", "Virginia", "Mark", "Toni",
+         "Gabriel", "Chinua", "Haruki", "Isabel", "George", "Agatha", "Arthur", "Ursula", "Kazuo", "Zadie"]
+LAST = ["Austen", "Joyce", "Shelley", "Steinbeck", "Tolstoy", "Bronte", "Dostoevsky", "Woolf", "Twain",
+        "Morrison", "Marquez", "Achebe", "Murakami", "Allende", "Orwell", "Christie", "Clarke", "Le Guin",
+        "Ishiguro", "Smith"]
+WORDS = ["the", "of", "and", "night", "river", "house", "war", "peace", "garden", "shadow", "city",
+         "winter", "light", "stone", "song", "ocean", "letters", "journey", "secret", "empire", "dream",
+         "silence", "mirror", "island", "fire", "glass", "memory", "road", "kingdom", "storm"]
+
+
+def isbn13(n: int) -> str:
+    """Valid-looking ISBN-13 (978 prefix, correct check digit) for serial n."""
+    body = "978" + str(n).zfill(9)
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def generate_books(count: int, seed: int = 42, authors: int = 0) -> Iterator[Dict]:
+    """Yield count book dicts. Author popularity follows a 1/rank (Zipf) curve."""
+    rng = random.Random(seed)
+    authors = authors or max(10, count // 20)
+    names = [f"{rng.choice(FIRST)} {rng.choice(LAST)}" + (f" {i}" if i >= len(FIRST) * len(LAST) else "")
+             for i in range(authors)]
+    weights = [1.0 / (rank + 1) for rank in range(authors)]
+    chosen = rng.choices(names, weights=weights, k=count)
+    for n in range(count):
+        words = rng.sample(WORDS, rng.randint(2, 5))
+        yield {
+            "isbn": isbn13(n),
+            "title": " ".join(words).title(),
+            "author": chosen[n],
+            "year": int(rng.triangular(1800, 2025, 2005)),
+            "copies": max(0, int(rng.expovariate(0.4))),
+        }
+
+
+def write_catalog(path: str, count: int, fmt: str = "dict", seed: int = 42):
+    books = generate_books(count, seed)
+    with open(path, "w", encoding="utf-8") as f:
+        if fmt == "list":
+            json.dump(list(books), f)
+        else:
+            json.dump({b["isbn"]: b for b in books}, f)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic books.json")
+    parser.add_argument("count", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("dict", "list"), default="dict")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    write_catalog(args.path, args.count, args.format, args.seed)
+    print(f"Wrote {args.count} books to {args.path} ({args.format} format)")
+
+
+if __name__ == "__main__":
+    main()
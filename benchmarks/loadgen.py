@@ -0,0 +1,182 @@
+"""
+Load generator for server.py.
+
+Opens keep-alive connections, pipelines requests on each and reports
+requests/s with latency percentiles per request kind:
+
+    python LMS.py --serve --storage wal &
+    python benchmarks/loadgen.py --connections 32 --seconds 10 --writes 0.1
+
+--spawn starts a server on a generated catalog in a temp directory instead.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import percentile  # noqa: E402
+from catalog_gen import write_catalog  # noqa: E402
+
+QUERIES = ["the", "austen", "978000", "river", "zz-no-match"]
+
+
+def build_request(kind: str, rng: random.Random, isbns, seq: int) -> bytes:
+    body = b""
+    if kind == "get":
+        method, target = "GET", "/books/" + rng.choice(isbns)
+    elif kind == "search":
+        method, target = "GET", "/search?limit=20&q=" + rng.choice(QUERIES)
+    elif kind == "add":
+        method, target = "POST", "/books"
+        body = json.dumps({"isbn": f"load-{os.getpid()}-{id(rng)}-{seq}", "title": "Load Test",
+                           "author": "Load Author", "year": 2024, "copies": 1}).encode()
+    else:
+        method, target = "PUT", "/books/" + rng.choice(isbns)
+        body = json.dumps({"copies": seq % 20 + 1}).encode()
+    head = f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+    if body:
+        head += "Content-Type: application/json\r\n"
+    head += "\r\n"
+    return head.encode("latin-1") + body
+
+
+async def read_response(reader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, deadline, args, isbns, samples, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    seq = 0
+    try:
+        while time.perf_counter() < deadline:
+            kinds = []
+            for _ in range(args.pipeline):
+                r = rng.random()
+                if r < args.writes / 2:
+                    kind = "add"
+                elif r < args.writes:
+                    kind = "update"
+                elif r < args.writes + args.searches:
+                    kind = "search"
+                else:
+                    kind = "get"
+                seq += 1
+                kinds.append(kind)
+                writer.write(build_request(kind, rng, isbns, seq))
+            start = time.perf_counter()
+            await writer.drain()
+            for kind in kinds:
+                status = await read_response(reader)
+                samples.setdefault(kind, []).append(time.perf_counter() - start)
+                if status >= 400:
+                    errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, args, isbns):
+    samples, errors = {}, {}
+    deadline = time.perf_counter() + args.seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, deadline, args, isbns, samples, errors, args.seed + i)
+                           for i in range(args.connections)))
+    elapsed = time.perf_counter() - start
+    return samples, errors, elapsed
+
+
+def fetch_isbns(host, port, limit=1000):
+    async def fetch():
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f"GET /books?limit={limit} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+        head = await reader.readuntil(b"\r\n\r\n")
+        body = await reader.read()
+        writer.close()
+        return [b["isbn"] for b in json.loads(body)["books"]]
+    return asyncio.run(fetch())
+
+
+def wait_for_port(host, port, timeout=30.0):
+    async def probe():
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+    end = time.time() + timeout
+    while True:
+        try:
+            return asyncio.run(probe())
+        except OSError:
+            if time.time() > end:
+                raise
+            time.sleep(0.1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive server.py with concurrent keep-alive clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--pipeline", type=int, default=4, help="requests in flight per connection")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writes", type=float, default=0.1, help="share of requests that write")
+    parser.add_argument("--searches", type=float, default=0.2, help="share of requests that search")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--spawn", type=int, metavar="BOOKS",
+                        help="start a server on a generated catalog of this size")
+    parser.add_argument("--storage", default="wal", help="storage for --spawn")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    server = workdir = None
+    if args.spawn:
+        workdir = tempfile.mkdtemp(prefix="lms-load-")
+        data_file = os.path.join(workdir, "books.json")
+        write_catalog(data_file, args.spawn, "dict", args.seed)
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "LMS.py"), "--serve",
+                                   "--data-file", data_file, "--storage", args.storage,
+                                   "--host", args.host, "--port", str(args.port)],
+                                  stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.host, args.port)
+        isbns = fetch_isbns(args.host, args.port) or ["missing"]
+        samples, errors, elapsed = asyncio.run(run_load(args.host, args.port, args, isbns))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    total = sum(len(s) for s in samples.values())
+    results = {"requests": total, "seconds": elapsed, "requests_per_sec": total / elapsed,
+               "errors": errors, "kinds": {}}
+    print(f"{total} requests in {elapsed:.2f}s = {total / elapsed:,.0f} req/s "
+          f"({args.connections} connections x {args.pipeline} pipelined)")
+    for kind, s in sorted(samples.items()):
+        stats = {"count": len(s), "p50_ms": percentile(s, 50) * 1000, "p99_ms": percentile(s, 99) * 1000}
+        results["kinds"][kind] = stats
+        print(f"{kind:>8} n={stats['count']:<8} p50={stats['p50_ms']:8.3f}ms p99={stats['p99_ms']:8.3f}ms")
+    if errors:
+        print(f"errors: {errors}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Change tracking for delta exports.
+
+Every committed change gets the next number of a catalog-wide change
+sequence. ChangeLog keeps, per isbn, the number of its last change and
+whether that was a delete (a tombstone) in an OrderedDict held in
+sequence order with move_to_end, so the changes after a checkpoint are
+read backwards from the end in O(changes), whatever the catalog size.
+
+The numbers live in a sidecar log next to the catalog
+(books.changes.jsonl, one JSON line per change). Numbers are handed out
+in flush(), which LibrarySystem calls under its exclusive file lock right
+before committing, after reading what other processes appended, so
+several processes sharing one catalog never reuse a number. The log is
+rewritten with one line per isbn once it grows compact_ratio times
+longer than that.
+"""
+
+import json
+import os
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from storage import atomic_write_text
+
+COMPACT_RATIO = 4
+COMPACT_MIN_LINES = 10000
+
+
+def changes_path(data_file: str) -> str:
+    return os.path.splitext(data_file)[0] + ".changes.jsonl"
+
+
+class ChangeLog:
+    """
+    Catalog listener numbering changes for delta exports. Changes are
+    held as pending until flush(); `seq` is the last number handed out,
+    which is the checkpoint for the next delta.
+    """
+
+    def __init__(self, path: str, durability: str = "flush", compact_ratio: int = COMPACT_RATIO):
+        self.path = path
+        self.durability = durability
+        self.compact_ratio = compact_ratio
+        self.seq = 0
+        self.last: "OrderedDict[str, Tuple[int, bool]]" = OrderedDict()  # isbn -> (seq, deleted)
+        self._pending: List[Tuple[str, bool]] = []
+        self._ident = None  # (device, inode) of the log we have read
+        self._offset = 0    # bytes of it read so far
+        self._torn = False  # it ends in a partial line (a crash mid-append)
+        self._lines = 0
+        self._tail()
+
+    # ---------- catalog hooks ----------
+    def on_reset(self, books):
+        pass  # pending changes survive a reload: deferred writers replay them on top
+
+    def on_change(self, old, new):
+        if old is not None and (new is None or new.isbn != old.isbn):
+            self._pending.append((old.isbn, True))
+        if new is not None:
+            self._pending.append((new.isbn, False))
+
+    # ---------- log ----------
+    def _apply(self, seq: int, isbn: str, deleted: bool):
+        self.last[isbn] = (seq, deleted)
+        self.last.move_to_end(isbn)
+        self.seq = max(self.seq, seq)
+        self._lines += 1
+
+    def _tail(self):
+        """Read what was appended since we last looked; start over if the log was replaced."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        ident = (st.st_dev, st.st_ino) if st is not None else None
+        if ident != self._ident or (st is not None and st.st_size < self._offset):
+            self.seq, self.last, self._offset, self._lines, self._torn = 0, OrderedDict(), 0, 0, False
+            self._ident = ident
+        if st is None or st.st_size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # a line torn by a crash and appended to afterwards
+            self._apply(rec["seq"], rec["isbn"], rec["deleted"])
+        self._offset += end
+        self._torn = end < len(data)
+
+    def flush(self):
+        """Number the pending changes and append them; call under the catalog's write lock."""
+        self._tail()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        lines = [""] if self._torn else []  # end the torn line so ours parse
+        for isbn, deleted in pending:
+            self._apply(self.seq + 1, isbn, deleted)
+            lines.append(json.dumps({"seq": self.seq, "isbn": isbn, "deleted": deleted}))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            if self.durability == "fsync":
+                os.fsync(f.fileno())
+        st = os.stat(self.path)
+        self._ident, self._offset, self._torn = (st.st_dev, st.st_ino), st.st_size, False
+        if self._lines > max(COMPACT_MIN_LINES, self.compact_ratio * len(self.last)):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with only the last change of each isbn (tombstones included)."""
+        text = "".join(json.dumps({"seq": seq, "isbn": isbn, "deleted": deleted}) + "\n"
+                       for isbn, (seq, deleted) in self.last.items())
+        atomic_write_text(self.path, text, fsync=self.durability != "none")
+        st = os.stat(self.path)
+        self._ident, self._offset, self._torn, self._lines = (st.st_dev, st.st_ino), st.st_size, False, len(self.last)
+
+    # ---------- queries ----------
+    def since(self, checkpoint: int) -> List[Tuple[int, str, bool]]:
+        """(seq, isbn, deleted) of every isbn changed after checkpoint, oldest first."""
+        self._tail()
+        out = []
+        for isbn, (seq, deleted) in reversed(self.last.items()):
+            if seq <= checkpoint:
+                break
+            out.append((seq, isbn, deleted))
+        out.reverse()
+        return out
+
+    def last_modified(self, isbn: str) -> Optional[int]:
+        """Sequence number of the last change to isbn (None if never changed while tracked)."""
+        entry = self.last.get(isbn)
+        return entry[0] if entry is not None else None
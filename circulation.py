@@ -0,0 +1,394 @@
+"""
+Circulation: members, checkout, return and renew on top of LibrarySystem.
+
+A book's `copies` is the number the library owns; the copies on loan are
+counted from the loan ledger, so available = copies - active loans.
+Active loans are indexed by member, by isbn and in a min-heap on due
+date, so overdue() and due_within() only touch the loans they return.
+
+Changes go to a write-ahead log next to the catalog (books.loans.wal)
+and are folded into books.loans.json every compact_every records; loans
+returned since the last fold are then appended to books.loans.history.jsonl.
+
+Several processes may share a ledger: every operation holds the catalog's
+file lock and first re-reads the ledger if its files changed (size or
+inode) since this process last read or wrote them, so checks such as a
+free copy or a new loan id always see everyone's loans. A book that is on
+loan cannot be deleted from the catalog: an open Circulation guards its
+LibrarySystem, and a LibrarySystem with none open checks the ledger next
+to its catalog (refuse_if_on_loan), so deletes from the CLI, the server
+or a script are refused too. A ledger kept under another path is only
+seen by a process that opened it.
+"""
+
+import heapq
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from storage import WriteAheadLog, atomic_write_text
+
+LOAN_DAYS = 14
+MAX_RENEWALS = 2
+
+
+class CirculationError(ValueError):
+    """A checkout, return or renew that the library rules do not allow."""
+
+
+class Member:
+    __slots__ = ("member_id", "name")
+
+    def __init__(self, member_id: str, name: str):
+        self.member_id = member_id
+        self.name = name
+
+    def to_dict(self) -> Dict:
+        return {"member_id": self.member_id, "name": self.name}
+
+    @staticmethod
+    def from_dict(d: Dict) -> "Member":
+        return Member(d["member_id"], d["name"])
+
+
+class Loan:
+    __slots__ = ("loan_id", "member_id", "isbn", "checked_out", "due", "renewals", "returned")
+
+    def __init__(self, loan_id: int, member_id: str, isbn: str, checked_out: date, due: date,
+                 renewals: int = 0, returned: Optional[date] = None):
+        self.loan_id = loan_id
+        self.member_id = member_id
+        self.isbn = isbn
+        self.checked_out = checked_out
+        self.due = due
+        self.renewals = renewals
+        self.returned = returned
+
+    def to_dict(self) -> Dict:
+        return {
+            "loan_id": self.loan_id,
+            "member_id": self.member_id,
+            "isbn": self.isbn,
+            "checked_out": self.checked_out.isoformat(),
+            "due": self.due.isoformat(),
+            "renewals": self.renewals,
+            "returned": self.returned.isoformat() if self.returned else None,
+        }
+
+    @staticmethod
+    def from_dict(d: Dict) -> "Loan":
+        returned = d.get("returned")
+        return Loan(d["loan_id"], d["member_id"], d["isbn"], date.fromisoformat(d["checked_out"]),
+                    date.fromisoformat(d["due"]), d.get("renewals", 0),
+                    date.fromisoformat(returned) if returned else None)
+
+
+def ledger_base(data_file: str) -> str:
+    return os.path.splitext(data_file)[0]
+
+
+def refuse_if_on_loan(system, book):
+    """
+    Delete check for a LibrarySystem with no Circulation open: reads the
+    ledger next to the catalog, if there is one, and raises
+    CirculationError when book has copies on loan.
+    """
+    base = ledger_base(system.data_file)
+    if not (os.path.exists(base + ".loans.json") or os.path.exists(base + ".loans.wal")):
+        return
+    ledger = Circulation(system)
+    try:
+        ledger._refuse_delete(book)
+    finally:
+        ledger.close()
+
+
+class Circulation:
+    """
+    Loan ledger for one LibrarySystem. Operations are atomic with respect
+    to catalog changes and to other processes (they run under system.lock
+    and the catalog's file lock) and each one is logged and flushed on its
+    own unless wrapped in batch().
+    """
+
+    def __init__(self, system, path: Optional[str] = None, durability: str = "flush",
+                 loan_days: int = LOAN_DAYS, max_renewals: int = MAX_RENEWALS,
+                 compact_every: int = 10000):
+        self.system = system
+        base = ledger_base(path or system.data_file)
+        self.snapshot_path = base + ".loans.json"
+        self.history_path = base + ".loans.history.jsonl"
+        self.wal = WriteAheadLog(base + ".loans.wal", durability)
+        self.loan_days = loan_days
+        self.max_renewals = max_renewals
+        self.compact_every = compact_every
+        self.members: Dict[str, Member] = {}
+        self.loans: Dict[int, Loan] = {}           # active loans
+        self.by_member: Dict[str, Set[int]] = {}
+        self.by_isbn: Dict[str, Set[int]] = {}
+        self._due_heap: List[Tuple[date, int]] = []  # (due, loan_id); stale entries skipped lazily
+        self._returned: List[Loan] = []            # returned since the last compaction
+        self._next_loan = 1
+        self._pending: List[str] = []
+        self._batch_depth = 0
+        self._signature = None
+        with self.system.lock, self.system._file_locked(shared=True):
+            self.load()
+        system.delete_guards.append(self._refuse_delete)
+
+    # ---------- persistence ----------
+    def load(self):
+        self.members, self.loans, self.by_member, self.by_isbn = {}, {}, {}, {}
+        self._due_heap, self._returned, self._next_loan = [], [], 1
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snap = json.load(f)
+            for m in snap.get("members", []):
+                self._apply({"op": "member", "member": m})
+            for loan in snap.get("loans", []):
+                self._apply({"op": "checkout", "loan": loan})
+            self._next_loan = max(self._next_loan, snap.get("next_loan", 1))
+        for rec in self.wal.replay_records():
+            self._apply(rec)
+        heapq.heapify(self._due_heap)
+        self._signature = self._file_signature()
+
+    def _file_signature(self) -> Tuple:
+        """(inode, size, mtime) of the snapshot and the log, None for a missing file."""
+        out = []
+        for path in (self.snapshot_path, self.wal.path):
+            try:
+                st = os.stat(path)
+            except OSError:
+                out.append(None)
+                continue
+            out.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        return tuple(out)
+
+    def reload_if_changed(self) -> bool:
+        """Re-read the ledger if another process changed it since we last read or wrote it."""
+        with self.system.lock:
+            if self._pending or self._file_signature() == self._signature:
+                return False
+            self.load()
+            return True
+
+    @contextmanager
+    def _locked(self):
+        """
+        Scope of one operation: the catalog's file lock, with the catalog
+        and the ledger brought up to date with other processes first.
+        """
+        with self.system.lock, self.system._file_locked():
+            self.system.reload_if_changed()
+            self.reload_if_changed()
+            yield
+
+    def _apply(self, rec: Dict):
+        """Apply one logged event to the in-memory ledger (no validation, no logging)."""
+        op = rec["op"]
+        if op == "member":
+            m = Member.from_dict(rec["member"])
+            self.members[m.member_id] = m
+        elif op == "checkout":
+            loan = Loan.from_dict(rec["loan"])
+            self.loans[loan.loan_id] = loan
+            self.by_member.setdefault(loan.member_id, set()).add(loan.loan_id)
+            self.by_isbn.setdefault(loan.isbn, set()).add(loan.loan_id)
+            self._due_heap.append((loan.due, loan.loan_id))
+            self._next_loan = max(self._next_loan, loan.loan_id + 1)
+        elif op == "renew":
+            loan = self.loans[rec["loan_id"]]
+            loan.due = date.fromisoformat(rec["due"])
+            loan.renewals += 1
+            self._due_heap.append((loan.due, loan.loan_id))
+        elif op == "return":
+            loan = self.loans.pop(rec["loan_id"])
+            loan.returned = date.fromisoformat(rec["returned"])
+            self._discard(self.by_member, loan.member_id, loan.loan_id)
+            self._discard(self.by_isbn, loan.isbn, loan.loan_id)
+            self._returned.append(loan)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[int]], key: str, loan_id: int):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(loan_id)
+            if not ids:
+                del index[key]
+
+    def _record(self, rec: Dict):
+        """Apply rec and log it; flushed now or at the end of the enclosing batch."""
+        self._apply(rec)
+        if rec["op"] in ("checkout", "renew"):
+            heapq.heappush(self._due_heap, self._due_heap.pop())  # restore the heap property
+        self._pending.append(WriteAheadLog.frame(rec))
+        if not self._batch_depth:
+            self.commit()
+
+    @contextmanager
+    def batch(self):
+        """Log everything inside the block with a single write."""
+        with self._locked():
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.commit()
+
+    def commit(self):
+        with self.system.lock, self.system._file_locked():
+            if self._pending:
+                pending, self._pending = self._pending, []
+                self.wal.append_encoded("".join(pending), len(pending))
+                self._signature = self._file_signature()
+                if self.wal.records >= self.compact_every:
+                    self.compact()
+
+    def compact(self):
+        """Fold the log into the snapshot and move returned loans to the history file."""
+        with self._locked():
+            self.commit()
+            if self._returned:
+                with open(self.history_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(loan.to_dict()) + "\n" for loan in self._returned)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._returned = []
+            snap = {
+                "members": [m.to_dict() for m in self.members.values()],
+                "loans": [loan.to_dict() for loan in self.loans.values()],
+                "next_loan": self._next_loan,
+            }
+            atomic_write_text(self.snapshot_path, json.dumps(snap), fsync=self.wal.durability != "none")
+            self.wal.truncate()
+            self._signature = self._file_signature()
+
+    def close(self):
+        self.commit()
+        self.wal.close()
+        if self._refuse_delete in self.system.delete_guards:
+            self.system.delete_guards.remove(self._refuse_delete)
+
+    def _refuse_delete(self, book):
+        """Catalog delete guard: a book with copies on loan stays in the catalog."""
+        with self._locked():
+            if self.on_loan(book.isbn):
+                raise CirculationError(f"{book.isbn} has {self.on_loan(book.isbn)} copies on loan")
+
+    # ---------- operations ----------
+    def add_member(self, member_id: str, name: str) -> Member:
+        with self._locked():
+            if member_id in self.members:
+                raise CirculationError(f"member {member_id} already exists")
+            self._record({"op": "member", "member": {"member_id": member_id, "name": name}})
+            return self.members[member_id]
+
+    def checkout(self, member_id: str, isbn: str, today: Optional[date] = None) -> Loan:
+        with self._locked():  # the availability check and the loan id are one step
+            if member_id not in self.members:
+                raise CirculationError(f"no member {member_id}")
+            if self.system.get_book(isbn) is None:
+                raise CirculationError(f"no book {isbn}")
+            if self.available(isbn) <= 0:
+                raise CirculationError(f"no copies of {isbn} available")
+            today = today or date.today()
+            loan = Loan(self._next_loan, member_id, isbn, today, today + timedelta(days=self.loan_days))
+            self._record({"op": "checkout", "loan": loan.to_dict()})
+            return self.loans[loan.loan_id]
+
+    def return_loan(self, loan_id: int, today: Optional[date] = None) -> Loan:
+        with self._locked():
+            if loan_id not in self.loans:
+                raise CirculationError(f"loan {loan_id} is not active")
+            loan = self.loans[loan_id]
+            self._record({"op": "return", "loan_id": loan_id, "returned": (today or date.today()).isoformat()})
+            return loan
+
+    def return_book(self, member_id: str, isbn: str, today: Optional[date] = None) -> Loan:
+        """Return the member's oldest active loan of isbn."""
+        with self._locked():
+            ids = self.by_member.get(member_id, set()) & self.by_isbn.get(isbn, set())
+            if not ids:
+                raise CirculationError(f"{member_id} has no loan of {isbn}")
+            return self.return_loan(min(ids), today)
+
+    def renew(self, loan_id: int, today: Optional[date] = None) -> Loan:
+        with self._locked():
+            loan = self.loans.get(loan_id)
+            if loan is None:
+                raise CirculationError(f"loan {loan_id} is not active")
+            if loan.renewals >= self.max_renewals:
+                raise CirculationError(f"loan {loan_id} was already renewed {loan.renewals} times")
+            due = max(loan.due, today or date.today()) + timedelta(days=self.loan_days)
+            self._record({"op": "renew", "loan_id": loan_id, "due": due.isoformat()})
+            return loan
+
+    # ---------- queries ----------
+    def on_loan(self, isbn: str) -> int:
+        return len(self.by_isbn.get(isbn, ()))
+
+    def available(self, isbn: str) -> int:
+        book = self.system.get_book(isbn)
+        return max(0, book.copies - self.on_loan(isbn)) if book is not None else 0
+
+    def status(self, isbn: str) -> Tuple[int, int]:
+        """(available, total) copies of isbn."""
+        book = self.system.get_book(isbn)
+        return (self.available(isbn), book.copies) if book is not None else (0, 0)
+
+    def loans_for_member(self, member_id: str) -> List[Loan]:
+        return sorted((self.loans[i] for i in self.by_member.get(member_id, ())), key=lambda l: l.loan_id)
+
+    def loans_for_isbn(self, isbn: str) -> List[Loan]:
+        return sorted((self.loans[i] for i in self.by_isbn.get(isbn, ())), key=lambda l: l.loan_id)
+
+    def _live(self, entry: Tuple[date, int]) -> bool:
+        loan = self.loans.get(entry[1])
+        return loan is not None and loan.due == entry[0]
+
+    def iter_due(self) -> Iterator[Loan]:
+        """
+        Active loans by due date. Walks the heap best-first without popping,
+        so taking the first k costs O(k log k) plus the stale entries met.
+        """
+        heap = self._due_heap
+        while heap and not self._live(heap[0]):
+            heapq.heappop(heap)  # drop returned/renewed entries from the top for good
+        if len(heap) > 2 * len(self.loans) + 64:  # too many stale entries below the top
+            self._due_heap = heap = [(loan.due, loan.loan_id) for loan in self.loans.values()]
+            heapq.heapify(heap)
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            entry, i = heapq.heappop(frontier)
+            if self._live(entry):
+                yield self.loans[entry[1]]
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def overdue(self, today: Optional[date] = None, limit: Optional[int] = None) -> List[Loan]:
+        """Loans due before today, most overdue first."""
+        today = today or date.today()
+        out = []
+        for loan in self.iter_due():
+            if loan.due >= today or (limit is not None and len(out) >= limit):
+                break
+            out.append(loan)
+        return out
+
+    def due_within(self, days: int, today: Optional[date] = None) -> List[Loan]:
+        """Loans due from today up to today + days (inclusive), soonest first."""
+        today = today or date.today()
+        until = today + timedelta(days=days)
+        out = []
+        for loan in self.iter_due():
+            if loan.due > until:
+                break
+            if loan.due >= today:
+                out.append(loan)
+        return out
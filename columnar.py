@@ -0,0 +1,191 @@
+"""
+Columnar in-memory catalog.
+
+Stores the catalog as parallel columns instead of one object per book:
+titles in a list, authors interned once and referenced by id from an
+array, year and copies in machine-int arrays, plus an isbn -> row index.
+It behaves like the Dict[str, Book] LibrarySystem normally keeps, handing
+out lightweight BookView objects that read and write the columns.
+"""
+
+from array import array
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional
+
+COMPACT_RATIO = 0.25  # rebuild columns once this share of rows are deleted
+
+
+class BookView:
+    """Book-compatible object whose fields live in a ColumnarCatalog row."""
+
+    __slots__ = ("_cat", "_isbn")
+
+    def __init__(self, catalog: "ColumnarCatalog", isbn: str):
+        self._cat = catalog
+        self._isbn = isbn
+
+    def _row(self) -> int:
+        return self._cat.rows[self._isbn]
+
+    @property
+    def isbn(self):
+        return self._isbn
+
+    @property
+    def title(self):
+        return self._cat.titles[self._row()]
+
+    @title.setter
+    def title(self, value):
+        self._cat.titles[self._row()] = value
+
+    @property
+    def author(self):
+        return self._cat.author_names[self._cat.author_ids[self._row()]]
+
+    @author.setter
+    def author(self, value):
+        self._cat.author_ids[self._row()] = self._cat.intern_author(value)
+
+    @property
+    def year(self):
+        return self._cat.years[self._row()]
+
+    @year.setter
+    def year(self, value):
+        self._cat.years[self._row()] = int(value)
+
+    @property
+    def copies(self):
+        return self._cat.copies[self._row()]
+
+    @copies.setter
+    def copies(self, value):
+        self._cat.copies[self._row()] = int(value)
+
+    def to_dict(self) -> Dict:
+        return {
+            "isbn": self._isbn,
+            "title": self.title,
+            "author": self.author,
+            "year": self.year,
+            "copies": self.copies,
+        }
+
+    def detach(self) -> "DetachedBook":
+        """Copy that stays valid after the row is deleted."""
+        return DetachedBook(self.to_dict())
+
+    def __repr__(self):
+        return f"BookView({self._isbn!r})"
+
+
+class DetachedBook:
+    """Snapshot of a deleted row, as handed to listeners by pop()."""
+
+    __slots__ = ("isbn", "title", "author", "year", "copies")
+
+    def __init__(self, d: Dict):
+        self.isbn = d["isbn"]
+        self.title = d["title"]
+        self.author = d["author"]
+        self.year = d["year"]
+        self.copies = d["copies"]
+
+    def to_dict(self) -> Dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class ColumnarCatalog(MutableMapping):
+    """
+    isbn -> Book mapping backed by columns. Iteration follows insertion
+    order like a dict; deleted rows are tombstoned and the columns are
+    compacted once tombstones pass COMPACT_RATIO of the rows.
+    """
+
+    def __init__(self):
+        self.rows: Dict[str, int] = {}
+        self.isbns: List[Optional[str]] = []  # None marks a deleted row
+        self.titles: List[str] = []
+        self.author_ids = array("I")
+        self.author_names: List[str] = []
+        self.author_lookup: Dict[str, int] = {}
+        self.years = array("i")
+        self.copies = array("i")
+        self.deleted = 0
+
+    def intern_author(self, name: str) -> int:
+        aid = self.author_lookup.get(name)
+        if aid is None:
+            aid = len(self.author_names)
+            self.author_names.append(name)
+            self.author_lookup[name] = aid
+        return aid
+
+    # ---------- mapping protocol ----------
+    def __getitem__(self, isbn: str) -> BookView:
+        if isbn not in self.rows:
+            raise KeyError(isbn)
+        return BookView(self, isbn)
+
+    def get(self, isbn, default=None):
+        return BookView(self, isbn) if isbn in self.rows else default
+
+    def __contains__(self, isbn) -> bool:
+        return isbn in self.rows
+
+    def __setitem__(self, isbn: str, book):
+        title, aid = book.title, self.intern_author(book.author)
+        year, copies = int(book.year), int(book.copies)
+        row = self.rows.get(isbn)
+        if row is None:
+            self.rows[isbn] = len(self.isbns)
+            self.isbns.append(isbn)
+            self.titles.append(title)
+            self.author_ids.append(aid)
+            self.years.append(year)
+            self.copies.append(copies)
+        else:
+            self.titles[row] = title
+            self.author_ids[row] = aid
+            self.years[row] = year
+            self.copies[row] = copies
+
+    def __delitem__(self, isbn: str):
+        row = self.rows.pop(isbn)
+        self.isbns[row] = None
+        self.titles[row] = ""
+        self.deleted += 1
+        if self.deleted > COMPACT_RATIO * len(self.isbns):
+            self.compact()
+
+    def pop(self, isbn, *default):
+        if isbn not in self.rows:
+            if default:
+                return default[0]
+            raise KeyError(isbn)
+        book = BookView(self, isbn).detach()
+        del self[isbn]
+        return book
+
+    def __iter__(self) -> Iterator[str]:
+        for isbn in self.isbns:
+            if isbn is not None:
+                yield isbn
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def clear(self):
+        self.__init__()
+
+    def compact(self):
+        """Drop tombstoned rows and rebuild the isbn index."""
+        keep = [row for row, isbn in enumerate(self.isbns) if isbn is not None]
+        self.isbns = [self.isbns[r] for r in keep]
+        self.titles = [self.titles[r] for r in keep]
+        self.author_ids = array("I", (self.author_ids[r] for r in keep))
+        self.years = array("i", (self.years[r] for r in keep))
+        self.copies = array("i", (self.copies[r] for r in keep))
+        self.rows = {isbn: row for row, isbn in enumerate(self.isbns)}
+        self.deleted = 0
@@ -0,0 +1,149 @@
+"""
+Streaming CSV export shared by the CLI and the GUI.
+Rows are pulled from a generator and written in large buffered chunks,
+optionally gzip-compressed and/or split into part files of N rows.
+write_changes writes delta exports (only what changed since a checkpoint)
+as CSV or JSONL.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+CSV_HEADER = ["ISBN", "Title", "Author", "Year", "Copies"]
+CHANGES_HEADER = ["Change", "Seq"] + CSV_HEADER
+CHANGE_FORMATS = ("csv", "jsonl")
+CHUNK_ROWS = 5000
+BUFFER_BYTES = 1 << 20
+
+
+class ExportReport:
+    """Result of an export: files written, row count and throughput."""
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self.rows = 0
+        self.seconds = 0.0
+        self.checkpoint: Optional[int] = None  # change tracking: pass to the next delta export
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def __str__(self):
+        where = self.paths[0] if len(self.paths) == 1 else f"{len(self.paths)} files"
+        text = f"{self.rows} rows to {where} in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s)"
+        return text if self.checkpoint is None else f"{text}, checkpoint {self.checkpoint}"
+
+
+def part_path(path: str, part: int) -> str:
+    """books.csv -> books.part0001.csv (books.csv.gz -> books.part0001.csv.gz)."""
+    gz = ".gz" if path.endswith(".gz") else ""
+    root, ext = os.path.splitext(path[:len(path) - len(gz)])
+    return f"{root}.part{part:04d}{ext}{gz}"
+
+
+def _open(path: str, compress: bool):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if compress:
+        raw = gzip.open(path, "wb", compresslevel=6)
+        return io.TextIOWrapper(io.BufferedWriter(raw, BUFFER_BYTES), encoding="utf-8", newline="")
+    return open(path, "w", newline="", encoding="utf-8", buffering=BUFFER_BYTES)
+
+
+def write_csv(books: Iterable, path: str, header: Optional[List[str]] = None,
+              compress: bool = False, part_rows: Optional[int] = None,
+              progress: Optional[Callable[[int, Optional[int]], None]] = None,
+              total: Optional[int] = None) -> ExportReport:
+    """
+    Write books (any iterable of Book-like objects) as CSV.
+
+    compress appends ".gz" to path and gzips the output. part_rows splits
+    the output into path.part0001.csv, path.part0002.csv, ... each with its
+    own header. progress(rows_written, total) is called after every chunk.
+    """
+    if part_rows is not None and part_rows < 1:
+        raise ValueError(f"part_rows must be at least 1, not {part_rows}")
+    header = header or CSV_HEADER
+    if compress and not path.endswith(".gz"):
+        path += ".gz"
+    report = ExportReport()
+    start = time.perf_counter()
+    out = writer = None
+    in_part = 0
+    chunk = []
+
+    def flush():
+        nonlocal out, writer, in_part
+        rows = chunk
+        while rows:
+            if out is None:
+                target = path if not part_rows else part_path(path, len(report.paths) + 1)
+                out = _open(target, compress)
+                writer = csv.writer(out)
+                writer.writerow(header)
+                report.paths.append(target)
+                in_part = 0
+            take = len(rows) if not part_rows else min(len(rows), part_rows - in_part)
+            writer.writerows(rows[:take])
+            in_part += take
+            report.rows += take
+            rows = rows[take:]
+            if part_rows and in_part >= part_rows:
+                out.close()
+                out = None
+        if progress is not None:
+            progress(report.rows, total)
+
+    try:
+        for b in books:
+            chunk.append((b.isbn, b.title, b.author, b.year, b.copies))
+            if len(chunk) >= CHUNK_ROWS:
+                flush()
+                chunk = []
+        flush()
+        if not report.paths:  # nothing to export: still leave a header-only file
+            target = path if not part_rows else part_path(path, 1)
+            out = _open(target, compress)
+            csv.writer(out).writerow(header)
+            report.paths.append(target)
+    finally:
+        if out is not None:
+            out.close()
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def write_changes(changes: Iterable[Tuple[int, str, Optional[object]]], path: str,
+                  fmt: Optional[str] = None) -> ExportReport:
+    """
+    Write a delta export from (seq, isbn, book) triples: "upsert" rows
+    carry the book's current fields, "delete" rows (book is None) only its
+    isbn. fmt is "csv" or "jsonl"; by default taken from path's extension.
+    """
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    if fmt not in CHANGE_FORMATS:
+        raise ValueError(f"unknown delta format {fmt!r}; choose from {', '.join(CHANGE_FORMATS)}")
+    report = ExportReport()
+    start = time.perf_counter()
+    with _open(path, False) as out:
+        writer = csv.writer(out) if fmt == "csv" else None
+        if writer is not None:
+            writer.writerow(CHANGES_HEADER)
+        for seq, isbn, b in changes:
+            if writer is not None:
+                writer.writerow(("upsert", seq, b.isbn, b.title, b.author, b.year, b.copies) if b is not None
+                                else ("delete", seq, isbn, "", "", "", ""))
+            else:
+                rec = {"op": "upsert" if b is not None else "delete", "seq": seq, "isbn": isbn}
+                if b is not None:
+                    rec.update(title=b.title, author=b.author, year=b.year, copies=b.copies)
+                out.write(json.dumps(rec) + "\n")
+            report.rows += 1
+    report.paths.append(path)
+    report.seconds = time.perf_counter() - start
+    return report
@@ -1,11 +1,15 @@
 
-import json
 from pathlib import Path
-import csv
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import sys
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
 
+from LMS import Book, LibrarySystem
+import instrumentation
+
 BOOKS_FILE = Path("books.json")   # same filename used in your LMS.py. See your CLI: :contentReference[oaicite:3]{index=3} and data example: :contentReference[oaicite:4]{index=4}
 REQUIRED_KEYS = ["isbn", "title", "author", "year", "copies"]
 
@@ -18,68 +22,294 @@ try:
 except Exception:
     ttkb = ttk  # fallback
 
+_library = None
+
+
+def shared_library():
+    """
+    The one in-memory LibrarySystem behind the GUI. It is reloaded only
+    when books.json changes on disk (e.g. the CLI wrote it), so page views
+    and searches no longer re-read and re-parse the file.
+    """
+    global _library
+    if _library is None:
+        _library = LibrarySystem(str(BOOKS_FILE))
+    else:
+        _library.reload_if_changed()
+    return _library
+
+
+def book_to_row(book):
+    return {k: getattr(book, k) for k in REQUIRED_KEYS}
+
+
 def read_books_as_dict():
     """
-    Read BOOKS_FILE and return a dict mapping isbn -> book_dict.
-    Accepts both dict (isbn -> book) format and list[book] format.
+    Return a dict mapping isbn -> book_dict from the shared catalog.
+    Accepts both dict (isbn -> book) format and list[book] format on disk.
     """
-    if not BOOKS_FILE.exists():
-        BOOKS_FILE.write_text("{}", encoding="utf-8")
-        return {}
-
-    try:
-        raw = json.loads(BOOKS_FILE.read_text(encoding="utf-8"))
-    except Exception as e:
-        # corrupted file: backup and recreate empty
-        try:
-            BOOKS_FILE.rename(BOOKS_FILE.with_suffix(".backup.json"))
-        except Exception:
-            pass
-        BOOKS_FILE.write_text("{}", encoding="utf-8")
-        return {}
-
-    # If it's a dict keyed by ISBN (preferred), ensure values are dicts
-    if isinstance(raw, dict):
-        books = {}
-        for k, v in raw.items():
-            # if v is not a dict (unexpected), skip
-            if not isinstance(v, dict):
-                continue
-            books[str(k)] = {rk: v.get(rk, "") for rk in REQUIRED_KEYS}
-        return books
-
-    # If it's a list of book dicts, convert to dict keyed by isbn
-    if isinstance(raw, list):
-        books = {}
-        for item in raw:
-            if not isinstance(item, dict):
-                continue
-            isbn = str(item.get("isbn", "")).strip()
-            if not isbn:
-                continue
-            books[isbn] = {rk: item.get(rk, "") for rk in REQUIRED_KEYS}
-        return books
-
-    # otherwise, unknown format -> empty
-    return {}
+    return {isbn: book_to_row(b) for isbn, b in shared_library().books.items()}
+
 
 def save_books_from_dict(books_dict):
     """
-    Save as dict keyed by ISBN to BOOKS_FILE (matching LMS.py behavior).
+    Make the shared catalog match books_dict, writing only the records that
+    actually changed. Year and copies must be numbers (ValueError otherwise).
     """
-    # ensure keys exist and values are simple types
-    out = {}
-    for isbn, b in books_dict.items():
-        rec = {}
-        for k in REQUIRED_KEYS:
-            rec[k] = "" if b.get(k) is None else str(b.get(k))
-        out[str(isbn)] = rec
-    BOOKS_FILE.write_text(json.dumps(out, indent=4), encoding="utf-8")
+    system = shared_library()
+    with system.batch():
+        for isbn in [k for k in system.books if k not in books_dict]:
+            system.delete_book(isbn)
+        for isbn, b in books_dict.items():
+            rec = {k: b.get(k) for k in REQUIRED_KEYS}
+            rec["isbn"] = str(isbn)
+            if rec.get("copies") in (None, ""):
+                rec["copies"] = 1
+            book = Book.from_dict(rec)
+            current = system.get_book(book.isbn)
+            if current is None:
+                system.add_book(book)
+            elif current.to_dict() != book.to_dict():
+                system.put_book(book)
 
 def books_dict_to_list(books_dict):
     """Return a list of book dicts for table display."""
     return [books_dict[k] for k in books_dict]
 
+# ---------- background work ----------
+class TaskRunner:
+    """
+    Runs slow catalog work (load, save, search, export) off the Tk thread.
+
+    Jobs go to a worker pool; results come back through a queue that the Tk
+    thread drains every few milliseconds via root.after, since Tk widgets
+    must only be touched from the thread running mainloop. The default
+    single worker keeps all catalog access serialized, so LibrarySystem
+    needs no extra locking. Jobs submitted on a channel supersede earlier
+    jobs on that channel: queued ones are cancelled and results of ones
+    already running are dropped, so only the latest search is rendered.
+    """
+
+    def __init__(self, root, workers=1, poll_ms=25):
+        self.root = root
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lms-gui")
+        self.inbox = queue.Queue()
+        self.latest = {}   # channel -> ticket of the newest job
+        self.futures = {}  # channel -> future of the newest job
+        self.pending = set()  # futures not finished yet, cancelled on shutdown
+        self.poll_ms = poll_ms
+        self._closed = False
+        self.root.after(poll_ms, self._drain)
+
+    def submit(self, fn, on_done=None, on_error=None, channel=None):
+        ticket = object()
+        if channel is not None:
+            previous = self.futures.get(channel)
+            if previous is not None:
+                previous.cancel()
+            self.latest[channel] = ticket
+
+        def job():
+            try:
+                result = fn()
+            except Exception as e:
+                self.post(self._finish, channel, ticket, on_error or self._report, e)
+            else:
+                self.post(self._finish, channel, ticket, on_done, result)
+
+        future = self.pool.submit(job)
+        self.pending.add(future)
+        future.add_done_callback(self.pending.discard)
+        if channel is not None:
+            self.futures[channel] = future
+        return future
+
+    def post(self, fn, *args):
+        """Call fn(*args) on the Tk thread (safe to use from any thread)."""
+        self.inbox.put((fn, args))
+
+    def _finish(self, channel, ticket, callback, value):
+        if channel is not None and self.latest.get(channel) is not ticket:
+            return  # superseded by a newer job on this channel
+        if callback is not None:
+            callback(value)
+
+    @staticmethod
+    def _report(error):
+        messagebox.showerror("Error", str(error))
+
+    def _drain(self):
+        try:
+            while True:
+                try:
+                    fn, args = self.inbox.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    fn(*args)
+                except Exception:  # one broken callback must not stop the ones after it
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            if not self._closed:
+                self.root.after(self.poll_ms, self._drain)
+
+    def shutdown(self):
+        self._closed = True
+        for future in list(self.pending):  # by hand: cancel_futures= needs Python 3.9
+            future.cancel()
+        self.pool.shutdown(wait=True)
+
+
+# ---------- virtual table ----------
+class VirtualTable:
+    """
+    Treeview showing a window over an arbitrarily long list of books.
+
+    Only the rows that fit in the widget exist as Treeview items; scrolling
+    rewrites their values in place, so drawing costs the same for 10 books
+    or a million. Rows are addressed through a cursor of ISBNs (self.keys)
+    and looked up in the LibrarySystem only when they become visible.
+    Clicking a column heading orders the cursor by that column's sorted
+    index instead of re-sorting widget rows.
+    """
+
+    COLUMNS = ("isbn", "title", "author", "year", "copies")
+
+    def __init__(self, parent, system, height=18, runner=None):
+        self.system = system
+        self.runner = runner    # TaskRunner for index work, or None to sort inline
+        self.height = height
+        self.keys = []          # ISBNs in display order
+        self.offset = 0         # index in keys of the first visible row
+        self.follow_adds = False  # whole-catalog view: new books are appended
+        self.sort_col = None
+        self.sort_desc = False
+        self.items = []         # pooled Treeview item ids, one per visible row
+        self.tree = ttk.Treeview(parent, columns=self.COLUMNS, show="headings", height=height)
+        for c in self.COLUMNS:
+            self.tree.heading(c, text=c.upper(), command=lambda c=c: self.sort_by(c))
+            self.tree.column(c, width=180 if c == "title" else 100, anchor="w")
+        self.scroll = ttk.Scrollbar(parent, orient="vertical", command=self.on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scroll.pack(side="right", fill="y")
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_to(self.offset - (1 if e.delta > 0 else -1) * 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_to(self.offset - 3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_to(self.offset + 3))
+        self.tree.bind("<Prior>", lambda e: self.scroll_to(self.offset - self.height))
+        self.tree.bind("<Next>", lambda e: self.scroll_to(self.offset + self.height))
+
+    def destroy(self):
+        self.tree.destroy()
+        self.scroll.destroy()
+
+    # ---------- data ----------
+    def set_keys(self, keys, follow_adds=False):
+        self.keys = list(keys)
+        self.follow_adds = follow_adds
+        self.offset = 0
+        self.render()
+        if self.sort_col:
+            self._apply_sort()
+
+    def sort_by(self, col):
+        if self.sort_col == col:
+            self.sort_desc = not self.sort_desc
+        else:
+            self.sort_col, self.sort_desc = col, False
+        for c in self.COLUMNS:
+            arrow = (" \u25bc" if self.sort_desc else " \u25b2") if c == col else ""
+            self.tree.heading(c, text=c.upper() + arrow)
+        self._apply_sort()
+
+    def _apply_sort(self):
+        keys, col, desc = list(self.keys), self.sort_col, self.sort_desc
+
+        def done(ordered):
+            if not self.tree.winfo_exists():
+                return  # the table was replaced while sorting
+            self.keys = ordered
+            self.offset = 0
+            self.render()
+
+        if self.runner is None:
+            done(self._sorted(keys, col, desc))
+        else:
+            self.runner.submit(lambda: self._sorted(keys, col, desc), on_done=done, channel=("sort", id(self)))
+
+    def _sorted(self, keys, col, desc):
+        index = self.system.indexes[col]
+        if len(keys) * 8 >= len(self.system.books):
+            # large share of the catalog: walk the index order and keep our rows
+            wanted = set(keys)
+            ordered = [isbn for isbn in index.range() if isbn in wanted]
+        else:
+            books = self.system.books
+            ordered = sorted(keys, key=lambda isbn: (index.key(books[isbn]), isbn))
+        if desc:
+            ordered.reverse()
+        return ordered
+
+    # ---------- drawing ----------
+    def render(self):
+        window = self.keys[self.offset:self.offset + self.height]
+        while len(self.items) < len(window):
+            self.items.append(self.tree.insert("", "end", values=()))
+        while len(self.items) > len(window):
+            self.tree.delete(self.items.pop())
+        books = self.system.books if window else {}
+        for iid, isbn in zip(self.items, window):
+            b = books.get(isbn)
+            self.tree.item(iid, values=(b.isbn, b.title, b.author, b.year, b.copies) if b else (isbn,))
+        self.tree.selection_remove(self.tree.selection())
+        total = len(self.keys)
+        if total:
+            self.scroll.set(self.offset / total, min(1.0, (self.offset + len(window)) / total))
+        else:
+            self.scroll.set(0.0, 1.0)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), len(self.keys) - self.height))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * len(self.keys))
+        elif unit == "pages":
+            self.scroll_to(self.offset + int(amount) * self.height)
+        else:
+            self.scroll_to(self.offset + int(amount))
+
+    # ---------- incremental updates (LibrarySystem listener) ----------
+    def on_change(self, old, new):
+        if old is not None and new is not None:
+            window = self.keys[self.offset:self.offset + self.height]
+            if new.isbn in window:
+                iid = self.items[window.index(new.isbn)]
+                self.tree.item(iid, values=(new.isbn, new.title, new.author, new.year, new.copies))
+            return
+        if new is not None and self.follow_adds:
+            self.keys.append(new.isbn)
+        elif old is not None:
+            try:
+                self.keys.remove(old.isbn)
+            except ValueError:
+                return
+            self.offset = max(0, min(self.offset, len(self.keys) - self.height))
+        self.render()
+
+    def on_reset(self, books):
+        if self.follow_adds:
+            self.keys = list(books)
+        else:
+            self.keys = [isbn for isbn in self.keys if isbn in books]
+        self.offset = max(0, min(self.offset, len(self.keys) - self.height))
+        self.render()
+        if self.sort_col and self.follow_adds:
+            self._apply_sort()
+
+
 # ---------- GUI application ----------
 class LibraryGUI:
     def __init__(self, root):
@@ -112,6 +342,7 @@ class LibraryGUI:
         Button(sidebar, text="View All", width=18, command=self.view_page).pack(pady=6)
         Button(sidebar, text="Update", width=18, command=self.update_page).pack(pady=6)
         Button(sidebar, text="Delete", width=18, command=self.delete_page).pack(pady=6)
+        Button(sidebar, text="Dashboard", width=18, command=self.dashboard_page).pack(pady=6)
         Button(sidebar, text="Export CSV", width=18, command=self.export_csv).pack(pady=10)
 
         # main content
@@ -120,11 +351,87 @@ class LibraryGUI:
 
         # prepare table placeholder
         self.table_frame = None
+        self.table = None
         self.tree = None
+        self._search_job = None
+        self.search_ent = None
+        self.dash_trees = None
+
+        self.status = ttk.Label(sidebar, text="", wraplength=180)
+        self.status.pack(side="bottom", pady=6)
+
+        # the catalog is loaded on the worker; pages wait for it
+        self.runner = TaskRunner(root)
+        self.system = None
+        self.set_status("Loading catalog...")
+        self.runner.submit(shared_library, on_done=self._loaded)
+        self.view_page()
 
+    def _loaded(self, system):
+        self.system = system
+        self.system.listeners.append(self)
+        self.set_status(f"{len(system.books)} books loaded")
         self.view_page()
 
+    def set_status(self, text):
+        self.status.config(text=text)
+
+    def ready(self):
+        if self.system is None:
+            messagebox.showinfo("Please wait", "The catalog is still loading.")
+            return False
+        return True
+
+    def run(self, fn, on_done=None, channel=None, status=None):
+        """Run fn(system) on the worker after picking up outside changes to books.json."""
+        if status:
+            self.set_status(status)
+
+        def job():
+            self.system.reload_if_changed()
+            return fn(self.system)
+
+        def done(result):
+            if status:
+                self.set_status("")
+            if on_done is not None:
+                on_done(result)
+
+        def failed(error):
+            self.set_status("")
+            messagebox.showerror("Error", str(error))
+
+        return self.runner.submit(job, on_done=done, on_error=failed, channel=channel)
+
+    def close(self):
+        self.runner.shutdown()
+        if self.system is not None:
+            self.system.close()
+        self.root.destroy()
+
+    # LibrarySystem listener: called on the worker thread, so table
+    # updates are handed to the Tk thread in order
+    def on_change(self, old, new):
+        self.runner.post(self._table_change, old, new)
+
+    def on_reset(self, books):
+        self.runner.post(self._table_reset, dict.fromkeys(books))
+
+    def _table_change(self, old, new):
+        if self.table is not None:
+            self.table.on_change(old, new)
+
+    def _table_reset(self, keys):
+        if self.table is not None:
+            self.table.on_reset(keys)
+
     def clear_content(self):
+        self.table = None
+        self.search_ent = None
+        self.dash_trees = None
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+            self._search_job = None
         for w in self.content.winfo_children():
             w.destroy()
 
@@ -146,22 +453,27 @@ class LibraryGUI:
         ttk.Button(self.content, text="Add", command=self.gui_add).pack(pady=8, anchor="w")
 
     def gui_add(self):
-        data = read_books_as_dict()
+        if not self.ready():
+            return
         isbn = self.add_entries["ISBN"].get().strip()
         if not isbn:
             messagebox.showerror("Input Error", "ISBN required")
             return
-        if isbn in data:
-            messagebox.showerror("Error", "ISBN already exists")
-            return
         rec = {k.lower(): self.add_entries[k].get().strip() for k in self.add_entries}
-        # ensure required keys
-        for k in REQUIRED_KEYS:
-            rec.setdefault(k, "")
-        data[isbn] = rec
-        save_books_from_dict(data)
-        messagebox.showinfo("Success", "Book added")
-        self.view_page()
+        try:
+            book = Book(isbn, rec["title"], rec["author"], int(rec["year"]), int(rec["copies"] or 1))
+        except ValueError:
+            messagebox.showerror("Input Error", "Year and copies must be numbers")
+            return
+
+        def done(added):
+            if not added:
+                messagebox.showerror("Error", "ISBN already exists")
+                return
+            messagebox.showinfo("Success", "Book added")
+            self.view_page()
+
+        self.run(lambda system: system.add_book(book), on_done=done, status="Saving...")
 
     # ---------- Search ----------
     def search_page(self):
@@ -170,21 +482,42 @@ class LibraryGUI:
         frm = ttk.Frame(self.content); frm.pack(anchor="w", pady=6)
         ttk.Label(frm, text="Keyword:", width=12).grid(row=0, column=0)
         self.search_ent = ttk.Entry(frm, width=44); self.search_ent.grid(row=0, column=1)
+        self.search_ent.bind("<KeyRelease>", self.schedule_search)
+        self.search_ent.bind("<Return>", lambda e: self.gui_search())
         ttk.Button(self.content, text="Search", command=self.gui_search).pack(pady=6, anchor="w")
         self.table_frame = ttk.Frame(self.content); self.table_frame.pack(fill="both", expand=True, pady=6)
         self.create_table()
         self.update_table([])
 
+    SEARCH_DELAY_MS = 250
+    SEARCH_LIMIT = 200  # best matches shown; typos are tolerated
+
+    def schedule_search(self, event=None):
+        """Search-as-you-type: run once typing pauses for SEARCH_DELAY_MS."""
+        if event is not None and event.keysym == "Return":
+            return
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(self.SEARCH_DELAY_MS, self.gui_search)
+
     def gui_search(self):
-        q = self.search_ent.get().strip().lower()
-        if not q:
-            result = list(read_books_as_dict().values())
-        else:
-            result = []
-            for b in read_books_as_dict().values():
-                if q in str(b.get("isbn","")).lower() or q in str(b.get("title","")).lower() or q in str(b.get("author","")).lower():
-                    result.append(b)
-        self.update_table(result)
+        self._search_job = None
+        if not self.ready():
+            return
+        q = self.search_ent.get().strip()
+        table = self.table
+
+        def search(system):
+            if not q:
+                return list(system.books)
+            return [b.isbn for b in system.search(q, limit=self.SEARCH_LIMIT, ranked=True)]
+
+        def done(keys):
+            if self.table is table:
+                self.update_table(keys)
+
+        # a newer search cancels or discards this one
+        self.run(search, on_done=done, channel="search")
 
     # ---------- View All ----------
     def view_page(self):
@@ -192,7 +525,15 @@ class LibraryGUI:
         ttk.Label(self.content, text="All Books", font=("Arial",16,"bold")).pack(pady=8) if USE_TTB else ttk.Label(self.content, text="All Books", font=("Arial",16,"bold")).pack(pady=8)
         self.table_frame = ttk.Frame(self.content); self.table_frame.pack(fill="both", expand=True, pady=6)
         self.create_table()
-        self.update_table(list(read_books_as_dict().values()))
+        if self.system is None:
+            return  # _loaded() shows the page again once the catalog is in
+        table = self.table
+
+        def done(keys):
+            if self.table is table:
+                self.update_table(keys, follow_adds=True)
+
+        self.run(lambda system: list(system.books), on_done=done, channel="search")
 
     # ---------- Update ----------
     def update_page(self):
@@ -210,27 +551,33 @@ class LibraryGUI:
         ttk.Button(self.content, text="Apply Update", command=self.gui_update).pack(pady=8, anchor="w")
 
     def gui_update(self):
+        if not self.ready():
+            return
         isbn = self.up_isbn.get().strip()
         if not isbn:
             messagebox.showerror("Input Error", "ISBN required to identify record")
             return
-        data = read_books_as_dict()
-        if isbn not in data:
-            messagebox.showerror("Not found", "ISBN not present")
-            return
-        b = data[isbn]
         nt = self.update_entries["New Title"].get().strip()
         na = self.update_entries["New Author"].get().strip()
         ny = self.update_entries["New Year"].get().strip()
         nc = self.update_entries["New Copies"].get().strip()
-        if nt: b["title"] = nt
-        if na: b["author"] = na
-        if ny: b["year"] = ny
-        if nc: b["copies"] = nc
-        data[isbn] = b
-        save_books_from_dict(data)
-        messagebox.showinfo("Success", "Book updated")
-        self.view_page()
+        try:
+            year = int(ny) if ny else None
+            copies = int(nc) if nc else None
+        except ValueError:
+            messagebox.showerror("Input Error", "Year and copies must be numbers")
+            return
+
+        def done(updated):
+            if not updated:
+                messagebox.showerror("Not found", "ISBN not present")
+                return
+            messagebox.showinfo("Success", "Book updated")
+            self.view_page()
+
+        self.run(lambda system: system.update_book(isbn, title=nt or None, author=na or None,
+                                                   year=year, copies=copies),
+                 on_done=done, status="Saving...")
 
     # ---------- Delete ----------
     def delete_page(self):
@@ -242,57 +589,134 @@ class LibraryGUI:
         ttk.Button(self.content, text="Delete", command=self.gui_delete).pack(pady=8, anchor="w")
 
     def gui_delete(self):
+        if not self.ready():
+            return
         isbn = self.del_isbn.get().strip()
         if not isbn:
             messagebox.showerror("Input Error", "ISBN required")
             return
-        data = read_books_as_dict()
-        if isbn not in data:
+        book = self.system.get_book(isbn)
+        if not book:
             messagebox.showerror("Not found", "ISBN not present")
             return
-        if not messagebox.askyesno("Confirm", f"Delete '{data[isbn].get('title','')}'?"):
+        if not messagebox.askyesno("Confirm", f"Delete '{book.title}'?"):
             return
-        del data[isbn]
-        save_books_from_dict(data)
-        messagebox.showinfo("Deleted", "Book deleted")
-        self.view_page()
+
+        def done(deleted):
+            messagebox.showinfo("Deleted", "Book deleted")
+            self.view_page()
+
+        self.run(lambda system: system.delete_book(isbn), on_done=done, status="Saving...")
+
+    # ---------- Dashboard ----------
+    def dashboard_page(self):
+        self.clear_content()
+        ttk.Label(self.content, text="Dashboard", font=("Arial",16,"bold")).pack(pady=8)
+        self.dash_summary = ttk.Label(self.content, text="Counting...", font=("Arial",12))
+        self.dash_summary.pack(anchor="w", pady=4)
+        btns = ttk.Frame(self.content); btns.pack(anchor="w", pady=4)
+        ttk.Button(btns, text="Refresh", command=self.gui_dashboard).pack(side="left", padx=(0, 6))
+        ttk.Button(btns, text="Verify", command=self.gui_verify_stats).pack(side="left")
+        grids = ttk.Frame(self.content); grids.pack(fill="both", expand=True, pady=6)
+        self.dash_trees = {}
+        for col, (name, title, headings) in enumerate((
+                ("authors", "Top authors", ("Author", "Titles", "Copies")),
+                ("decades", "By decade", ("Decade", "Titles", "Copies")),
+                ("low", "Low stock", ("ISBN", "Title", "Copies")))):
+            box = ttk.Frame(grids); box.grid(row=0, column=col, sticky="nsew", padx=4)
+            grids.columnconfigure(col, weight=1)
+            ttk.Label(box, text=title, font=("Arial",11,"bold")).pack(anchor="w")
+            tree = ttk.Treeview(box, columns=headings, show="headings", height=16)
+            for h in headings:
+                tree.heading(h, text=h)
+                tree.column(h, width=60 if h in ("Titles", "Copies") else 140, anchor="w")
+            tree.pack(fill="both", expand=True)
+            self.dash_trees[name] = tree
+        self.gui_dashboard()
+
+    def gui_dashboard(self):
+        if self.system is None:
+            return  # _loaded() shows the view page; the dashboard is one click away
+        trees = self.dash_trees
+
+        def done(report):
+            if self.dash_trees is not trees:
+                return  # the page was left meanwhile
+            self.dash_summary.config(text=f"{report['titles']:,} titles, {report['copies']:,} copies, "
+                                          f"{report['authors']:,} authors, "
+                                          f"{report['low_stock_total']:,} low on stock")
+            rows = {"authors": report["top_authors"], "low": report["low_stock"],
+                    "decades": [(f"{d}s", t, c) for d, t, c in report["decades"]]}
+            for name, tree in trees.items():
+                tree.delete(*tree.get_children())
+                for row in rows[name]:
+                    tree.insert("", "end", values=row)
+
+        self.run(lambda system: system.analytics.report(top=20, low_limit=50), on_done=done)
+
+    def gui_verify_stats(self):
+        if not self.ready():
+            return
+
+        def verify(system):
+            problems = system.analytics.verify()
+            if problems:
+                system.analytics.rebuild()
+            return problems
+
+        def done(problems):
+            if problems:
+                messagebox.showwarning("Verify", f"{len(problems)} figures differed and were recounted:\n"
+                                       + "\n".join(problems[:10]))
+            else:
+                messagebox.showinfo("Verify", "All figures match a full scan.")
+            self.gui_dashboard()
+
+        self.run(verify, on_done=done, status="Verifying...")
 
     # ---------- Export CSV ----------
     def export_csv(self):
-        data = read_books_as_dict()
-        if not data:
-            messagebox.showinfo("Export CSV", "No data to export.")
+        if not self.ready():
             return
         csv_path = "books_export.csv"
-        with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(REQUIRED_KEYS)
-            for isbn, b in data.items():
-                writer.writerow([b.get(k,"") for k in REQUIRED_KEYS])
-        messagebox.showinfo("Export CSV", f"Exported to {csv_path}")
+        # from the Search page, export exactly the rows the search shows
+        isbns = list(self.table.keys) if self.search_ent is not None and self.table is not None else None
+
+        def progress(done, total):
+            text = f"Exported {done:,} of {total:,} rows" if total else f"Exported {done:,} rows"
+            self.runner.post(self.set_status, text)
+
+        def export(system):
+            if not system.books:
+                return None
+            return system.export(csv_path, isbns=isbns, header=REQUIRED_KEYS, progress=progress)
+
+        def done(report):
+            if report is None:
+                messagebox.showinfo("Export CSV", "No data to export.")
+            else:
+                self.set_status(f"{report.rows_per_sec:,.0f} rows/s")
+                messagebox.showinfo("Export CSV", f"Exported {report}")
+
+        self.run(export, on_done=done, status="Exporting...")
 
     # ---------- Table helpers ----------
     def create_table(self):
-        try:
-            self.tree.destroy()
-        except Exception:
-            pass
-        cols = ("isbn","title","author","year","copies")
-        self.tree = ttk.Treeview(self.table_frame, columns=cols, show="headings", height=18)
-        for c in cols:
-            self.tree.heading(c, text=c.upper())
-            self.tree.column(c, width=180 if c=="title" else 100, anchor="w")
-        self.tree.pack(fill="both", expand=True)
-
-    def update_table(self, rows):
-        # clear
-        for r in self.tree.get_children():
-            self.tree.delete(r)
-        for b in rows:
-            self.tree.insert("", "end", values=(b.get("isbn",""), b.get("title",""), b.get("author",""), b.get("year",""), b.get("copies","")))
+        if self.table is not None:
+            self.table.destroy()
+        self.table = VirtualTable(self.table_frame, self.system, runner=self.runner)
+        self.tree = self.table.tree
+
+    def update_table(self, rows, follow_adds=False):
+        """Point the table at rows (Books or ISBNs); only the visible window is drawn."""
+        self.table.set_keys((r if isinstance(r, str) else r.isbn for r in rows), follow_adds)
 
 # ---------- run ----------
 if __name__ == "__main__":
+    if instrumentation.enable_from_env():  # LMS_PROFILE=1 or LMS_PROFILE=metrics.json
+        instrumentation.instrument_system(LibrarySystem)
+        instrumentation.instrument_gui(sys.modules[__name__])
     root = tk.Tk()
     app = LibraryGUI(root)
+    root.protocol("WM_DELETE_WINDOW", app.close)
     root.mainloop()
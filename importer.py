@@ -0,0 +1,110 @@
+"""
+Streaming readers for bulk import into LibrarySystem.
+Reads CSV (as written by export_to_csv or the GUI export) or JSONL
+one record at a time so large files never sit in memory.
+"""
+
+import csv
+import json
+import os
+from typing import Dict, Iterator, List, Tuple
+
+FIELDS = ["isbn", "title", "author", "year", "copies"]
+IMPORT_POLICIES = ("insert", "upsert", "skip")
+
+
+class ImportReport:
+    """Counters returned by LibrarySystem.bulk_import."""
+
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.rejected: List[Tuple[int, str]] = []  # (row number, reason)
+        self.seconds = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def __str__(self):
+        return (f"{self.rows} rows in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s): "
+                f"{self.inserted} inserted, {self.updated} updated, "
+                f"{self.skipped} skipped, {len(self.rejected)} rejected")
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    raise ValueError(f"cannot tell the format of {path}; pass fmt='csv' or fmt='jsonl'")
+
+
+def iter_csv_records(path: str) -> Iterator[Tuple[int, Dict]]:
+    """Yield (row number, record) from a CSV whose header names the book fields (any case)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        keys = [h.strip().lower() for h in header]
+        missing = [k for k in ("isbn", "title", "author", "year") if k not in keys]
+        if missing:
+            raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+        for row_no, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            yield row_no, dict(zip(keys, row))
+
+
+def iter_jsonl_records(path: str) -> Iterator[Tuple[int, Dict]]:
+    """Yield (line number, record) from a file with one JSON object per line."""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                rec = None
+            yield line_no, rec if isinstance(rec, dict) else {"_error": "invalid JSON object"}
+
+
+def iter_records(path: str, fmt: str = None) -> Iterator[Tuple[int, Dict]]:
+    fmt = fmt or detect_format(path)
+    if fmt == "csv":
+        return iter_csv_records(path)
+    if fmt == "jsonl":
+        return iter_jsonl_records(path)
+    raise ValueError(f"unknown import format: {fmt}")
+
+
+def coerce_batch(batch: List[Tuple[int, Dict]]) -> Tuple[List[Tuple[int, Dict]], List[Tuple[int, str]]]:
+    """Validate a batch of raw records; return ((row number, clean record) list, rejected rows)."""
+    good, bad = [], []
+    for row_no, rec in batch:
+        if "_error" in rec:
+            bad.append((row_no, rec["_error"]))
+            continue
+        isbn = str(rec.get("isbn") or "").strip()
+        if not isbn:
+            bad.append((row_no, "missing isbn"))
+            continue
+        try:
+            year = int(str(rec.get("year", "")).strip())
+            copies_raw = str(rec.get("copies", "") or "").strip()
+            copies = int(copies_raw) if copies_raw else 1
+        except ValueError:
+            bad.append((row_no, "year and copies must be numbers"))
+            continue
+        good.append((row_no, {
+            "isbn": isbn,
+            "title": str(rec.get("title") or "").strip(),
+            "author": str(rec.get("author") or "").strip(),
+            "year": year,
+            "copies": copies,
+        }))
+    return good, bad
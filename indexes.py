@@ -0,0 +1,174 @@
+"""
+Sorted secondary indexes over the book catalog.
+Each index keeps a bisect-ordered list of (key, isbn) pairs so equality,
+range and prefix lookups cost O(log N + k) instead of a full scan.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, Iterator, List, Mapping, Optional
+
+_MAX_ISBN = "\U0010ffff"  # sorts after any real isbn, closes inclusive ranges
+
+
+class SortedIndex:
+    """
+    Ordered (key, isbn) pairs for one field.
+
+    Built lazily on the first query and then maintained through the same
+    on_reset/on_change listener hooks as the search index. Inserts and
+    deletes are O(log N) to locate plus a list shift, which is a memmove
+    and cheap next to a Python-level scan.
+    """
+
+    def __init__(self, name: str, key: Callable):
+        self.name = name
+        self.key = key
+        self.entries: List[tuple] = []
+        self._source: Mapping = {}
+        self.built = False
+
+    def on_reset(self, books: Mapping):
+        self.entries = []
+        self._source = books
+        self.built = False
+
+    def on_change(self, old, new):
+        if not self.built:
+            return
+        if old is not None:
+            entry = (self.key(old), old.isbn)
+            i = bisect_left(self.entries, entry)
+            if i < len(self.entries) and self.entries[i] == entry:
+                del self.entries[i]
+        if new is not None:
+            insort(self.entries, (self.key(new), new.isbn))
+
+    def _ensure_built(self):
+        if not self.built:
+            self.entries = sorted((self.key(b), b.isbn) for b in self._source.values())
+            self.built = True
+
+    def range(self, low=None, high=None, include_high: bool = True) -> List[str]:
+        """ISBNs with low <= key <= high (or < high), ordered by key then isbn."""
+        self._ensure_built()
+        entries = self.entries
+        start = 0 if low is None else bisect_left(entries, (low,))
+        if high is None:
+            end = len(entries)
+        elif include_high:
+            end = bisect_right(entries, (high, _MAX_ISBN))
+        else:
+            end = bisect_left(entries, (high,))
+        return [isbn for _, isbn in entries[start:end]]
+
+    def equal(self, value) -> List[str]:
+        return self.range(value, value)
+
+    def prefix(self, text: str) -> List[str]:
+        """ISBNs whose (string) key starts with text."""
+        self._ensure_built()
+        start = bisect_left(self.entries, (text,))
+        end = bisect_left(self.entries, (text + _MAX_ISBN,))
+        return [isbn for _, isbn in self.entries[start:end]]
+
+    def count(self) -> int:
+        self._ensure_built()
+        return len(self.entries)
+
+    def walk(self, after: Optional[tuple] = None, descending: bool = False) -> Iterator[tuple]:
+        """(key, isbn) entries strictly after the entry `after`, lazily; see walk_sorted."""
+        self._ensure_built()
+        return walk_sorted(lambda: self.entries, after, descending)
+
+
+WALK_CHUNK = 256
+
+
+def walk_sorted(entries: Callable[[], List[tuple]], after: Optional[tuple] = None,
+                descending: bool = False) -> Iterator[tuple]:
+    """
+    Yield entries of the sorted list returned by entries() that come after
+    `after` (in descending order: before it), a chunk at a time. Each chunk
+    is located again by bisecting from the last entry yielded, so changes
+    made to the list in between neither skip nor repeat entries.
+    """
+    while True:
+        current = entries()
+        if descending:
+            end = len(current) if after is None else bisect_left(current, after)
+            chunk = current[max(0, end - WALK_CHUNK):end][::-1]
+        else:
+            start = 0 if after is None else bisect_right(current, after)
+            chunk = current[start:start + WALK_CHUNK]
+        if not chunk:
+            return
+        yield from chunk
+        after = chunk[-1]
+
+
+def normalize_author(author) -> str:
+    return " ".join(str(author).lower().split())
+
+
+def default_indexes() -> Dict[str, SortedIndex]:
+    # title and isbn back sorted table views; like the others they cost
+    # nothing until first queried
+    return {
+        "year": SortedIndex("year", lambda b: b.year),
+        "copies": SortedIndex("copies", lambda b: b.copies),
+        "author": SortedIndex("author", lambda b: normalize_author(b.author)),
+        "title": SortedIndex("title", lambda b: b.title.lower()),
+        "isbn": SortedIndex("isbn", lambda b: b.isbn),
+    }
+
+
+def run_query(indexes: Dict[str, SortedIndex], year=None, copies=None,
+              author: Optional[str] = None, author_prefix: Optional[str] = None) -> Optional[List[str]]:
+    """
+    Combine index lookups with AND. year and copies accept a single value
+    or an inclusive (low, high) tuple with None for an open end. Returns
+    matching ISBNs in the order of the most selective lookup, or None when
+    no filter was given.
+    """
+    parts: List[List[str]] = []
+    for name, cond in (("year", year), ("copies", copies)):
+        if cond is None:
+            continue
+        if isinstance(cond, tuple):
+            parts.append(indexes[name].range(*cond))
+        else:
+            parts.append(indexes[name].equal(cond))
+    if author is not None:
+        parts.append(indexes["author"].equal(normalize_author(author)))
+    if author_prefix is not None:
+        parts.append(indexes["author"].prefix(normalize_author(author_prefix)))
+    if not parts:
+        return None
+    parts.sort(key=len)
+    result = parts[0]
+    for p in parts[1:]:
+        if not result:
+            break
+        keep = set(p)
+        result = [isbn for isbn in result if isbn in keep]
+    return result
+
+
+def matches_query(book, year=None, copies=None, author: Optional[str] = None,
+                  author_prefix: Optional[str] = None) -> bool:
+    """Whether one book satisfies the run_query conditions (used to invalidate cached results)."""
+    for value, cond in ((book.year, year), (book.copies, copies)):
+        if cond is None:
+            continue
+        if isinstance(cond, tuple):
+            low, high = cond
+            if (low is not None and value < low) or (high is not None and value > high):
+                return False
+        elif value != cond:
+            return False
+    norm = normalize_author(book.author)
+    if author is not None and norm != normalize_author(author):
+        return False
+    if author_prefix is not None and not norm.startswith(normalize_author(author_prefix)):
+        return False
+    return True
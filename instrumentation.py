@@ -0,0 +1,312 @@
+"""
+Opt-in timing of the hot paths, for finding out what "slow" means.
+
+    LMS_PROFILE=1 python LMS.py                 summary on stderr every 60s and at exit
+    LMS_PROFILE=metrics.json python gui.py      JSON metrics file, rewritten every 60s and at exit
+    python LMS.py --profile [metrics.json] --profile-interval 10 --cprofile lms.prof
+
+Once enabled, instrument_system() replaces LibrarySystem.load/save/
+add_book/update_book/delete_book/search/export_to_csv, and instrument_gui()
+gui.py's shared_library, VirtualTable.render and LibraryGUI.update_table,
+with wrappers that record call counts, errors, a latency histogram, bytes
+read or written and records touched. When profiling is off nothing is
+wrapped, so the only cost is one environment lookup at startup.
+
+Bytes are taken from the catalog files: a load counts the files read, a
+write counts what it appended to a log or, for a file replaced by an
+atomic rewrite, its whole new size. --cprofile also runs
+cProfile on the main thread and dumps pstats to the given file at exit.
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from storage import atomic_write_text
+
+ENV_VAR = "LMS_PROFILE"
+INTERVAL_ENV_VAR = "LMS_PROFILE_INTERVAL"
+CPROFILE_ENV_VAR = "LMS_CPROFILE"
+INTERVAL = 60.0
+STDERR = "-"
+# histogram bucket upper bounds in seconds (the last bucket is open-ended)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SYSTEM_METHODS = ("load", "save", "add_book", "update_book", "delete_book", "search", "export",
+                  "export_to_csv")
+
+_metrics: Optional["Metrics"] = None
+_active = threading.local()  # names being timed on this thread: inner recursive calls are not
+
+
+class Timing:
+    """Counters and latency histogram of one instrumented function."""
+
+    __slots__ = ("count", "errors", "total", "max", "buckets", "bytes", "records")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.bytes = 0
+        self.records = 0
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th percentile call (max for the open bucket)."""
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+            "bytes": self.bytes,
+            "records": self.records,
+            "histogram": {("<=%gms" % (b * 1000)) if i < len(BUCKETS) else "more": n
+                          for i, (b, n) in enumerate(zip(BUCKETS + (None,), self.buckets)) if n},
+        }
+
+
+class Metrics:
+    """Timings by name, safe to update from the GUI's worker threads."""
+
+    def __init__(self):
+        self.timings: Dict[str, Timing] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, nbytes: int = 0, records: int = 0, error: bool = False):
+        with self._lock:
+            t = self.timings.get(name)
+            if t is None:
+                t = self.timings[name] = Timing()
+            t.count += 1
+            t.errors += error
+            t.total += seconds
+            t.max = max(t.max, seconds)
+            t.buckets[bisect_left(BUCKETS, seconds)] += 1
+            t.bytes += nbytes
+            t.records += records
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {"started": self.started, "seconds": time.time() - self.started,
+                    "timings": {name: t.to_dict() for name, t in sorted(self.timings.items())}}
+
+    def summary(self) -> str:
+        data = self.to_dict()
+        lines = [f"profile after {data['seconds']:.0f}s:",
+                 f"  {'name':<34} {'calls':>7} {'total ms':>10} {'mean':>8} {'p95':>8} "
+                 f"{'max':>8} {'bytes':>11} {'records':>9}"]
+        for name, t in data["timings"].items():
+            lines.append(f"  {name:<34} {t['count']:>7} {t['total_ms']:>10.1f} {t['mean_ms']:>8.2f} "
+                         f"{t['p95_ms']:>8.2f} {t['max_ms']:>8.2f} {t['bytes']:>11} {t['records']:>9}")
+        return "\n".join(lines)
+
+
+# ---------- measuring ----------
+def _records(result) -> int:
+    """Records a call touched, from its result: a collection's size, 1 for success, 0 otherwise."""
+    if isinstance(result, (list, dict)):
+        return len(result)
+    rows = getattr(result, "rows", None)  # ExportReport
+    if isinstance(rows, int):
+        return rows
+    return 1 if result is True else 0
+
+
+def _state(paths: List[str]) -> Dict[str, Tuple[int, int]]:
+    """(inode, size) of each existing path."""
+    out = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        out[path] = (st.st_ino, st.st_size)
+    return out
+
+
+def _written(before: Dict, after: Dict) -> int:
+    """Bytes appended to files, or the new size of files replaced or created."""
+    total = 0
+    for path, (ino, size) in after.items():
+        old = before.get(path)
+        if old is None or old[0] != ino:
+            total += size
+        elif size > old[1]:
+            total += size - old[1]
+    return total
+
+
+def store_files(system) -> List[str]:
+    """Files a LibrarySystem reads and writes, whatever its storage."""
+    snap = os.path.splitext(system.data_file)[0] + ".snap"
+    return [system.data_file, system.data_file + ".wal", system.data_file + "-wal", snap, snap + ".wal"]
+
+
+def wrap(name: str, fn: Callable, files: Optional[Callable] = None, reads: bool = False,
+         records: Callable = lambda args, result: _records(result)) -> Callable:
+    """
+    fn timed under name. files(args, result) -> paths to measure bytes on:
+    their size when reads is True, else what the call wrote to them.
+    records(args, result) -> records the call touched.
+    """
+    if getattr(fn, "_instrumented", False):
+        return fn
+
+    @functools.wraps(fn)
+    def timed(*args, **kwargs):
+        active = getattr(_active, "names", None)
+        if active is None:
+            active = _active.names = set()
+        if name in active:  # e.g. a paged search calling search: time the outer call only
+            return fn(*args, **kwargs)
+        active.add(name)
+        try:
+            return _timed(args, kwargs)
+        finally:
+            active.discard(name)
+
+    def _timed(args, kwargs):
+        metrics = _metrics
+        try:
+            before = _state(files(args, None)) if files is not None and not reads else None
+        except Exception:
+            before = {}
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            metrics.record(name, time.perf_counter() - start, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        nbytes = 0
+        try:
+            if files is not None:
+                after = _state(files(args, result))
+                nbytes = sum(size for _, size in after.values()) if reads else _written(before, after)
+            touched = records(args, result)
+        except Exception:  # measuring must never break the call
+            touched = 0
+        metrics.record(name, elapsed, nbytes, touched)
+        return result
+
+    timed._instrumented = True
+    return timed
+
+
+def instrument_system(cls):
+    """Wrap the LibrarySystem hot paths."""
+    system_files = lambda args, result: store_files(args[0])
+    catalog_size = lambda args, result: len(args[0].books)
+    for method in SYSTEM_METHODS:
+        files, records = system_files, lambda args, result: _records(result)
+        if method in ("load", "save"):
+            records = catalog_size
+        elif method == "export":
+            files = lambda args, result: result.paths if result is not None else []
+        elif method == "export_to_csv":
+            files = lambda args, result: [result] if isinstance(result, str) else []
+        elif method == "search":
+            files = None
+        setattr(cls, method, wrap(f"LibrarySystem.{method}", getattr(cls, method), files,
+                                  reads=method == "load", records=records))
+
+
+def instrument_gui(module):
+    """
+    Wrap what the GUI runs: opening (or re-checking) the shared catalog,
+    drawing the visible table window on every scroll, resize or row change,
+    and pointing the table at a new result. The catalog reads themselves
+    are timed by instrument_system's LibrarySystem.load.
+    """
+    module.shared_library = wrap("gui.shared_library", module.shared_library,
+                                 records=lambda args, result: len(result.books))
+    table = module.VirtualTable
+    table.render = wrap("VirtualTable.render", table.render, records=lambda args, result: len(args[0].items))
+    cls = module.LibraryGUI
+    cls.update_table = wrap("LibraryGUI.update_table", cls.update_table,
+                            records=lambda args, result: len(args[0].table.keys))
+
+
+# ---------- switching on ----------
+def enabled() -> bool:
+    return _metrics is not None
+
+
+def enable(output: Optional[str] = STDERR, interval: Optional[float] = INTERVAL,
+           cprofile: Optional[str] = None) -> "Metrics":
+    """
+    Start collecting. output is a JSON file to (re)write, or "-" for a text
+    summary on stderr; either is produced every interval seconds (None:
+    only at exit). cprofile names a pstats file for a main-thread profile.
+    The caller then wraps what it uses with instrument_system/instrument_gui.
+    """
+    global _metrics
+    if _metrics is not None:
+        return _metrics
+    _metrics = Metrics()
+    profiler = None
+    if cprofile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def report():
+        if output and output != STDERR:
+            atomic_write_text(output, json.dumps(_metrics.to_dict(), indent=2), fsync=False)
+        else:
+            print(_metrics.summary(), file=sys.stderr, flush=True)
+
+    def finish():
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile)
+        report()
+
+    if interval:
+        def run():
+            while True:
+                time.sleep(interval)
+                report()
+        threading.Thread(target=run, name="lms-profile", daemon=True).start()
+    atexit.register(finish)
+    return _metrics
+
+
+def enable_from_env(output: Optional[str] = None, interval: Optional[float] = None,
+                    cprofile: Optional[str] = None) -> Optional["Metrics"]:
+    """
+    enable() if asked to by arguments (e.g. CLI flags) or by LMS_PROFILE
+    ("1" for the stderr summary, otherwise a JSON path), LMS_PROFILE_INTERVAL
+    and LMS_CPROFILE. Returns None, having wrapped nothing, when neither asks.
+    """
+    env = os.environ.get(ENV_VAR, "")
+    if output is None and env not in ("", "0"):
+        output = STDERR if env in ("1", "true", "yes", STDERR) else env
+    cprofile = cprofile or os.environ.get(CPROFILE_ENV_VAR) or None
+    if output is None and cprofile is None:
+        return None
+    if interval is None:
+        interval = float(os.environ.get(INTERVAL_ENV_VAR, INTERVAL))
+    return enable(output or STDERR, interval or None, cprofile)
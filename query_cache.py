@@ -0,0 +1,105 @@
+"""
+Bounded LRU cache for query results (search, find, list_books).
+
+Entries are keyed by the normalized query and hold the result list plus
+a predicate telling whether a given book could appear in it. The cache
+is a catalog listener: on_change drops only the entries whose predicate
+accepts the old or the new version of the changed book, and on_reset
+(a reload) drops everything. Both bump `version`, the catalog version
+counter that entries are stamped with.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class QueryCache:
+    """
+    LRU over at most max_entries results holding at most max_rows result
+    rows in total. hits/misses/evictions/invalidations count what happened
+    so the limits can be sized from stats().
+    """
+
+    def __init__(self, max_entries: int = 256, max_rows: int = 200000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.entries: "OrderedDict[Hashable, Tuple[int, List, Callable]]" = OrderedDict()
+        self.rows = 0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # ---------- catalog hooks ----------
+    def on_reset(self, books):
+        self.version += 1
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+        self.rows = 0
+
+    def on_change(self, old, new):
+        self.version += 1
+        if not self.entries:
+            return
+        stale = [key for key, (_, _, affects) in self.entries.items()
+                 if (old is not None and affects(old)) or (new is not None and affects(new))]
+        for key in stale:
+            self._drop(key)
+        self.invalidations += len(stale)
+
+    # ---------- lookups ----------
+    def get(self, key: Hashable) -> Optional[List]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, result: List, affects: Callable):
+        """Store result; affects(book) must be True for any book that could change it."""
+        if len(result) > self.max_rows:
+            return  # would evict everything else and itself soon after
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (self.version, result, affects)
+        self.rows += len(result)
+        while len(self.entries) > self.max_entries or self.rows > self.max_rows:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def cached(self, key: Hashable, compute: Callable[[], List], affects: Callable,
+               copy: bool = True) -> List:
+        """
+        Result for key, computed and stored on a miss. Returns a copy the
+        caller may modify; copy=False returns the stored list itself, which
+        is never modified in place (a change drops it instead).
+        """
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result, affects)
+        return list(result) if copy else result
+
+    def _drop(self, key: Hashable):
+        _, result, _ = self.entries.pop(key)
+        self.rows -= len(result)
+
+    def clear(self):
+        self.entries.clear()
+        self.rows = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "rows": self.rows,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
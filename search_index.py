@@ -0,0 +1,337 @@
+"""
+In-memory inverted trigram index over book title, author and isbn.
+Used by LibrarySystem.search so substring queries only verify candidate
+books instead of lowercasing every field of every book.
+
+FuzzyIndex backs the ranked, typo-tolerant search mode.
+"""
+
+import heapq
+import re
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+GRAM = 3
+
+
+def normalize(text) -> str:
+    return str(text).lower()
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class TrigramIndex:
+    """
+    Maps every 3-character slice of the normalized fields to the ISBNs
+    that contain it. A query's trigrams must all occur in a matching book,
+    so intersecting their postings gives a small candidate set which is
+    then checked with the same `q in field` test LibrarySystem used before.
+
+    The index is built lazily on the first query and kept current through
+    on_change, which LibrarySystem calls after every add/update/delete.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        self.docs: Dict[str, Tuple[str, str, str]] = {}  # isbn -> normalized fields, in catalog order
+        self.seq: Dict[str, int] = {}  # isbn -> insertion rank, used to keep catalog order
+        self._next_seq = 0
+        self._source: Mapping = {}
+        self.built = False
+
+    # ---------- catalog hooks ----------
+    def on_reset(self, books: Mapping):
+        """Forget everything; rebuild from books on the next query."""
+        self.postings = {}
+        self.docs = {}
+        self.seq = {}
+        self._next_seq = 0
+        self._source = books
+        self.built = False
+
+    def on_change(self, old, new):
+        if not self.built:
+            return
+        if old is not None and new is not None and old.isbn == new.isbn:
+            self._unindex(old.isbn)
+            self._index(new.isbn, self._fields(new))
+        else:
+            if old is not None:
+                self._unindex(old.isbn)
+                del self.docs[old.isbn]
+                del self.seq[old.isbn]
+            if new is not None:
+                self._add(new)
+
+    # ---------- maintenance ----------
+    @staticmethod
+    def _fields(book) -> Tuple[str, str, str]:
+        return normalize(book.title), normalize(book.author), normalize(book.isbn)
+
+    def _add(self, book):
+        self.seq[book.isbn] = self._next_seq
+        self._next_seq += 1
+        self._index(book.isbn, self._fields(book))
+
+    def _index(self, isbn: str, fields: Tuple[str, str, str]):
+        self.docs[isbn] = fields
+        postings = self.postings
+        for field in fields:
+            for gram in trigrams(field):
+                bucket = postings.get(gram)
+                if bucket is None:
+                    postings[gram] = {isbn}
+                else:
+                    bucket.add(isbn)
+
+    def _unindex(self, isbn: str):
+        fields = self.docs.get(isbn)
+        if fields is None:
+            return
+        for field in fields:
+            for gram in trigrams(field):
+                bucket = self.postings.get(gram)
+                if bucket is not None:
+                    bucket.discard(isbn)
+                    if not bucket:
+                        del self.postings[gram]
+
+    def build(self, books: Iterable):
+        for book in books:
+            self._add(book)
+        self.built = True
+
+    # ---------- queries ----------
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Return ISBNs whose title, author or isbn contains query, in catalog order (the first limit of them)."""
+        hits = self._search(query)
+        if limit is not None and len(hits) > limit:
+            return heapq.nsmallest(limit, hits, key=self.seq.__getitem__)
+        hits.sort(key=self.seq.__getitem__)
+        return hits
+
+    def _search(self, query: str) -> List[str]:
+        if not self.built:
+            self.build(self._source.values())
+        q = normalize(query)
+        if len(q) < GRAM:
+            # too short to have a trigram: check the pre-normalized fields
+            return [isbn for isbn, (t, a, i) in self.docs.items() if q in t or q in a or q in i]  # already in order
+        buckets = []
+        for gram in trigrams(q):
+            bucket = self.postings.get(gram)
+            if not bucket:
+                return []
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        candidates = set(buckets[0])
+        for bucket in buckets[1:]:
+            candidates &= bucket
+            if not candidates:
+                return []
+        docs = self.docs
+        hits = []
+        for isbn in candidates:
+            t, a, i = docs[isbn]
+            if q in t or q in a or q in i:
+                hits.append(isbn)
+        return hits
+
+
+# ---------- ranked, typo-tolerant search ----------
+WORD = re.compile(r"\w+")
+FIELD_WEIGHTS = (1.0, 0.8, 1.0)         # title, author, isbn
+MATCH_WEIGHTS = (1.0, 0.6, 0.35)        # exact term, 1 edit, 2 edits
+PREFIX_WEIGHT = 0.8                     # query token is the start of a term
+PHRASE_BONUS = 1.0                      # whole query is a substring of a field
+
+
+def edit_distance(a: str, b: str, bound: int) -> int:
+    """Levenshtein distance of a and b, or bound + 1 once it is known to exceed bound."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > bound:
+            return bound + 1
+        prev = cur
+    return prev[-1]
+
+
+def max_edits_for(token: str, max_edits: int) -> int:
+    """Short words tolerate fewer typos: 0 up to 3 letters, 1 up to 5, then max_edits."""
+    if len(token) <= 3:
+        return 0
+    return min(max_edits, 1 if len(token) <= 5 else 2)
+
+
+def fuzzy_matches(book, query: str, max_edits: int = 2) -> bool:
+    """Whether book would get any score from FuzzyIndex.ranked(query) (without an index)."""
+    q = normalize(query).strip()
+    fields = (normalize(book.title), normalize(book.author), normalize(book.isbn))
+    if any(q in field for field in fields):
+        return True  # a plain substring hit scores PHRASE_BONUS
+    terms = set(WORD.findall(fields[0])) | set(WORD.findall(fields[1])) | {fields[2]}
+    for token in WORD.findall(q):
+        edits = max_edits_for(token, max_edits)
+        for term in terms:
+            if term.startswith(token) or (edits and edit_distance(token, term, edits) <= edits):
+                return True
+    return False
+
+
+class FuzzyIndex:
+    """
+    Word-level index for ranked search. Every word of the title and author
+    (and the isbn as one word) maps to the books containing it; the
+    vocabulary itself is indexed by trigram so words within edit distance
+    1-2 of a query word are found without comparing against every word.
+
+    A book's score sums, per query word, its best matching word weighted
+    by match quality (MATCH_WEIGHTS / PREFIX_WEIGHT) and field
+    (FIELD_WEIGHTS), plus PHRASE_BONUS when the whole query appears
+    verbatim. Books the word match misses but that contain the query
+    (part of an isbn, "ust" in "Austen") score PHRASE_BONUS alone. Built
+    lazily and kept current like TrigramIndex.
+    """
+
+    def __init__(self):
+        self.terms: Dict[str, Dict[str, int]] = {}  # term -> {isbn: field bitmask}
+        self.term_grams: Dict[str, Set[str]] = {}   # trigram of "$term" -> terms
+        self.docs: Dict[str, Tuple[str, str, str]] = {}  # isbn -> normalized fields
+        self.seq: Dict[str, int] = {}
+        self._next_seq = 0
+        self._source: Mapping = {}
+        self.built = False
+
+    # ---------- catalog hooks ----------
+    def on_reset(self, books: Mapping):
+        self.__init__()
+        self._source = books
+
+    def on_change(self, old, new):
+        if not self.built:
+            return
+        if old is not None:
+            self._unindex(old.isbn)
+            if new is None or new.isbn != old.isbn:
+                self.seq.pop(old.isbn, None)
+        if new is not None:
+            self._add(new)
+
+    def build(self, books: Iterable):
+        for book in books:
+            self._add(book)
+        self.built = True
+
+    # ---------- maintenance ----------
+    @staticmethod
+    def _terms(fields: Tuple[str, str, str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        for bit, field in enumerate(fields[:2]):
+            for word in WORD.findall(field):
+                found[word] = found.get(word, 0) | (1 << bit)
+        if fields[2]:
+            found[fields[2]] = found.get(fields[2], 0) | 4
+        return found
+
+    def _add(self, book):
+        isbn = book.isbn
+        if isbn not in self.seq:
+            self.seq[isbn] = self._next_seq
+            self._next_seq += 1
+        fields = (normalize(book.title), normalize(book.author), normalize(isbn))
+        self.docs[isbn] = fields
+        for term, mask in self._terms(fields).items():
+            postings = self.terms.get(term)
+            if postings is None:
+                postings = self.terms[term] = {}
+                for gram in trigrams("$" + term):
+                    self.term_grams.setdefault(gram, set()).add(term)
+            postings[isbn] = mask
+
+    def _unindex(self, isbn: str):
+        fields = self.docs.pop(isbn, None)
+        if fields is None:
+            return
+        for term in self._terms(fields):
+            postings = self.terms.get(term)
+            if postings is None:
+                continue
+            postings.pop(isbn, None)
+            if not postings:
+                del self.terms[term]
+                for gram in trigrams("$" + term):
+                    bucket = self.term_grams.get(gram)
+                    if bucket is not None:
+                        bucket.discard(term)
+                        if not bucket:
+                            del self.term_grams[gram]
+
+    # ---------- queries ----------
+    def similar_terms(self, token: str, max_edits: int = 2) -> Dict[str, float]:
+        """Vocabulary words matching token exactly, as a prefix or within the edit budget -> weight."""
+        edits = max_edits_for(token, max_edits)
+        grams = trigrams("$" + token)
+        counts: Dict[str, int] = {}
+        for gram in grams:
+            for term in self.term_grams.get(gram, ()):
+                counts[term] = counts.get(term, 0) + 1
+        # one edit destroys at most 3 trigrams, so closer words share at least this many
+        need = max(1, len(grams) - 3 * edits)
+        out: Dict[str, float] = {}
+        for term, shared in counts.items():
+            if term == token:
+                out[term] = MATCH_WEIGHTS[0]
+            elif term.startswith(token):
+                out[term] = PREFIX_WEIGHT
+            elif edits and shared >= need:
+                d = edit_distance(token, term, edits)
+                if d <= edits:
+                    out[term] = MATCH_WEIGHTS[d]
+        if not grams and token in self.terms:  # one-letter query
+            out[token] = MATCH_WEIGHTS[0]
+        return out
+
+    def ranked(self, query: str, limit: int = 20, max_edits: int = 2,
+               substring: Optional[Callable[[str, int], Iterable[str]]] = None) -> List[Tuple[float, str]]:
+        """
+        Best limit (score, isbn) pairs for query, highest score first
+        (catalog order on ties). substring(q, n) gives the first n isbns
+        containing q in catalog order (e.g. TrigramIndex.search); those
+        the word match missed are ranked with PHRASE_BONUS, so an empty
+        query lists every book.
+        """
+        if not self.built:
+            self.build(self._source.values())
+        q = normalize(query).strip()
+        tokens = list(dict.fromkeys(WORD.findall(q)))
+        if limit <= 0 or (not tokens and substring is None):
+            return []
+        scores: Dict[str, float] = {}
+        for token in tokens:
+            best: Dict[str, float] = {}
+            for term, weight in self.similar_terms(token, max_edits).items():
+                for isbn, mask in self.terms[term].items():
+                    w = weight * max(FIELD_WEIGHTS[bit] for bit in range(3) if mask >> bit & 1)
+                    if w > best.get(isbn, 0.0):
+                        best[isbn] = w
+            for isbn, w in best.items():
+                scores[isbn] = scores.get(isbn, 0.0) + w
+        docs = self.docs
+        for isbn in scores:
+            t, a, i = docs[isbn]
+            if q in t or q in a or q in i:
+                scores[isbn] += PHRASE_BONUS
+        if substring is not None:
+            # only the first limit hits not already scored can make the top limit
+            for isbn in substring(q, limit + len(scores)):
+                if isbn not in scores:
+                    scores[isbn] = PHRASE_BONUS
+        seq = self.seq
+        top = heapq.nsmallest(limit, scores.items(), key=lambda kv: (-kv[1], seq[kv[0]]))
+        return [(score, isbn) for isbn, score in top]
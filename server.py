@@ -0,0 +1,447 @@
+"""
+HTTP/JSON service around one in-memory LibrarySystem (stdlib asyncio only).
+
+    python LMS.py --serve --port 8080
+
+Routes (all bodies are JSON):
+    GET    /books?offset=0&limit=100   list books in catalog order
+                                       (&sort=title|author|year|copies|isbn, &desc=1;
+                                       &cursor=<"cursor" of the previous page>)
+    GET    /books/<isbn>               one book (404 if missing)
+    GET    /search?q=text&limit=100    substring search on title/author/isbn
+                                       (&ranked=1: best matches first, typos allowed)
+    POST   /books                      add a book (409 if the isbn exists)
+    PUT    /books/<isbn>               update title/author/year/copies
+    DELETE /books/<isbn>               delete a book
+    POST   /export                     {"name", "query", "compress"} -> CSV export to
+                                       exports/<name> (a bare file name, default books.csv)
+    GET    /stats                      catalog size, pending writes, commits, cache counters
+
+POST, PUT, PATCH and DELETE must be sent with Content-Type: application/json
+(415 otherwise), so a web page cannot fire them at a local server with a
+simple cross-site form or text/plain request.
+
+Connections are kept alive and requests may be pipelined; responses go
+back in request order. Reads are served straight from memory. Writes are
+applied in memory at once, then answered after the background persister
+has committed them, which it does in one write per commit window.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from export import write_csv
+from LMS import Book, LibrarySystem, EXPORT_FILE, EXPORT_FOLDER, UPDATABLE_FIELDS
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1 << 20
+PIPELINE_DEPTH = 64  # responses a connection may have in flight
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           415: "Unsupported Media Type", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Persister:
+    """
+    Commits the catalog from a background task. Writers call written()
+    after changing the catalog in memory and await the returned future,
+    which resolves once a commit covering their change has finished.
+    """
+
+    def __init__(self, system: LibrarySystem, window: float = 0.005):
+        self.system = system
+        self.window = window
+        self.commits = 0
+        self._waiters = []
+        self._wake = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def written(self) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self._wake.set()
+        return fut
+
+    async def acquire(self):
+        """Take the catalog lock for a mutation without blocking the loop while a commit runs."""
+        while not self.system.lock.acquire(blocking=False):
+            await self._idle.wait()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if self.window:
+                await asyncio.sleep(self.window)
+            await self.flush(loop)
+
+    async def flush(self, loop=None):
+        loop = loop or asyncio.get_running_loop()
+        waiters, self._waiters = self._waiters, []
+        file_lock = self.system.file_lock
+        locked = False
+        try:
+            if file_lock is not None and not file_lock.held:
+                acquiring = loop.run_in_executor(None, file_lock.acquire)
+                try:
+                    await asyncio.shield(acquiring)
+                except asyncio.CancelledError:
+                    await acquiring  # finish taking it, so it can be given back below
+                    raise
+                finally:
+                    locked = acquiring.done() and acquiring.exception() is None
+            # reloading or rebasing replaces the catalog and its indexes: do it
+            # on the loop, so no request is reading them halfway through
+            await self.acquire()
+            try:
+                self.system.catch_up()
+            finally:
+                self.system.lock.release()
+            # only the disk I/O runs off the loop; reads keep being served meanwhile
+            self._idle.clear()
+            await loop.run_in_executor(None, self.system.commit)
+        except asyncio.CancelledError:
+            self._waiters = waiters + self._waiters  # the next flush (e.g. close's) answers them
+            raise
+        except Exception as e:
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            self.commits += 1
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_result(None)
+        finally:
+            if locked:
+                file_lock.release()
+            self._idle.set()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+
+class LibraryServer:
+    """Routes requests to a LibrarySystem and runs the connection loop."""
+
+    def __init__(self, system: LibrarySystem, commit_window: float = 0.005):
+        self.system = system
+        system.autocommit = False  # the persister commits instead
+        self.persister: Optional[Persister] = None
+        self.commit_window = commit_window
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> Tuple[str, int]:
+        self.system.search("")  # build the search index now rather than on a client's first query
+        self.persister = Persister(self.system, self.commit_window)
+        self.persister.start()
+        self._server = await asyncio.start_server(self._serve_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.persister is not None:
+            await self.persister.close()
+        self.system.close()
+
+    # ---------- HTTP ----------
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """(method, target, version, headers, body), or None at end of stream."""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(413, "headers too large")
+        if len(head) > MAX_HEADER_BYTES:
+            raise HttpError(413, "headers too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HttpError(400, "bad Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "body too large")
+        try:
+            body = await reader.readexactly(length) if length else b""
+        except asyncio.IncompleteReadError:
+            return None
+        return method.upper(), target, version, headers, body
+
+    @staticmethod
+    def _keep_alive(version: str, headers: Dict[str, str]) -> bool:
+        conn = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            return conn == "keep-alive"
+        return conn != "close"
+
+    @staticmethod
+    def _encode(status: int, payload, keep_alive: bool) -> bytes:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode("latin-1") + body
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # the reader keeps parsing pipelined requests while earlier ones are
+        # still waiting for a commit; the sender answers them in order
+        inflight: asyncio.Queue = asyncio.Queue(PIPELINE_DEPTH)
+        sender = asyncio.get_running_loop().create_task(self._send_responses(inflight, writer))
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    await inflight.put(self._done(self._encode(e.status, {"error": str(e)}, False)))
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                keep_alive = self._keep_alive(version, headers)
+                task = asyncio.get_running_loop().create_task(
+                    self._respond(method, target, headers, body, keep_alive))
+                await inflight.put(task)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            await inflight.put(None)
+            await sender
+
+    @staticmethod
+    def _done(data: bytes) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        fut.set_result(data)
+        return fut
+
+    @staticmethod
+    async def _send_responses(inflight: asyncio.Queue, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                pending = await inflight.get()
+                if pending is None:
+                    break
+                writer.write(await pending)
+                if inflight.empty():
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str, headers: Dict[str, str], body: bytes,
+                       keep_alive: bool) -> bytes:
+        self.requests += 1
+        try:
+            if method in WRITE_METHODS:
+                media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+                if media_type != "application/json":
+                    raise HttpError(415, "requests that change data must be Content-Type: application/json")
+            status, payload = await self.handle(method, target, body)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:  # keep the connection usable after a bug in one request
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        return self._encode(status, payload, keep_alive)
+
+    # ---------- routes ----------
+    async def handle(self, method: str, target: str, body: bytes):
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        system = self.system
+        if parts == ["books"]:
+            if method == "GET":
+                offset, limit = self._int(params, "offset", 0), self._int(params, "limit", 100)
+                try:
+                    page = system.list_books(sort=params.get("sort"), descending=self._flag(params, "desc"),
+                                             offset=offset, cursor=self._cursor(params), page_size=limit)
+                    books = [b.to_dict() for b in page]
+                except (TypeError, ValueError) as e:  # unknown sort key, or a cursor from another sort
+                    raise HttpError(400, str(e))
+                return 200, {"total": len(system.books), "more": page.more, "cursor": page.cursor,
+                             "books": books}
+            if method == "POST":
+                book = self._book(self._json(body))
+                added = await self._mutate(system.add_book, book)
+                if not added:
+                    raise HttpError(409, "a book with this isbn already exists")
+                return 201, book.to_dict()
+        elif len(parts) == 2 and parts[0] == "books":
+            isbn = parts[1]
+            if method == "GET":
+                book = system.get_book(isbn)
+                if book is None:
+                    raise HttpError(404, "no such book")
+                return 200, book.to_dict()
+            if method in ("PUT", "PATCH"):
+                fields = self._fields({k: v for k, v in self._json(body).items() if k in UPDATABLE_FIELDS})
+                updated = await self._mutate(system.update_book, isbn, **fields)
+                if not updated:
+                    raise HttpError(404, "no such book")
+                return 200, system.get_book(isbn).to_dict()
+            if method == "DELETE":
+                try:
+                    deleted = await self._mutate(system.delete_book, isbn)
+                except ValueError as e:  # e.g. copies still on loan
+                    raise HttpError(409, str(e))
+                if not deleted:
+                    raise HttpError(404, "no such book")
+                return 200, {"deleted": isbn}
+        elif parts == ["search"] and method == "GET":
+            limit = self._int(params, "limit", 100)
+            ranked = self._flag(params, "ranked")
+            books = system.search(params.get("q", ""), limit=limit + 1, ranked=ranked)
+            return 200, {"more": len(books) > limit, "books": [b.to_dict() for b in books[:limit]]}
+        elif parts == ["export"] and method == "POST":
+            opts = self._json(body) if body else {}
+            path = self._export_path(opts.get("name"))
+            # take the rows now; the CSV is written off the loop
+            books = list(system.select(opts.get("query")))
+            report = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: write_csv(books, path, compress=bool(opts.get("compress"))))
+            return 200, {"paths": report.paths, "rows": report.rows, "seconds": report.seconds}
+        elif parts == ["stats"] and method == "GET":
+            return 200, {"books": len(system.books), "pending": system.pending,
+                         "commits": self.persister.commits, "requests": self.requests,
+                         "query_cache": system.query_cache.stats()}
+        else:
+            raise HttpError(404, "unknown route")
+        raise HttpError(405, "method not allowed")
+
+    async def _mutate(self, fn, *args, **kwargs):
+        """Apply a change in memory now; return once it has been committed."""
+        await self.persister.acquire()
+        try:
+            before = self.system.pending
+            result = fn(*args, **kwargs)
+            changed = self.system.pending != before
+        finally:
+            self.system.lock.release()
+        if changed:
+            await self.persister.written()
+        return result
+
+    @staticmethod
+    def _json(body: bytes) -> Dict:
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "body must be a JSON object")
+        return data
+
+    @classmethod
+    def _book(cls, data: Dict) -> Book:
+        for k in ("isbn", "title", "author", "year"):
+            if k not in data:
+                raise HttpError(400, f"missing field {k}")
+        if not isinstance(data["isbn"], (str, int)) or isinstance(data["isbn"], bool) or not str(data["isbn"]):
+            raise HttpError(400, "isbn must be a string")
+        fields = cls._fields({k: data[k] for k in UPDATABLE_FIELDS if k in data})
+        return Book(str(data["isbn"]), fields["title"], fields["author"], fields["year"], fields.get("copies", 1))
+
+    @staticmethod
+    def _fields(fields: Dict) -> Dict:
+        """Book fields as given, checked before they reach the catalog (400 otherwise)."""
+        for k in ("title", "author"):
+            if k in fields and (not isinstance(fields[k], str) or not fields[k].strip()):
+                raise HttpError(400, f"{k} must be a non-empty string")
+        for k in ("year", "copies"):
+            if k in fields and (not isinstance(fields[k], int) or isinstance(fields[k], bool)):
+                raise HttpError(400, f"{k} must be a whole number")
+        return fields
+
+    @staticmethod
+    def _int(params: Dict[str, str], name: str, default: int) -> int:
+        try:
+            return max(0, int(params.get(name, default)))
+        except ValueError:
+            raise HttpError(400, f"{name} must be a number")
+
+    @staticmethod
+    def _export_path(name) -> str:
+        """Exports only go to EXPORT_FOLDER, under a bare file name."""
+        if name is None:
+            return EXPORT_FILE
+        if (not isinstance(name, str) or name in ("", ".", "..") or os.path.basename(name) != name
+                or "/" in name or "\\" in name or os.path.isabs(name)):
+            raise HttpError(400, "name must be a plain file name (the export goes to the exports folder)")
+        return os.path.join(EXPORT_FOLDER, name)
+
+    @staticmethod
+    def _flag(params: Dict[str, str], name: str) -> bool:
+        return params.get(name, "") not in ("", "0", "false")
+
+    @staticmethod
+    def _cursor(params: Dict[str, str]):
+        """The JSON cursor a previous page returned; sorted cursors come back as lists."""
+        if "cursor" not in params:
+            return None
+        try:
+            cursor = json.loads(params["cursor"])
+        except ValueError:
+            raise HttpError(400, "cursor is not valid JSON")
+        return tuple(cursor) if isinstance(cursor, list) else cursor
+
+
+def serve(system: LibrarySystem, host: str = "127.0.0.1", port: int = 8080, commit_window: float = 0.005):
+    """Run the server until interrupted, then commit and close the catalog."""
+    async def run():
+        server = LibraryServer(system, commit_window)
+        bound = await server.start(host, port)
+        print(f"Serving {len(system.books)} books on http://{bound[0]}:{bound[1]} (Ctrl+C to stop)")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    started = time.perf_counter()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    print(f"Server stopped after {time.perf_counter() - started:.0f}s.")
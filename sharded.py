@@ -0,0 +1,216 @@
+"""
+Parallel sharded scans for very large catalogs.
+
+The catalog is split into shards by a stable hash of the isbn and each
+shard lives in its own worker process for as long as the catalog is
+open, so a query only ships the query string out and the catalog
+positions of the matches back. Workers scan their shard in parallel; the parent
+merges the per-shard results back into catalog order.
+
+Below `threshold` books the single-process path is used instead, since
+starting workers and pickling the catalog would cost more than it saves.
+If a worker dies, the workers are restarted and reloaded; should that
+fail too, the query is answered by a scan in this process.
+"""
+
+import heapq
+import multiprocessing
+import os
+import threading
+import zlib
+from array import array
+from collections import namedtuple
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from indexes import matches_query
+
+THRESHOLD = 200000
+
+# one book as a worker keeps it; matches_query reads author/year/copies
+Doc = namedtuple("Doc", "seq title author author_l isbn year copies")
+
+
+def shard_of(isbn: str, shards: int) -> int:
+    return zlib.crc32(isbn.encode("utf-8")) % shards
+
+
+def _doc(seq: int, book) -> Doc:
+    return Doc(seq, str(book.title).lower(), book.author, str(book.author).lower(),
+               str(book.isbn).lower(), book.year, book.copies)
+
+
+def _matches(d: Doc, q: str, filters: Dict) -> bool:
+    return (not q or q in d.title or q in d.author_l or q in d.isbn) and \
+        (not filters or matches_query(d, **filters))
+
+
+def _worker(conn):
+    """Shard process: keeps isbn -> Doc in catalog order and answers scans."""
+    docs: Dict[str, Doc] = {}
+    while True:
+        msg = conn.recv()
+        op = msg[0]
+        if op == "search":
+            _, q, limit, filters = msg
+            hits = array("q")  # seq numbers only: cheap to send back, the parent maps them to isbns
+            for d in docs.values():
+                if _matches(d, q, filters):
+                    hits.append(d.seq)
+                    if limit is not None and len(hits) >= limit:
+                        break
+            conn.send_bytes(hits.tobytes())
+        elif op == "put":
+            _, isbn, doc = msg
+            docs[isbn] = Doc(*doc)
+        elif op == "del":
+            docs.pop(msg[1], None)
+        elif op == "load":
+            docs = {isbn: Doc(*doc) for isbn, doc in msg[1]}
+        elif op == "stop":
+            conn.close()
+            return
+
+
+class ShardedSearch:
+    """
+    Catalog listener that mirrors the catalog into worker processes.
+
+    Workers start on the first query over threshold books and then follow
+    every change through on_change; a reload, or a worker found dead,
+    re-sends the shards on the next query. Queries from several threads
+    are serialized.
+    """
+
+    def __init__(self, shards: Optional[int] = None, threshold: int = THRESHOLD):
+        self.shards = shards or os.cpu_count() or 1
+        self.threshold = threshold
+        self.seq: Dict[str, int] = {}
+        self.isbn_of: Dict[int, str] = {}
+        self._next_seq = 0
+        self._source: Mapping = {}
+        self._conns: List = []
+        self._procs: List = []
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def active(self) -> bool:
+        """True when queries should go to the workers."""
+        return len(self._source) >= self.threshold
+
+    # ---------- catalog hooks ----------
+    def on_reset(self, books: Mapping):
+        with self._lock:
+            self._source = books
+            self.seq = {}
+            self.isbn_of = {}
+            self._next_seq = 0
+            self._loaded = False
+
+    def on_change(self, old, new):
+        with self._lock:
+            if not self._loaded:
+                return
+            try:
+                self._send_change(old, new)
+            except OSError:  # a worker died: the next query restarts and reloads them all
+                self._stop()
+
+    def _send_change(self, old, new):
+        if old is not None and (new is None or new.isbn != old.isbn):
+            self.isbn_of.pop(self.seq.pop(old.isbn, None), None)
+            self._conns[shard_of(old.isbn, self.shards)].send(("del", old.isbn))
+        if new is not None:
+            seq = self.seq.get(new.isbn)
+            if seq is None:
+                seq = self.seq[new.isbn] = self._next_seq
+                self.isbn_of[seq] = new.isbn
+                self._next_seq += 1
+            self._conns[shard_of(new.isbn, self.shards)].send(("put", new.isbn, tuple(_doc(seq, new))))
+
+    # ---------- workers ----------
+    def _start(self):
+        if self._procs:
+            return
+        ctx = multiprocessing.get_context("spawn")  # fork is unsafe next to GUI/server threads
+        for _ in range(self.shards):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker, args=(child,), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    def _load(self):
+        self._start()
+        parts: List[List[Tuple[str, tuple]]] = [[] for _ in range(self.shards)]
+        self.seq, self.isbn_of = {}, {}
+        for seq, book in enumerate(self._source.values()):
+            self.seq[book.isbn] = seq
+            self.isbn_of[seq] = book.isbn
+            parts[shard_of(book.isbn, self.shards)].append((book.isbn, tuple(_doc(seq, book))))
+        self._next_seq = len(self.seq)
+        for conn, part in zip(self._conns, parts):
+            conn.send(("load", part))
+        self._loaded = True
+
+    def search(self, query: str = "", limit: Optional[int] = None, **filters) -> List[str]:
+        """
+        ISBNs whose title, author or isbn contains query (all books for "")
+        and that satisfy the find() filters, in catalog order.
+        """
+        # lists (e.g. year=[1990, 2000] from JSON) mean ranges, as in find()
+        filters = {k: tuple(v) if isinstance(v, list) else v for k, v in filters.items() if v is not None}
+        q = str(query).lower()
+        with self._lock:
+            for _ in range(2):
+                try:
+                    if not self._loaded:
+                        self._load()
+                    return self._query(q, limit, filters)
+                except (EOFError, OSError):  # a worker died: start over with fresh ones
+                    self._stop()
+            return self._scan(q, limit, filters)
+
+    def _query(self, q: str, limit: Optional[int], filters: Dict) -> List[str]:
+        for conn in self._conns:  # every shard scans at once
+            conn.send(("search", q, limit, filters))
+        results = []
+        for conn in self._conns:
+            hits = array("q")
+            hits.frombytes(conn.recv_bytes())
+            results.append(hits)
+        isbn_of = self.isbn_of
+        if len(results) == 1:
+            merged = results[0][:limit] if limit is not None else results[0]
+        else:
+            merged = heapq.merge(*results)
+            if limit is not None:
+                merged = (seq for _, seq in zip(range(limit), merged))
+        return [isbn_of[seq] for seq in merged]
+
+    def _scan(self, q: str, limit: Optional[int], filters: Dict) -> List[str]:
+        """The workers' scan, run in this process."""
+        hits = []
+        for book in self._source.values():
+            if _matches(_doc(0, book), q, filters):
+                hits.append(book.isbn)
+                if limit is not None and len(hits) >= limit:
+                    break
+        return hits
+
+    def _stop(self):
+        for conn in self._conns:
+            try:
+                conn.send(("stop",))
+            except OSError:  # already gone
+                pass
+            conn.close()
+        for proc in self._procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        self._conns, self._procs, self._loaded = [], [], False
+
+    def close(self):
+        with self._lock:
+            self._stop()
@@ -0,0 +1,270 @@
+"""
+Binary catalog snapshot, opened with mmap for instant startup.
+
+Layout (little endian):
+    header   magic, version, count, record size, offsets of the sections
+    records  count fixed-width rows in catalog order:
+             isbn/title/author as (offset, length) into the string heap,
+             then year and copies
+    heap     UTF-8 strings; repeated authors are stored once
+    index    count row numbers sorted by isbn, for binary-search lookups
+
+Opening a snapshot reads only the header; a record is decoded the first
+time it is touched. Convert to and from books.json with:
+
+    python snapshot.py to-snapshot books.json books.snap
+    python snapshot.py to-json books.snap books.json
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import MutableMapping, ValuesView, ItemsView
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+MAGIC = b"LMSSNAP1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIQQQ")   # magic, version, count, record size, records/heap/index offsets
+RECORD = struct.Struct("<IIIIIIii")   # isbn off/len, title off/len, author off/len, year, copies
+MAX_HEAP = 0xFFFFFFFF
+
+
+def write_snapshot(path: str, books: Iterable, fsync: bool = True) -> int:
+    """Write books (Book-like objects or dicts) to path atomically. Returns the record count."""
+    heap = bytearray()
+    authors: Dict[str, tuple] = {}
+    records = bytearray()
+    keys = []
+
+    def put(text: str) -> tuple:
+        data = str(text).encode("utf-8")
+        ref = (len(heap), len(data))
+        heap.extend(data)
+        return ref
+
+    for b in books:
+        d = b if isinstance(b, dict) else b.to_dict()
+        isbn_ref = put(d["isbn"])
+        author_ref = authors.get(d["author"])
+        if author_ref is None:
+            author_ref = authors[d["author"]] = put(d["author"])
+        title_ref = put(d["title"])
+        records += RECORD.pack(*isbn_ref, *title_ref, *author_ref, int(d["year"]), int(d.get("copies", 1)))
+        keys.append(str(d["isbn"]).encode("utf-8"))
+    if len(heap) > MAX_HEAP:
+        raise ValueError("catalog too large for the snapshot string heap")
+
+    count = len(keys)
+    index = array("I", sorted(range(count), key=keys.__getitem__))
+    records_off = HEADER.size
+    heap_off = records_off + len(records)
+    index_off = heap_off + len(heap)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, RECORD.size, records_off, heap_off, index_off))
+        f.write(records)
+        f.write(heap)
+        f.write(index.tobytes())
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if size < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a catalog snapshot")
+        magic, version, count, rec_size, rec_off, heap_off, index_off = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or rec_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} catalog snapshot")
+        self.count = count
+        self._rec_off = rec_off
+        self._heap_off = heap_off
+        self._index = memoryview(self._map)[index_off:index_off + 4 * count].cast("I") if count else []
+
+    def _text(self, off: int, length: int) -> str:
+        start = self._heap_off + off
+        return self._map[start:start + length].decode("utf-8")
+
+    def _isbn_bytes(self, row: int) -> bytes:
+        off, length = struct.unpack_from("<II", self._map, self._rec_off + row * RECORD.size)
+        start = self._heap_off + off
+        return self._map[start:start + length]
+
+    def isbn_at(self, row: int) -> str:
+        return self._isbn_bytes(row).decode("utf-8")
+
+    def record(self, row: int) -> Dict:
+        i_off, i_len, t_off, t_len, a_off, a_len, year, copies = RECORD.unpack_from(
+            self._map, self._rec_off + row * RECORD.size)
+        return {
+            "isbn": self._text(i_off, i_len),
+            "title": self._text(t_off, t_len),
+            "author": self._text(a_off, a_len),
+            "year": year,
+            "copies": copies,
+        }
+
+    def find(self, isbn: str) -> Optional[int]:
+        """Row of isbn via binary search over the sorted index, or None."""
+        key = isbn.encode("utf-8")
+        lo, hi = 0, self.count
+        index = self._index
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._isbn_bytes(index[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._isbn_bytes(index[lo]) == key:
+            return index[lo]
+        return None
+
+    def close(self):
+        if isinstance(self._index, memoryview):
+            self._index.release()
+        self._index = []
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+
+class _Values(ValuesView):
+    def __iter__(self):
+        return self._mapping.iter_books()
+
+
+class _Items(ItemsView):
+    def __iter__(self):
+        for book in self._mapping.iter_books():
+            yield book.isbn, book
+
+
+class SnapshotCatalog(MutableMapping):
+    """
+    isbn -> Book mapping over a Snapshot plus an in-memory overlay.
+
+    Records are decoded on first access through [] or get() and kept in
+    the overlay, so in-place edits stick. Full scans through values() and
+    items() decode rows on the fly without caching them. New books are
+    appended after the snapshot rows; deletions hide snapshot rows.
+    """
+
+    def __init__(self, snap: Optional[Snapshot], book_factory: Callable[[Dict], object]):
+        self.snap = snap
+        self.book_factory = book_factory
+        self.live: Dict[str, object] = {}   # decoded or written books
+        self.added: Dict[str, None] = {}    # isbns not in the snapshot, in insertion order
+        self.deleted = set()                # snapshot isbns that were removed
+
+    def _base_row(self, isbn: str) -> Optional[int]:
+        if self.snap is None or isbn in self.deleted:
+            return None
+        return self.snap.find(isbn)
+
+    def __getitem__(self, isbn):
+        book = self.live.get(isbn)
+        if book is not None:
+            return book
+        row = self._base_row(isbn)
+        if row is None:
+            raise KeyError(isbn)
+        book = self.live[isbn] = self.book_factory(self.snap.record(row))
+        return book
+
+    def __contains__(self, isbn) -> bool:
+        return isbn in self.live or self._base_row(isbn) is not None
+
+    def __setitem__(self, isbn, book):
+        if isbn not in self.live and self._base_row(isbn) is None:
+            self.added[isbn] = None
+        self.live[isbn] = book
+
+    def __delitem__(self, isbn):
+        in_base = self._base_row(isbn) is not None
+        if not in_base and isbn not in self.live:
+            raise KeyError(isbn)
+        self.live.pop(isbn, None)
+        self.added.pop(isbn, None)
+        if in_base:
+            self.deleted.add(isbn)
+
+    def __iter__(self) -> Iterator[str]:
+        if self.snap is not None:
+            for row in range(self.snap.count):
+                isbn = self.snap.isbn_at(row)
+                if isbn not in self.deleted:
+                    yield isbn
+        yield from list(self.added)
+
+    def __len__(self) -> int:
+        base = self.snap.count if self.snap is not None else 0
+        return base - len(self.deleted) + len(self.added)
+
+    def iter_books(self):
+        if self.snap is not None:
+            for row in range(self.snap.count):
+                isbn = self.snap.isbn_at(row)
+                if isbn in self.deleted:
+                    continue
+                book = self.live.get(isbn)
+                yield book if book is not None else self.book_factory(self.snap.record(row))
+        for isbn in list(self.added):
+            yield self.live[isbn]
+
+    def values(self):
+        return _Values(self)
+
+    def items(self):
+        return _Items(self)
+
+    def clear(self):
+        self.rebase(None)
+
+    def rebase(self, snap: Optional[Snapshot]):
+        """Switch to a snapshot that already holds every change; drop the overlay."""
+        if self.snap is not None and self.snap is not snap:
+            self.snap.close()
+        self.snap = snap
+        self.live = {}
+        self.added = {}
+        self.deleted = set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert between books.json and a binary snapshot")
+    parser.add_argument("command", choices=("to-snapshot", "to-json"))
+    parser.add_argument("source")
+    parser.add_argument("target")
+    args = parser.parse_args(argv)
+    if args.command == "to-snapshot":
+        from storage import read_json_catalog
+        count = write_snapshot(args.target, read_json_catalog(args.source).values())
+    else:
+        snap = Snapshot(args.source)
+        books = {}
+        for row in range(snap.count):
+            rec = snap.record(row)
+            books[rec["isbn"]] = rec
+        snap.close()
+        with open(args.target, "w", encoding="utf-8") as f:
+            json.dump(books, f, indent=2)
+        count = len(books)
+    print(f"Converted {count} books from {args.source} to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
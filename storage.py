@@ -0,0 +1,540 @@
+"""
+Storage backends for the Library Management System.
+
+LibrarySystem talks to a StorageBackend. Four ship here:
+- JsonBackend rewrites books.json on every commit (the original behaviour)
+- WalBackend appends each mutation to an append-only write-ahead log (WAL)
+  and periodically folds it into a JSON snapshot
+- SqliteBackend keeps one row per book in an SQLite database (WAL journal,
+  indexes on isbn/author/year) and writes only the changed rows
+- SnapshotBackend memory-maps a binary snapshot (snapshot.py) for instant
+  startup and logs changes to a WAL until the next snapshot
+
+Processes sharing a catalog coordinate through FileLock on a side file.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import time
+import zlib
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+DURABILITY_LEVELS = ("none", "flush", "fsync")
+STORAGE_MODES = ("json", "wal", "sqlite", "snapshot")
+LOCK_SUFFIX = ".lock"
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def atomic_write_text(path: str, text: str, fsync: bool = True):
+    """Write text to a temp file next to path, then rename it over path."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class FileLock:
+    """
+    Advisory reader/writer lock between processes, held on a side file
+    (the catalog itself is replaced by rename, so it cannot carry the lock).
+    Uses flock on POSIX; Windows has no shared mode, so readers lock
+    exclusively there too. Not re-entrant: callers track their own depth.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def acquire(self, shared: bool = False):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:  # LK_LOCK gives up after ~10s of retries
+                        time.sleep(0.05)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+
+class WriteAheadLog:
+    """
+    Append-only log of catalog mutations.
+
+    Each line is "<crc32 hex> <json>", where the JSON is either
+    {"op": "put", "book": {...}} or {"op": "del", "isbn": "..."}.
+    The checksum lets replay stop cleanly at a torn trailing record
+    left behind by a crash in the middle of a write.
+    """
+
+    def __init__(self, path: str, durability: str = "flush"):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"durability must be one of {DURABILITY_LEVELS}")
+        self.path = path
+        self.durability = durability
+        self.records = 0  # records currently in the log (since last compaction)
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "ab")
+        return self._file
+
+    @staticmethod
+    def frame(record: Dict) -> str:
+        """Encode any JSON-serializable record as one checksummed log line."""
+        payload = json.dumps(record, separators=(",", ":"))
+        return "%08x %s\n" % (zlib.crc32(payload.encode("utf-8")), payload)
+
+    @staticmethod
+    def encode(op: str, isbn: str, book: Optional[Dict] = None) -> str:
+        if op == "put":
+            return WriteAheadLog.frame({"op": "put", "book": book})
+        if op == "del":
+            return WriteAheadLog.frame({"op": "del", "isbn": isbn})
+        raise ValueError(f"unknown WAL op: {op}")
+
+    def append(self, op: str, isbn: str, book: Optional[Dict] = None):
+        self.append_encoded(self.encode(op, isbn, book), 1)
+
+    def append_encoded(self, text: str, count: int):
+        """
+        Append already-encoded records and apply the durability policy once.
+        The records always reach the OS before this returns, so a writer
+        that takes the file lock next reads them; only "fsync" waits for
+        the disk.
+        """
+        f = self._open()
+        f.write(text.encode("utf-8"))
+        f.flush()
+        if self.durability == "fsync":
+            os.fsync(f.fileno())
+        self.records += count
+
+    def replay(self) -> Iterator[Tuple[str, str, Optional[Dict]]]:
+        """Yield (op, isbn, book_dict) for every intact catalog record in the log."""
+        for rec in self.replay_records():
+            if rec.get("op") == "put":
+                book = rec["book"]
+                yield "put", book["isbn"], book
+            elif rec.get("op") == "del":
+                yield "del", rec["isbn"], None
+
+    def replay_records(self) -> Iterator[Dict]:
+        """Yield every intact record as written by frame().
+
+        A torn or corrupt tail is cut off so later appends start on a clean line.
+        """
+        self.close()  # another process may have replaced the log since we opened it
+        self.records = 0
+        if not os.path.exists(self.path):
+            return
+        good_end = 0
+        with open(self.path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # torn final write
+                crc, _, payload = raw[:-1].partition(b" ")
+                try:
+                    if int(crc, 16) != zlib.crc32(payload):
+                        break
+                    rec = json.loads(payload)
+                except ValueError:
+                    break
+                good_end += len(raw)
+                self.records += 1
+                yield rec
+        if os.path.getsize(self.path) > good_end:
+            with open(self.path, "r+b") as f:
+                f.truncate(good_end)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def truncate(self):
+        """Drop all records; called once a snapshot containing them is durable."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.records = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# ---------- backends ----------
+class StorageBackend:
+    """
+    Interface LibrarySystem persists through.
+
+    load() yields ("put", isbn, record) / ("del", isbn, None) events in
+    catalog order. record() notes one change; commit() makes every noted
+    change durable (LibrarySystem calls it after each mutation, or once per
+    batch). save_all() writes the full catalog.
+    """
+
+    name = ""
+    needs_checkpoint = False  # set by load() when save_all() should run once
+
+    def load(self) -> Iterator[Tuple[str, str, Optional[Dict]]]:
+        raise NotImplementedError
+
+    def open_catalog(self, book_factory) -> Optional[Mapping]:
+        """Return a ready (possibly lazy) isbn -> Book mapping, or None to use load()."""
+        return None
+
+    def record(self, op: str, isbn: str, book: Optional[Dict] = None):
+        raise NotImplementedError
+
+    def commit(self, books: Mapping):
+        raise NotImplementedError
+
+    def save_all(self, books: Mapping):
+        raise NotImplementedError
+
+    def compact(self, books: Mapping):
+        """Reclaim space taken by superseded records, if the format has any."""
+
+    def close(self, books: Mapping):
+        self.commit(books)
+
+    def signature(self):
+        """Cheap token that changes when another process modifies the store (None: never)."""
+        return None
+
+
+def file_signature(path: str):
+    """(mtime, size, inode) of path, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def read_json_catalog(path: str) -> Dict[str, Dict]:
+    """
+    Read a books.json in either the dict (isbn -> book) or list format.
+    An unreadable file is copied to path + ".corrupt" before an empty
+    catalog is returned, so the next save cannot destroy what was there.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+            data = json.loads(content) if content.strip() else {}
+    except FileNotFoundError:
+        data = {}
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        shutil.copyfile(path, path + ".corrupt")
+        data = {}
+    # If data is a list convert to dict keyed by isbn
+    if isinstance(data, list):
+        data = {b["isbn"]: b for b in data}
+    return data if isinstance(data, dict) else {}
+
+
+class JsonBackend(StorageBackend):
+    """Whole-file JSON snapshot, rewritten on each commit."""
+
+    name = "json"
+
+    def __init__(self, path: str, durability: str = "flush"):
+        self.path = path
+        # a log left over from a wal session is folded in on load
+        self.wal = WriteAheadLog(path + ".wal", durability)
+        self._dirty = False
+
+    def load(self):
+        self.needs_checkpoint = False
+        if not os.path.exists(self.path):
+            atomic_write_text(self.path, "{}", fsync=False)  # create empty file
+        for isbn, b in read_json_catalog(self.path).items():
+            yield "put", isbn, b
+        # Replay mutations logged since the last snapshot.
+        yield from self.wal.replay()
+        self.needs_checkpoint = self.wal.records > 0
+
+    def record(self, op, isbn, book=None):
+        self._dirty = True
+
+    def commit(self, books):
+        if self._dirty:
+            self.save_all(books)
+
+    def save_all(self, books):
+        # temp file + fsync + rename: readers see the old or the new catalog, never half of one
+        text = json.dumps({isbn: book.to_dict() for isbn, book in books.items()}, indent=2)
+        atomic_write_text(self.path, text, fsync=self.wal.durability != "none")
+        self._dirty = False
+        self.wal.truncate()
+
+    def signature(self):
+        return file_signature(self.path), file_signature(self.wal.path)
+
+
+class WalBackend(JsonBackend):
+    """
+    JSON snapshot plus write-ahead log: commits append the noted changes
+    and the log is folded into a new snapshot every compact_every records.
+    """
+
+    name = "wal"
+
+    def __init__(self, path: str, durability: str = "flush", compact_every: int = 10000):
+        super().__init__(path, durability)
+        self.compact_every = compact_every
+        self._pending: List[str] = []  # encoded records not yet appended
+
+    def load(self):
+        yield from super().load()
+        self.needs_checkpoint = False
+
+    def record(self, op, isbn, book=None):
+        self._pending.append(WriteAheadLog.encode(op, isbn, book))
+
+    def commit(self, books):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.wal.append_encoded("".join(pending), len(pending))
+            if self.wal.records >= self.compact_every:
+                self.compact(books)
+
+    def save_all(self, books):
+        text = json.dumps({isbn: book.to_dict() for isbn, book in books.items()})
+        atomic_write_text(self.path, text, fsync=self.wal.durability != "none")
+        self._pending = []
+        self.wal.truncate()
+
+    def compact(self, books):
+        self.save_all(books)
+
+    def close(self, books):
+        self.commit(books)
+        if self.wal.records:
+            self.compact(books)
+        self.wal.close()
+
+
+class SqliteBackend(StorageBackend):
+    """
+    One row per book in an SQLite database opened in WAL journal mode.
+    Commits run the noted upserts/deletes in a single transaction, so a
+    one-book change writes one row. get/find_author/year_range query the
+    database directly for tools that do not want the catalog in memory.
+    """
+
+    name = "sqlite"
+    SYNC = {"none": "OFF", "flush": "NORMAL", "fsync": "FULL"}
+
+    def __init__(self, path: str, durability: str = "flush"):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"durability must be one of {DURABILITY_LEVELS}")
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=" + self.SYNC[durability])
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS books (
+                isbn TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                author TEXT NOT NULL,
+                author_norm TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                copies INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS books_author ON books(author_norm);
+            CREATE INDEX IF NOT EXISTS books_year ON books(year);
+        """)
+        self._pending: List[Tuple[str, str, Optional[Dict]]] = []
+
+    COLUMNS = "isbn, title, author, year, copies"
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict:
+        return {"isbn": row[0], "title": row[1], "author": row[2], "year": row[3], "copies": row[4]}
+
+    @staticmethod
+    def _params(b: Dict):
+        return (b["isbn"], b["title"], b["author"], " ".join(str(b["author"]).lower().split()),
+                int(b["year"]), int(b.get("copies", 1)))
+
+    def load(self):
+        self.needs_checkpoint = False
+        for row in self.conn.execute(f"SELECT {self.COLUMNS} FROM books ORDER BY rowid"):
+            yield "put", row[0], self._row_to_dict(row)
+
+    def record(self, op, isbn, book=None):
+        self._pending.append((op, isbn, book))
+
+    def _apply(self, changes):
+        # upsert keeps the rowid, so catalog order survives updates
+        upsert = ("INSERT INTO books (isbn, title, author, author_norm, year, copies) "
+                  "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(isbn) DO UPDATE SET "
+                  "title=excluded.title, author=excluded.author, author_norm=excluded.author_norm, "
+                  "year=excluded.year, copies=excluded.copies")
+        with self.conn:
+            for op, isbn, book in changes:
+                if op == "put":
+                    self.conn.execute(upsert, self._params(book))
+                else:
+                    self.conn.execute("DELETE FROM books WHERE isbn = ?", (isbn,))
+
+    def commit(self, books):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self._apply(pending)
+
+    def save_all(self, books):
+        self._pending = []
+        with self.conn:
+            self.conn.execute("DELETE FROM books")
+            self.conn.executemany(
+                "INSERT INTO books (isbn, title, author, author_norm, year, copies) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._params(b.to_dict()) for b in books.values()))
+
+    def compact(self, books):
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def signature(self):
+        # data_version only moves when another connection commits
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self, books):
+        self.commit(books)
+        self.conn.close()
+
+    # ---------- direct indexed lookups ----------
+    def get(self, isbn: str) -> Optional[Dict]:
+        row = self.conn.execute(f"SELECT {self.COLUMNS} FROM books WHERE isbn = ?", (isbn,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def find_author(self, author: str) -> List[Dict]:
+        norm = " ".join(author.lower().split())
+        rows = self.conn.execute(f"SELECT {self.COLUMNS} FROM books WHERE author_norm = ? ORDER BY rowid", (norm,))
+        return [self._row_to_dict(r) for r in rows]
+
+    def year_range(self, low: int, high: int) -> List[Dict]:
+        rows = self.conn.execute(
+            f"SELECT {self.COLUMNS} FROM books WHERE year BETWEEN ? AND ? ORDER BY year, isbn", (low, high))
+        return [self._row_to_dict(r) for r in rows]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+
+class SnapshotBackend(WalBackend):
+    """
+    Binary snapshot (path with a .snap extension) opened via mmap, plus a
+    write-ahead log for changes since it was written. Startup maps the
+    file and replays the log; records are decoded only when touched.
+    When no snapshot exists yet the JSON file at path is loaded instead
+    and converted once.
+    """
+
+    name = "snapshot"
+
+    def __init__(self, path: str, durability: str = "flush", compact_every: int = 10000):
+        self.json_path = path
+        self.snap_path = os.path.splitext(path)[0] + ".snap"
+        super().__init__(self.snap_path, durability, compact_every)
+        self.catalog = None
+
+    def load(self):
+        return iter(())
+
+    def open_catalog(self, book_factory):
+        from snapshot import Snapshot, SnapshotCatalog
+        self.needs_checkpoint = False
+        if self.catalog is not None:
+            self.catalog.rebase(None)  # reloading: release the previous map
+        if os.path.exists(self.snap_path):
+            self.catalog = SnapshotCatalog(Snapshot(self.snap_path), book_factory)
+        else:
+            # fallback: no snapshot yet, read the JSON catalog and convert it
+            self.catalog = SnapshotCatalog(None, book_factory)
+            for isbn, b in read_json_catalog(self.json_path).items():
+                self.catalog[isbn] = book_factory(b)
+            self.needs_checkpoint = True
+        for op, isbn, b in self.wal.replay():
+            if op == "put":
+                self.catalog[isbn] = book_factory(b)
+            else:
+                self.catalog.pop(isbn, None)
+        return self.catalog
+
+    def save_all(self, books):
+        from snapshot import Snapshot, write_snapshot
+        tmp = self.snap_path + ".new"
+        write_snapshot(tmp, books.values(), fsync=self.wal.durability != "none")
+        if books is self.catalog and self.catalog.snap is not None:
+            self.catalog.snap.close()  # release the map before replacing the file (Windows)
+        os.replace(tmp, self.snap_path)
+        if books is self.catalog:
+            self.catalog.rebase(Snapshot(self.snap_path))
+        self._pending = []
+        self.wal.truncate()
+
+
+def open_backend(storage: str, path: str, durability: str = "flush",
+                 compact_every: int = 10000) -> StorageBackend:
+    if storage == "json":
+        return JsonBackend(path, durability)
+    if storage == "wal":
+        return WalBackend(path, durability, compact_every)
+    if storage == "sqlite":
+        return SqliteBackend(path, durability)
+    if storage == "snapshot":
+        return SnapshotBackend(path, durability, compact_every)
+    raise ValueError(f"storage must be one of {STORAGE_MODES}")
+
+
+def migrate_json(source: str, backend: StorageBackend, book_factory) -> int:
+    """
+    Copy a books.json (dict or list format) into backend, replacing its
+    contents. book_factory turns a record dict into a Book. Returns the
+    number of books written.
+    """
+    books = {isbn: book_factory(b) for isbn, b in read_json_catalog(source).items()}
+    backend.save_all(books)
+    return len(books)
@@ -0,0 +1,61 @@
+import os
+import unittest
+from LMS import LibrarySystem, Book
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_analytics_books.json"
+
+
+class TestCatalogStats(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        self.system = LibrarySystem(data_file=TEST_FILE)
+        with self.system.batch():
+            self.system.add_book(Book("1", "Emma", "Jane Austen", 1815, 2))
+            self.system.add_book(Book("2", "Persuasion", "Jane  Austen", 1817, 1))
+            self.system.add_book(Book("3", "Ulysses", "James Joyce", 1922, 0))
+            self.system.add_book(Book("4", "Dubliners", "James Joyce", 1914, 5))
+        self.stats = self.system.analytics
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_figures_follow_mutations(self):
+        self.assertEqual((self.stats.titles, self.stats.copies), (0, 0))  # counted on first use
+        self.assertEqual(self.stats.author("jane austen"), (2, 3))
+        self.assertEqual(self.stats.decades(), [(1810, 2, 3), (1910, 1, 5), (1920, 1, 0)])
+        self.assertEqual(self.stats.low_stock_books(), [("3", 0), ("2", 1)])
+
+        self.system.update_book("2", author="Homer", year=800, copies=4)
+        self.system.delete_book("3")
+        self.system.add_book(Book("5", "Dracula", "Bram Stoker", 1897, 1))
+        self.assertEqual((self.stats.titles, self.stats.copies), (4, 12))
+        self.assertEqual(self.stats.author("Jane Austen"), (1, 2))
+        self.assertEqual(self.stats.top_authors(2, by="copies"), [("James Joyce", 1, 5), ("Homer", 1, 4)])
+        self.assertEqual(self.stats.year(1922), (0, 0))
+        self.assertEqual(self.stats.decade(1899), (1, 1))
+        self.assertEqual(self.stats.low_stock_books(), [("5", 1)])
+        self.assertNotIn(1920, self.stats.by_decade)
+        self.assertEqual(self.stats.verify(), [])
+
+        report = self.stats.report(top=1)
+        self.assertEqual((report["authors"], report["low_stock"]), (4, [("5", "Dracula", 1)]))
+
+    def test_verify_reports_and_rebuild_repairs(self):
+        self.stats.report()
+        self.stats.by_author["james joyce"][1] += 1
+        self.stats.titles += 1
+        self.assertEqual(sorted(self.stats.verify()),
+                         ["by_author['james joyce']: [2, 6] != [2, 5] scanned", "titles: 5 != 4 scanned"])
+        self.stats.rebuild()
+        self.assertEqual(self.stats.verify(), [])
+
+        self.system.load()  # a reload starts over from a fresh count
+        self.assertFalse(self.stats.built)
+        self.assertEqual(self.stats.author("james joyce"), (2, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
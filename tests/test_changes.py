@@ -0,0 +1,81 @@
+import csv
+import json
+import os
+import unittest
+from LMS import LibrarySystem, Book
+from changes import ChangeLog, changes_path
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_changes_books.json"
+LOG_FILE = changes_path(TEST_FILE)
+DELTA_CSV = "test_changes_delta.csv"
+DELTA_JSONL = "test_changes_delta.jsonl"
+
+
+class TestChangeTracking(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        self.system = LibrarySystem(data_file=TEST_FILE, storage="wal", track_changes=True)
+        with self.system.batch():
+            self.system.add_book(Book("1", "Emma", "Jane Austen", 1815, 2))
+            self.system.add_book(Book("2", "Odyssey", "Homer", 800, 1))
+            self.system.add_book(Book("3", "Persuasion", "Jane Austen", 1817, 1))
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + ".wal", TEST_FILE + LOCK_SUFFIX, LOG_FILE, DELTA_CSV, DELTA_JSONL):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_delta_holds_only_changes_since_checkpoint(self):
+        checkpoint = self.system.checkpoint()
+        self.assertEqual(checkpoint, 3)
+        self.system.update_book("1", copies=5)
+        self.system.delete_book("2")
+        self.system.add_book(Book("4", "Dracula", "Bram Stoker", 1897, 1))
+        self.system.update_book("1", title="Emma (annotated)")
+
+        report = self.system.export_changes(DELTA_CSV, since=checkpoint)
+        with open(DELTA_CSV, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))[1:]
+        self.assertEqual([(r[0], r[1], r[2]) for r in rows],
+                         [("delete", "5", "2"), ("upsert", "6", "4"), ("upsert", "7", "1")])
+        self.assertEqual((rows[2][3], rows[2][6]), ("Emma (annotated)", "5"))
+        self.assertEqual((report.rows, report.checkpoint), (3, 7))
+
+        self.system.export_changes(DELTA_JSONL, since=report.checkpoint)
+        with open(DELTA_JSONL, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "")
+        self.assertEqual(self.system.changes.last_modified("3"), 3)
+
+    def test_sequence_survives_reopen_and_is_shared(self):
+        other = LibrarySystem(data_file=TEST_FILE, storage="wal", track_changes=True)
+        self.system.update_book("3", copies=4)
+        other.add_book(Book("5", "Ulysses", "James Joyce", 1922, 1))  # reloads, then numbers after ours
+        self.system.delete_book("1")
+        self.assertEqual([(seq, isbn) for seq, isbn, _ in self.system.changes.since(3)],
+                         [(4, "3"), (5, "5"), (6, "1")])
+        other.close()
+        self.system.close()
+
+        reopened = LibrarySystem(data_file=TEST_FILE, storage="wal", track_changes=True)
+        self.assertEqual(reopened.changes.seq, 6)
+        reopened.export_changes(DELTA_JSONL, since=5)
+        with open(DELTA_JSONL, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line) for line in f], [{"op": "delete", "seq": 6, "isbn": "1"}])
+
+    def test_log_compacts_and_skips_torn_lines(self):
+        for copies in range(12):
+            self.system.update_book("2", copies=copies)
+        log = self.system.changes
+        log.compact()
+        with open(LOG_FILE, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 3)
+        with open(LOG_FILE, "a", encoding="utf-8") as f:
+            f.write('{"seq": 16, "isb')  # crash mid-append
+        self.system.update_book("3", copies=9)
+        fresh = ChangeLog(LOG_FILE)
+        self.assertEqual(fresh.since(15), [(16, "3", False)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import unittest
+from datetime import date, timedelta
+from LMS import LibrarySystem, Book
+from circulation import Circulation, CirculationError
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_circ_books.json"
+BASE = "test_circ_books"
+DAY = date(2024, 1, 1)
+
+
+class TestCirculation(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        self.system = LibrarySystem(data_file=TEST_FILE)
+        self.system.add_book(Book("111", "Emma", "Jane Austen", 1815, 2))
+        self.system.add_book(Book("222", "Odyssey", "Homer", 800, 1))
+        self.circ = Circulation(self.system)
+        self.circ.add_member("m1", "Ann")
+        self.circ.add_member("m2", "Bob")
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX, BASE + ".loans.json",
+                     BASE + ".loans.wal", BASE + ".loans.history.jsonl"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_checkout_tracks_available_copies(self):
+        circ = self.circ
+        first = circ.checkout("m1", "111", DAY)
+        circ.checkout("m2", "111", DAY)
+        self.assertEqual(circ.status("111"), (0, 2))
+        with self.assertRaises(CirculationError):
+            circ.checkout("m1", "111", DAY)
+        with self.assertRaises(CirculationError):
+            circ.checkout("nobody", "222", DAY)
+        circ.return_loan(first.loan_id, DAY)
+        self.assertEqual(circ.status("111"), (1, 2))
+        self.assertEqual([l.member_id for l in circ.loans_for_isbn("111")], ["m2"])
+        with self.assertRaises(CirculationError):
+            circ.return_loan(first.loan_id)
+
+    def test_due_queries_and_renewal(self):
+        circ = self.circ
+        a = circ.checkout("m1", "111", DAY)
+        b = circ.checkout("m1", "222", DAY + timedelta(days=3))
+        circ.checkout("m2", "111", DAY + timedelta(days=6))
+        circ.renew(a.loan_id, DAY + timedelta(days=10))  # extends from the old due date
+        self.assertEqual(a.due, DAY + timedelta(days=28))
+        today = DAY + timedelta(days=19)
+        self.assertEqual([l.loan_id for l in circ.overdue(today)], [b.loan_id])
+        self.assertEqual([l.member_id for l in circ.due_within(5, today)], ["m2"])
+        self.assertEqual([l.loan_id for l in circ.due_within(10, today)][-1], a.loan_id)
+        self.assertEqual(len(circ.overdue(DAY + timedelta(days=40), limit=2)), 2)
+        circ.renew(a.loan_id, today)
+        with self.assertRaises(CirculationError):
+            circ.renew(a.loan_id, today)
+
+    def test_ledger_survives_restart_and_compaction(self):
+        circ = self.circ
+        with circ.batch():
+            a = circ.checkout("m1", "111", DAY)
+            circ.checkout("m2", "222", DAY)
+        circ.renew(a.loan_id, DAY)
+        circ.return_book("m2", "222", DAY)
+        reopened = Circulation(self.system)
+        self.assertEqual(set(reopened.members), {"m1", "m2"})
+        self.assertEqual(reopened.status("222"), (1, 1))
+        self.assertEqual(reopened.loans[a.loan_id].due, a.due)
+        reopened.compact()
+        self.assertTrue(os.path.exists(BASE + ".loans.history.jsonl"))
+        again = Circulation(self.system)
+        self.assertEqual([l.loan_id for l in again.loans_for_member("m1")], [a.loan_id])
+        self.assertEqual(again.checkout("m2", "222", DAY).loan_id, 3)
+
+    def test_processes_share_one_ledger(self):
+        other = Circulation(LibrarySystem(data_file=TEST_FILE))  # as opened by a second process
+        with self.assertRaises(CirculationError):
+            other.add_member("m1", "Ann again")
+        first = self.circ.checkout("m1", "222", DAY)
+        with self.assertRaises(CirculationError):
+            other.checkout("m2", "222", DAY)  # the only copy is out
+        self.assertEqual(other.checkout("m2", "111", DAY).loan_id, first.loan_id + 1)
+        self.assertEqual(self.circ.checkout("m1", "111", DAY).loan_id, first.loan_id + 2)
+
+        with self.assertRaises(CirculationError):
+            other.system.delete_book("222")
+        self.assertIsNotNone(LibrarySystem(data_file=TEST_FILE).get_book("222"))
+        other.return_book("m1", "222", DAY)
+        other.compact()  # replaces the snapshot and removes the log under the other's feet
+        self.assertTrue(self.system.delete_book("222"))
+        self.circ.return_book("m2", "111", DAY)  # a loan the other made before compacting
+        self.assertEqual(other.status("111"), (0, 2))  # queries read memory until it looks again
+        self.assertTrue(other.reload_if_changed())
+        self.assertEqual(other.status("111"), (1, 2))
+        self.assertEqual(other.checkout("m2", "111", DAY).loan_id, first.loan_id + 3)
+        other.close()
+
+    def test_delete_refused_without_an_open_ledger(self):
+        self.circ.checkout("m1", "111", DAY)
+        self.circ.close()
+        plain = LibrarySystem(data_file=TEST_FILE)  # another process that never opened circulation
+        with self.assertRaises(CirculationError):
+            plain.delete_book("111")
+        self.assertEqual(plain.delete_guards, [])
+        self.assertTrue(plain.delete_book("222"))
+        self.assertIsNotNone(LibrarySystem(data_file=TEST_FILE).get_book("111"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import os
+from LMS import LibrarySystem, Book
+from columnar import ColumnarCatalog
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_columnar_books.json"
+
+
+class TestColumnarCatalog(unittest.TestCase):
+    def setUp(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+        self.system = LibrarySystem(data_file=TEST_FILE, columnar=True)
+        with self.system.batch():
+            for i in range(10):
+                self.system.add_book(Book(str(i), f"Title {i}", "Austen" if i % 2 else "Homer", 1990 + i, i))
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_behaves_like_dict_catalog(self):
+        system = self.system
+        self.assertIsInstance(system.books, ColumnarCatalog)
+        self.assertEqual(len(system.books.author_names), 2)  # authors interned
+        system.update_book("3", title="Changed", copies=42)
+        system.put_book(Book("5", "Replaced", "Homer", 1800, 1))
+        for i in range(6, 10):
+            system.delete_book(str(i))  # triggers column compaction
+        self.assertEqual(list(system.books), ["0", "1", "2", "3", "4", "5"])
+        self.assertEqual(system.get_book("3").to_dict(),
+                         {"isbn": "3", "title": "Changed", "author": "Austen", "year": 1993, "copies": 42})
+        self.assertEqual([b.isbn for b in system.search("homer")], ["0", "2", "4", "5"])
+        self.assertEqual([b.isbn for b in system.find(year=(1800, 1801))], ["5"])
+
+        reopened = LibrarySystem(data_file=TEST_FILE)
+        self.assertEqual({k: b.to_dict() for k, b in reopened.books.items()},
+                         {k: b.to_dict() for k, b in system.books.items()})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import csv
+import gzip
+import shutil
+from LMS import LibrarySystem, Book
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_export_books.json"
+OUT_DIR = "test_export_out"
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        self.system = LibrarySystem(data_file=TEST_FILE)
+        with self.system.batch():
+            for i in range(7):
+                self.system.add_book(Book(str(i), f"Title {i}", "Austen" if i % 2 else "Homer", 1990 + i, i))
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(OUT_DIR, ignore_errors=True)
+
+    def read(self, path, opener=open):
+        with opener(path, "rt", newline="", encoding="utf-8") as f:
+            return list(csv.reader(f))
+
+    def test_export_to_csv_keeps_layout(self):
+        path = self.system.export_to_csv(os.path.join(OUT_DIR, "books.csv"))
+        rows = self.read(path)
+        self.assertEqual(rows[0], ["ISBN", "Title", "Author", "Year", "Copies"])
+        self.assertEqual(rows[1], ["0", "Title 0", "Homer", "1990", "0"])
+        self.assertEqual(len(rows), 8)
+
+    def test_filtered_gzip_parts_with_progress(self):
+        seen = []
+        report = self.system.export(os.path.join(OUT_DIR, "books.csv"), query="austen",
+                                    compress=True, part_rows=1, progress=lambda d, t: seen.append(d),
+                                    year=(1992, None))
+        self.assertEqual(report.rows, 2)
+        self.assertEqual([os.path.basename(p) for p in report.paths],
+                         ["books.part0001.csv.gz", "books.part0002.csv.gz"])
+        rows = self.read(report.paths[0], gzip.open) + self.read(report.paths[1], gzip.open)[1:]
+        self.assertEqual([r[0] for r in rows[1:]], ["3", "5"])
+        self.assertEqual(seen[-1], 2)
+
+    def test_rejects_part_rows_below_one(self):
+        for part_rows in (0, -1):
+            with self.assertRaises(ValueError):
+                self.system.export(os.path.join(OUT_DIR, "books.csv"), part_rows=part_rows)
+        self.assertFalse(os.path.exists(OUT_DIR))
+
+    def test_exports_shown_rows(self):
+        shown = [b.isbn for b in self.system.search("titles 5", ranked=True, limit=2)]  # typo: not a substring
+        self.assertEqual(len(shown), 2)
+        self.system.delete_book(shown[1])  # gone since the table was drawn
+        report = self.system.export(os.path.join(OUT_DIR, "shown.csv"), isbns=shown)
+        self.assertEqual([r[0] for r in self.read(report.paths[0])[1:]], shown[:1])
+        self.assertEqual(report.rows, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
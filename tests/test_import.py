@@ -0,0 +1,64 @@
+import unittest
+import os
+import json
+from LMS import LibrarySystem, Book
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_import_books.json"
+CSV_FILE = "test_import.csv"
+JSONL_FILE = "test_import.jsonl"
+
+
+class TestBulkImport(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        self.system = LibrarySystem(data_file=TEST_FILE)
+        self.system.add_book(Book("111", "Old", "Auth", 1990, 1))
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + ".wal", TEST_FILE + LOCK_SUFFIX, CSV_FILE, JSONL_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def write_csv(self):
+        with open(CSV_FILE, "w", encoding="utf-8") as f:
+            f.write("ISBN,Title,Author,Year,Copies\n")
+            f.write("111,New,Auth,1991,4\n")
+            f.write("222,B,C,2001,\n")
+            f.write("333,D,E,not-a-year,1\n")
+
+    def test_csv_insert_rejects_duplicates_and_bad_rows(self):
+        self.write_csv()
+        report = self.system.bulk_import(CSV_FILE)
+        self.assertEqual((report.rows, report.inserted, report.updated), (3, 1, 0))
+        self.assertEqual(sorted(r for r, _ in report.rejected), [2, 4])
+        self.assertEqual(self.system.get_book("222").copies, 1)
+        self.assertEqual(self.system.get_book("111").title, "Old")
+        with open(TEST_FILE, encoding="utf-8") as f:
+            self.assertIn("222", json.load(f))
+
+    def test_csv_upsert_and_skip(self):
+        self.write_csv()
+        report = self.system.bulk_import(CSV_FILE, policy="upsert")
+        self.assertEqual((report.inserted, report.updated), (1, 1))
+        self.assertEqual(self.system.get_book("111").copies, 4)
+        self.assertEqual(self.system.search("new")[0].isbn, "111")
+        report = self.system.bulk_import(CSV_FILE, policy="skip")
+        self.assertEqual((report.inserted, report.skipped), (0, 2))
+
+    def test_jsonl_in_wal_mode_commits_every_n(self):
+        system = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        with open(JSONL_FILE, "w", encoding="utf-8") as f:
+            for i in range(5):
+                f.write(json.dumps({"isbn": str(1000 + i), "title": "T", "author": "A", "year": 2000}) + "\n")
+            f.write("{broken\n")
+        report = system.bulk_import(JSONL_FILE, batch_size=2, commit_every=2)
+        self.assertEqual(report.inserted, 5)
+        self.assertEqual(len(report.rejected), 1)
+        self.assertEqual(system.backend.wal.records, 5)
+        reopened = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        self.assertEqual(len(reopened.books), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
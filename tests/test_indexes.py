@@ -0,0 +1,98 @@
+import contextlib
+import io
+import unittest
+import os
+from LMS import LibrarySystem, Book, print_table
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_index_books.json"
+
+
+class TestSecondaryIndexes(unittest.TestCase):
+    def setUp(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+        self.system = LibrarySystem(data_file=TEST_FILE)
+        with self.system.batch():
+            self.system.add_book(Book("1", "Emma", "Jane Austen", 1815, 1))
+            self.system.add_book(Book("2", "Persuasion", "Jane  Austen", 1817, 3))
+            self.system.add_book(Book("3", "Ulysses", "James Joyce", 1922, 0))
+            self.system.add_book(Book("4", "Dubliners", "James Joyce", 1914, 5))
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def isbns(self, books):
+        return [b.isbn for b in books]
+
+    def test_range_equality_and_prefix(self):
+        self.assertEqual(self.isbns(self.system.find(year=(1815, 1914))), ["1", "2", "4"])
+        self.assertEqual(self.isbns(self.system.find(year=1922)), ["3"])
+        self.assertEqual(self.isbns(self.system.find(copies=(None, 1))), ["3", "1"])
+        self.assertEqual(self.isbns(self.system.find(author="JANE AUSTEN")), ["1", "2"])
+        self.assertEqual(self.isbns(self.system.find(author_prefix="jam")), ["3", "4"])
+        self.assertEqual(self.isbns(self.system.find(author="james joyce", year=(1920, None))), ["3"])
+        self.assertEqual(self.system.indexes["title"].range(), ["4", "1", "2", "3"])
+
+    def test_indexes_follow_mutations(self):
+        self.system.find(year=1815)  # build
+        self.system.update_book("1", year=1990, copies=9)
+        self.system.delete_book("4")
+        self.system.add_book(Book("5", "Dracula", "Bram Stoker", 1897, 2))
+        self.assertEqual(self.isbns(self.system.find(year=(1800, 1900))), ["2", "5"])
+        self.assertEqual(self.isbns(self.system.find(copies=(5, None))), ["1"])
+        self.assertEqual(self.isbns(self.system.find(author="james joyce")), ["3"])
+
+    def pages(self, fetch, size):
+        out, cursor = [], None
+        while True:
+            page = fetch(cursor, size)
+            out.append(self.isbns(page))
+            if not page.more:
+                return out
+            cursor = page.cursor
+
+    def test_sorted_pages_follow_cursor(self):
+        fetch = lambda cursor, size: self.system.list_books(sort="title", cursor=cursor, page_size=size)
+        self.assertEqual(self.pages(fetch, 3), [["4", "1", "2"], ["3"]])
+        page = fetch(None, 2)
+        self.assertEqual(self.isbns(page), ["4", "1"])
+        self.system.add_book(Book("0", "Dracula", "Bram Stoker", 1897, 2))  # sorts before the cursor
+        self.system.delete_book("2")
+        self.assertEqual(self.isbns(fetch(page.cursor, 2)), ["3"])
+        desc = self.system.list_books(sort="year", descending=True, offset=1, page_size=2)
+        self.assertEqual(self.isbns(desc), ["4", "0"])
+        self.assertEqual(self.isbns(self.system.list_books()), ["1", "3", "4", "0"])  # unpaged: a list
+
+    def test_catalog_order_and_search_pages(self):
+        fetch = lambda cursor, size: self.system.list_books(cursor=cursor, page_size=size)
+        self.assertEqual(self.pages(fetch, 3), [["1", "2", "3"], ["4"]])
+        fetch = lambda cursor, size: self.system.search("s", cursor=cursor, page_size=size)
+        self.assertEqual(self.pages(fetch, 2), [["1", "2"], ["3", "4"]])
+        fetch = lambda cursor, size: self.system.search("s", sort="author", descending=True,
+                                                        cursor=cursor, page_size=size)
+        self.assertEqual(self.pages(fetch, 3), [["2", "1", "4"], ["3"]])
+        with self.assertRaises(ValueError):
+            self.system.list_books(sort="colour")
+
+    def test_print_table_streams_in_chunks(self):
+        self.system.update_book("3", title="U" * 100)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            printed = print_table(self.system.list_books(sort="isbn", page_size=10), chunk_rows=2)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(printed, 4)
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(all(len(line) <= len(lines[1]) for line in lines))  # long titles are cut
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            print_table([self.system.get_book("3")], max_width=None)  # CLI "View book"
+        self.assertIn("U" * 100, out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import types
+import unittest
+from unittest import mock
+import instrumentation
+from LMS import LibrarySystem, Book
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_profile_books.json"
+EXPORT = "test_profile_export.csv"
+
+
+class TimedSystem(LibrarySystem):
+    pass  # instrumented alone, so other tests keep the plain LibrarySystem
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        instrumentation._metrics = self.metrics = instrumentation.Metrics()
+        instrumentation.instrument_system(TimedSystem)
+
+    def tearDown(self):
+        instrumentation._metrics = None
+        for path in (TEST_FILE, TEST_FILE + ".wal", TEST_FILE + LOCK_SUFFIX, EXPORT):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_counts_bytes_and_records(self):
+        system = TimedSystem(data_file=TEST_FILE, storage="wal")
+        system.add_book(Book("1", "Emma", "Jane Austen", 1815, 2))
+        system.add_book(Book("1", "Emma", "Jane Austen", 1815, 2))  # duplicate: nothing written
+        system.update_book("1", copies=3)
+        list(system.search("emma", ranked=True, page_size=5))  # pages call search again inside
+        system.export_to_csv(EXPORT)
+        with self.assertRaises(ValueError):
+            system.update_book("1", year="soon")
+        system.close()
+
+        timings = self.metrics.to_dict()["timings"]
+        add = timings["LibrarySystem.add_book"]
+        self.assertEqual((add["count"], add["records"]), (2, 1))
+        self.assertGreater(add["bytes"], 0)  # the appended log record
+        self.assertEqual(timings["LibrarySystem.search"]["count"], 1)
+        self.assertEqual(timings["LibrarySystem.update_book"]["errors"], 1)
+        export = timings["LibrarySystem.export_to_csv"]
+        self.assertEqual(export["bytes"], os.path.getsize(EXPORT))
+        self.assertEqual(timings["LibrarySystem.export"]["records"], 1)
+        load = timings["LibrarySystem.load"]
+        self.assertEqual(sum(load["histogram"].values()), load["count"])
+        self.assertLessEqual(load["p99_ms"], load["max_ms"])
+        self.assertIn("LibrarySystem.add_book", self.metrics.summary())
+
+    def test_gui_hot_paths(self):
+        class Table:  # stands in for gui.VirtualTable: render draws the visible window
+            def __init__(self):
+                self.keys, self.items = [], []
+
+            def render(self):
+                self.items = self.keys[:2]
+
+        class GUI:
+            def __init__(self):
+                self.table = Table()
+
+            def update_table(self, rows):
+                self.table.keys = list(rows)
+                self.table.render()
+
+        system = TimedSystem(data_file=TEST_FILE)
+        system.add_book(Book("1", "Emma", "Jane Austen", 1815, 2))
+        module = types.SimpleNamespace(shared_library=lambda: system, VirtualTable=Table, LibraryGUI=GUI)
+        instrumentation.instrument_gui(module)
+        module.shared_library()
+        gui = GUI()
+        gui.update_table(["1", "2", "3"])
+        gui.table.render()  # a scroll
+
+        timings = self.metrics.to_dict()["timings"]
+        self.assertEqual(timings["gui.shared_library"]["records"], 1)
+        self.assertEqual((timings["VirtualTable.render"]["count"], timings["VirtualTable.render"]["records"]), (2, 4))
+        self.assertEqual(timings["LibraryGUI.update_table"]["records"], 3)
+
+    def test_off_unless_asked(self):
+        instrumentation._metrics = None
+        with mock.patch.dict(os.environ, {instrumentation.ENV_VAR: "", instrumentation.CPROFILE_ENV_VAR: ""}):
+            self.assertIsNone(instrumentation.enable_from_env())
+        self.assertFalse(instrumentation.enabled())
+        self.assertFalse(getattr(LibrarySystem.add_book, "_instrumented", False))
+
+
+if __name__ == "__main__":
+    unittest.main()
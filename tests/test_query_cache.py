@@ -0,0 +1,65 @@
+import os
+import unittest
+from LMS import LibrarySystem, Book
+from query_cache import QueryCache
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_cache_books.json"
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        self.system = LibrarySystem(data_file=TEST_FILE)
+        with self.system.batch():
+            self.system.add_book(Book("1", "Emma", "Jane Austen", 1815, 2))
+            self.system.add_book(Book("2", "Odyssey", "Homer", 800, 1))
+            self.system.add_book(Book("3", "Persuasion", "Jane Austen", 1817, 1))
+        self.cache = self.system.query_cache
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_repeat_queries_hit(self):
+        first = self.system.search("AUSTEN")
+        self.assertEqual([b.isbn for b in self.system.search("austen")], [b.isbn for b in first])
+        self.system.find(author="jane  austen")
+        self.system.find(author="Jane Austen")
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+    def test_only_affected_entries_are_dropped(self):
+        self.system.search("austen")
+        self.system.search("homer")
+        self.system.find(year=(1800, 1820))
+        self.system.update_book("2", copies=5)  # Homer: not an Austen book, not in 1800-1820
+        self.assertEqual(self.cache.invalidations, 1)
+        self.system.search("austen")
+        self.system.find(year=(1800, 1820))
+        self.assertEqual(self.cache.hits, 2)
+        self.system.add_book(Book("4", "Sanditon", "Jane Austen", 1817, 1))
+        self.assertEqual([b.isbn for b in self.system.search("austen")], ["1", "3", "4"])
+        self.assertEqual([b.isbn for b in self.system.find(year=(1800, 1820))], ["1", "3", "4"])
+        self.system.update_book("3", year=1900)  # leaves the year range
+        self.assertEqual([b.isbn for b in self.system.find(year=(1800, 1820))], ["1", "4"])
+        self.system.search("odysey", ranked=True)
+        self.system.update_book("1", title="Emma Odyssey")  # now a fuzzy match
+        self.assertEqual([b.isbn for b in self.system.search("odysey", ranked=True)], ["1", "2"])
+
+    def test_lru_limits(self):
+        cache = QueryCache(max_entries=2, max_rows=3)
+        cache.put("a", [1], lambda b: True)
+        cache.put("b", [1], lambda b: True)
+        cache.get("a")
+        cache.put("c", [1], lambda b: True)  # evicts b, the least recently used
+        self.assertIsNone(cache.get("b"))
+        cache.put("d", [1, 2, 3], lambda b: True)  # row limit leaves room for d only
+        self.assertEqual(list(cache.entries), ["d"])
+        self.assertEqual(cache.stats()["evictions"], 3)
+        self.system.load()
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
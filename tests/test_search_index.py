@@ -0,0 +1,82 @@
+import unittest
+import os
+from LMS import LibrarySystem, Book
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_search_books.json"
+
+
+def scan(system, query):
+    q = query.lower()
+    return [b for b in system.books.values()
+            if q in b.title.lower() or q in b.author.lower() or q in b.isbn.lower()]
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+        self.system = LibrarySystem(data_file=TEST_FILE)
+        self.system.add_book(Book("9780140449136", "The Odyssey", "Homer", 1999, 3))
+        self.system.add_book(Book("9780679783268", "Pride and Prejudice", "Jane Austen", 2000, 2))
+        self.system.add_book(Book("85757", "The Galaxy", "Akash", 2022, 1))
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def assertMatchesScan(self, query):
+        self.assertEqual(self.system.search(query), scan(self.system, query))
+
+    def test_matches_substring_scan(self):
+        for q in ["", "t", "th", "the", "ODYS", "austen", "978", "5757", "xyz", "e g"]:
+            self.assertMatchesScan(q)
+
+    def test_index_follows_mutations(self):
+        self.assertMatchesScan("the")  # builds the index
+        self.system.add_book(Book("1", "Theory of Everything", "Hawking", 1988, 1))
+        self.system.update_book("85757", title="Cosmos")
+        self.system.delete_book("9780140449136")
+        for q in ["the", "galaxy", "cosmos", "odyssey", "hawk"]:
+            self.assertMatchesScan(q)
+        self.assertEqual([b.isbn for b in self.system.search("the")], ["1"])
+
+    def test_limit_keeps_catalog_order(self):
+        self.assertEqual([b.isbn for b in self.system.search("e", limit=2)],
+                         [b.isbn for b in self.system.search("e")][:2])
+
+    def isbns(self, query, **kw):
+        return [b.isbn for b in self.system.search(query, ranked=True, **kw)]
+
+    def test_ranked_tolerates_typos(self):
+        self.assertEqual(self.isbns("Odysey"), ["9780140449136"])
+        self.assertEqual(self.isbns("pride prejudise")[0], "9780679783268")
+        self.assertEqual(self.isbns("jane austin"), ["9780679783268"])
+        self.assertEqual(self.isbns("odysey", max_edits=0), [])
+        self.assertEqual(self.isbns("xyzzy"), [])
+
+    def test_ranked_scores_and_limits(self):
+        self.system.add_book(Book("2", "Odyssey Guide", "Homer Fan", 2010, 1))
+        self.system.add_book(Book("3", "Notes", "Odyssey Society", 2011, 1))
+        self.assertEqual(self.isbns("the odyssey")[0], "9780140449136")
+        self.assertEqual(self.isbns("odyssey"), ["9780140449136", "2", "3"])  # title beats author
+        self.assertEqual(self.isbns("odyssey", limit=1), ["9780140449136"])
+        self.assertEqual(self.isbns("978014"), ["9780140449136"])  # isbn prefix
+        self.system.update_book("2", title="Iliad Guide")
+        self.system.delete_book("3")
+        self.assertEqual(self.isbns("odyssey"), ["9780140449136"])
+
+    def test_ranked_keeps_substring_matches(self):
+        self.assertEqual(self.isbns("0449"), ["9780140449136"])  # inside the isbn
+        self.assertEqual(self.isbns("ust"), ["9780679783268"])   # inside "Austen"
+        self.assertEqual(self.isbns(""), ["9780140449136", "9780679783268", "85757"])
+        self.assertEqual(self.isbns("", limit=2), ["9780140449136", "9780679783268"])
+        self.system.add_book(Book("4", "Rust Belt", "Ann Lee", 1990, 1))
+        self.system.add_book(Book("5", "Ust-Kut", "Ann Lee", 1991, 1))
+        self.assertEqual(self.isbns("ust"), ["5", "9780679783268", "4"])  # the word match first
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+import unittest
+from LMS import LibrarySystem, Book, EXPORT_FOLDER
+from circulation import Circulation
+from server import LibraryServer
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_server_books.json"
+EXPORT_NAME = "test_server_export.csv"
+LEDGER = "test_server_books"
+
+
+def request(method, target, body=None, content_type="application/json"):
+    data = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n"
+    if method != "GET" and content_type:
+        head += f"Content-Type: {content_type}\r\n"
+    return (head + "\r\n").encode() + data
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+    return status, json.loads(await reader.readexactly(length))
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        system = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        system.add_book(Book("111", "Emma", "Jane Austen", 1815, 2))
+        system.close()
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + ".wal", TEST_FILE + LOCK_SUFFIX, LEDGER + ".loans.wal",
+                     os.path.join(EXPORT_FOLDER, EXPORT_NAME), "test_server_escape.csv"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def run_session(self, requests, before=None):
+        async def session():
+            server = LibraryServer(LibrarySystem(data_file=TEST_FILE, storage="wal"))
+            host, port = await server.start("127.0.0.1", 0)
+            if before is not None:
+                before()
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"".join(request(*r) for r in requests))  # all pipelined at once
+            await writer.drain()
+            responses = [await read_response(reader) for _ in requests]
+            writer.close()
+            await server.close()
+            return responses
+        return asyncio.run(session())
+
+    def test_pipelined_requests_answered_in_order(self):
+        responses = self.run_session([
+            ("GET", "/books/111"),
+            ("POST", "/books", {"isbn": "222", "title": "Odyssey", "author": "Homer", "year": 800}),
+            ("POST", "/books", {"isbn": "222", "title": "Again", "author": "Homer", "year": 800}),
+            ("PUT", "/books/111", {"copies": 5}),
+            ("GET", "/search?q=odys"),
+            ("DELETE", "/books/missing"),
+            ("GET", "/books?limit=10"),
+            ("GET", "/books?sort=title&limit=1"),
+            ("GET", "/books?sort=title&cursor=%5B%22emma%22%2C%22111%22%5D"),
+        ])
+        self.assertEqual([status for status, _ in responses], [200, 201, 409, 200, 200, 404, 200, 200, 200])
+        self.assertEqual(responses[0][1]["title"], "Emma")
+        self.assertEqual(responses[3][1]["copies"], 5)
+        self.assertEqual([b["isbn"] for b in responses[4][1]["books"]], ["222"])
+        self.assertEqual(responses[6][1]["total"], 2)
+        first, rest = responses[7][1], responses[8][1]
+        self.assertEqual(([b["isbn"] for b in first["books"]], first["more"], first["cursor"]),
+                         (["111"], True, ["emma", "111"]))
+        self.assertEqual(([b["isbn"] for b in rest["books"]], rest["more"]), (["222"], False))
+
+        reopened = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        self.assertEqual(reopened.get_book("111").copies, 5)
+        self.assertEqual(reopened.get_book("222").title, "Odyssey")
+
+    def test_commit_picks_up_other_writers(self):
+        def outside():  # another process commits while the server is running
+            other = LibrarySystem(data_file=TEST_FILE, storage="wal")
+            other.add_book(Book("999", "Ulysses", "James Joyce", 1922, 1))
+            other.close()
+
+        responses = self.run_session([
+            ("POST", "/books", {"isbn": "222", "title": "Odyssey", "author": "Homer", "year": 800}),
+        ], before=outside)
+        self.assertEqual(responses[0][0], 201)
+        self.assertEqual(set(LibrarySystem(data_file=TEST_FILE, storage="wal").books), {"111", "222", "999"})
+
+    def test_bad_input(self):
+        responses = self.run_session([
+            ("POST", "/books", {"isbn": "333", "title": "T"}),
+            ("PUT", "/books/111", {"year": "soon"}),
+            ("GET", "/nowhere"),
+            ("GET", "/books?sort=colour"),
+            ("GET", "/books?sort=year&cursor=7"),
+        ])
+        self.assertEqual([status for status, _ in responses], [400, 400, 404, 400, 400])
+
+    def test_delete_of_book_on_loan_conflicts(self):
+        system = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        ledger = Circulation(system)
+        ledger.add_member("m1", "Ann")
+        ledger.checkout("m1", "111")
+        ledger.close()
+        system.close()
+        responses = self.run_session([("DELETE", "/books/111"), ("GET", "/books/111")])
+        self.assertEqual([status for status, _ in responses], [409, 200])
+
+    def test_book_fields_checked_before_saving(self):
+        book = {"isbn": "333", "title": "T", "author": "A", "year": 1, "copies": 1}
+        responses = self.run_session([
+            ("POST", "/books", dict(book, title=5)),
+            ("POST", "/books", dict(book, title=None)),
+            ("POST", "/books", dict(book, author="  ")),
+            ("POST", "/books", dict(book, author=["A"])),
+            ("POST", "/books", dict(book, year="1999")),
+            ("POST", "/books", dict(book, copies=1.5)),
+            ("POST", "/books", dict(book, isbn=None)),
+            ("PUT", "/books/111", {"title": 7}),
+            ("PUT", "/books/111", {"author": None}),
+            ("PUT", "/books/111", {"copies": True}),
+            ("GET", "/books?sort=title&limit=5"),
+        ])
+        self.assertEqual([status for status, _ in responses], [400] * 10 + [200])
+        self.assertEqual([b["isbn"] for b in responses[-1][1]["books"]], ["111"])
+        reopened = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        self.assertEqual(reopened.get_book("111").to_dict(),
+                         {"isbn": "111", "title": "Emma", "author": "Jane Austen", "year": 1815, "copies": 2})
+
+    def test_writes_need_json_and_exports_stay_in_folder(self):
+        responses = self.run_session([
+            ("POST", "/books", {"isbn": "333", "title": "T", "author": "A", "year": 1}, "text/plain"),
+            ("DELETE", "/books/111", None, None),
+            ("POST", "/export", {"name": "../test_server_escape.csv"}),
+            ("POST", "/export", {"name": os.path.abspath("test_server_escape.csv")}),
+            ("POST", "/export", {"path": "test_server_escape.csv", "name": EXPORT_NAME}),
+        ])
+        self.assertEqual([status for status, _ in responses], [415, 415, 400, 400, 200])
+        self.assertEqual(responses[4][1]["paths"], [os.path.join(EXPORT_FOLDER, EXPORT_NAME)])
+        self.assertFalse(os.path.exists("test_server_escape.csv"))
+        reopened = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        self.assertEqual((reopened.get_book("333"), reopened.get_book("111").title), (None, "Emma"))
+
+
+if __name__ == "__main__":
+    unittest.main()
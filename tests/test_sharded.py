@@ -0,0 +1,62 @@
+import os
+import unittest
+from unittest import mock
+from LMS import LibrarySystem, Book
+from sharded import ShardedSearch
+from storage import LOCK_SUFFIX
+
+TEST_FILE = "test_sharded_books.json"
+
+
+class TestShardedSearch(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        self.system = LibrarySystem(data_file=TEST_FILE, shards=2, shard_threshold=0)
+        with self.system.batch():
+            for i in range(40):
+                self.system.add_book(Book(f"isbn{i}", f"Title {i}", "Austen" if i % 3 else "Homer", 1980 + i, i % 4))
+        self.plain = LibrarySystem(data_file=TEST_FILE)
+
+    def tearDown(self):
+        if getattr(self, "system", None) is not None:
+            self.system.close()
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def isbns(self, books):
+        return [b.isbn for b in books]
+
+    def test_matches_single_process_search(self):
+        for q in ["", "1", "title 2", "HOMER", "isbn3", "nothing"]:
+            self.assertEqual(self.isbns(self.system.search(q)), self.isbns(self.plain.search(q)))
+        self.assertEqual(self.isbns(self.system.search("title", limit=5)), [f"isbn{i}" for i in range(5)])
+
+    def test_follows_mutations_and_filters(self):
+        self.system.search("title")  # starts the workers
+        self.system.add_book(Book("new", "Title New", "Homer", 2020, 1))
+        self.system.update_book("isbn1", title="Renamed")
+        self.system.delete_book("isbn0")
+        self.plain.load()
+        for q in ["title", "renamed", "new", "isbn0"]:
+            self.assertEqual(self.isbns(self.system.search(q)), self.isbns(self.plain.search(q)))
+        expected = [b.isbn for b in self.plain.search("title") if b.author == "Homer" and b.year >= 2000]
+        self.assertEqual(self.isbns(self.system.select("title", author="homer", year=(2000, None))), expected)
+
+    def test_list_filters_and_dead_workers(self):
+        expected = [b.isbn for b in self.plain.search("title") if 1990 <= b.year <= 2000]
+        self.assertEqual(self.isbns(self.system.select("title", year=[1990, 2000])), expected)
+        sharded = self.system.sharded
+        sharded._procs[0].kill()
+        sharded._procs[0].join()
+        self.system.update_book("isbn1", title="Renamed")  # the change cannot reach the dead shard
+        self.plain.load()
+        for q in ["title", "renamed"]:
+            self.assertEqual(self.isbns(self.system.search(q)), self.isbns(self.plain.search(q)))
+        self.assertTrue(all(proc.is_alive() for proc in sharded._procs))
+        with mock.patch.object(ShardedSearch, "_query", side_effect=EOFError):  # workers keep dying
+            self.assertEqual(self.isbns(self.system.select("title", year=[1990, 2000])), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
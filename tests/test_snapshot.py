@@ -0,0 +1,70 @@
+import unittest
+import os
+import json
+from LMS import LibrarySystem, Book
+from snapshot import Snapshot, SnapshotCatalog, write_snapshot, main as snapshot_main
+from storage import LOCK_SUFFIX
+
+JSON_FILE = "test_snap_books.json"
+SNAP_FILE = "test_snap_books.snap"
+ROUND_TRIP = "test_snap_round_trip.json"
+
+BOOKS = {
+    "9780140449136": {"isbn": "9780140449136", "title": "The Odyssey", "author": "Homer", "year": 1999, "copies": 6},
+    "85757": {"isbn": "85757", "title": "Galaxy été", "author": "Akash", "year": 2022, "copies": 2},
+    "111": {"isbn": "111", "title": "Iliad", "author": "Homer", "year": -700, "copies": 1},
+}
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        with open(JSON_FILE, "w", encoding="utf-8") as f:
+            json.dump(BOOKS, f)
+
+    def tearDown(self):
+        for path in (JSON_FILE, JSON_FILE + LOCK_SUFFIX, SNAP_FILE, SNAP_FILE + ".wal", ROUND_TRIP):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_round_trip_and_lookup(self):
+        snapshot_main(["to-snapshot", JSON_FILE, SNAP_FILE])
+        snap = Snapshot(SNAP_FILE)
+        self.assertEqual(snap.count, 3)
+        self.assertEqual(snap.record(snap.find("85757")), BOOKS["85757"])
+        self.assertIsNone(snap.find("999"))
+        snap.close()
+        snapshot_main(["to-json", SNAP_FILE, ROUND_TRIP])
+        with open(ROUND_TRIP, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), BOOKS)
+
+    def test_lazy_catalog_with_log(self):
+        system = LibrarySystem(data_file=JSON_FILE, storage="snapshot")
+        self.assertTrue(os.path.exists(SNAP_FILE))  # converted from JSON on first open
+        system.update_book("111", copies=9)
+        system.delete_book("9780140449136")
+        system.add_book(Book("222", "New", "Someone", 2020, 1))
+
+        reopened = LibrarySystem(data_file=JSON_FILE, storage="snapshot")
+        self.assertIsInstance(reopened.books, SnapshotCatalog)
+        self.assertEqual(list(reopened.books), ["85757", "111", "222"])
+        self.assertEqual(reopened.get_book("111").copies, 9)
+        self.assertIsNone(reopened.get_book("9780140449136"))
+        self.assertEqual([b.isbn for b in reopened.search("homer")], ["111"])
+
+        reopened.close()  # folds the log into a new snapshot
+        self.assertFalse(os.path.exists(SNAP_FILE + ".wal"))
+        fresh = LibrarySystem(data_file=JSON_FILE, storage="snapshot")
+        self.assertEqual(fresh.books.live, {})  # nothing decoded yet
+        self.assertEqual(len(fresh.books), 3)
+        self.assertEqual(fresh.get_book("222").title, "New")
+
+    def test_empty_snapshot(self):
+        write_snapshot(SNAP_FILE, [])
+        snap = Snapshot(SNAP_FILE)
+        self.assertEqual((snap.count, snap.find("x")), (0, None))
+        snap.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
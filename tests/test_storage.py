@@ -0,0 +1,195 @@
+import unittest
+import os
+import json
+import subprocess
+import sys
+import threading
+from LMS import LibrarySystem, Book, main, parse_args
+from storage import SqliteBackend, LOCK_SUFFIX
+
+TEST_FILE = "test_wal_books.json"
+WAL_FILE = TEST_FILE + ".wal"
+DB_FILE = "test_books.db"
+
+
+class TestWalStorage(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+
+    def tearDown(self):
+        for path in (TEST_FILE, WAL_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_mutations_are_appended_and_replayed(self):
+        system = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        system.add_book(Book("111", "A", "B", 2000, 1))
+        system.add_book(Book("222", "C", "D", 2001, 2))
+        system.update_book("111", title="A2")
+        system.delete_book("222")
+        with open(TEST_FILE, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {})  # snapshot untouched until compaction
+        self.assertEqual(system.backend.wal.records, 4)
+
+        reopened = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        self.assertEqual(reopened.get_book("111").title, "A2")
+        self.assertIsNone(reopened.get_book("222"))
+
+    def test_compaction_rewrites_snapshot(self):
+        system = LibrarySystem(data_file=TEST_FILE, storage="wal", compact_every=2)
+        system.add_book(Book("111", "A", "B", 2000, 1))
+        system.add_book(Book("222", "C", "D", 2001, 2))
+        self.assertFalse(os.path.exists(WAL_FILE))
+        with open(TEST_FILE, encoding="utf-8") as f:
+            self.assertEqual(set(json.load(f)), {"111", "222"})
+
+    def test_torn_tail_is_ignored(self):
+        system = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        system.add_book(Book("111", "A", "B", 2000, 1))
+        system.backend.wal.close()
+        with open(WAL_FILE, "a", encoding="utf-8") as f:
+            f.write('deadbeef {"op":"put","bo')
+        reopened = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        self.assertEqual(list(reopened.books), ["111"])
+        reopened.add_book(Book("222", "C", "D", 2001, 2))
+        self.assertEqual(set(LibrarySystem(data_file=TEST_FILE, storage="wal").books), {"111", "222"})
+
+    def test_json_mode_folds_leftover_log(self):
+        system = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        system.add_book(Book("111", "A", "B", 2000, 1))
+        system.backend.wal.close()
+        LibrarySystem(data_file=TEST_FILE)
+        self.assertFalse(os.path.exists(WAL_FILE))
+        with open(TEST_FILE, encoding="utf-8") as f:
+            self.assertIn("111", json.load(f))
+
+
+class TestSqliteStorage(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+
+    def tearDown(self):
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX, DB_FILE, DB_FILE + LOCK_SUFFIX, DB_FILE + "-wal", DB_FILE + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_rows_persist_in_order(self):
+        system = LibrarySystem(data_file=DB_FILE, storage="sqlite")
+        system.add_book(Book("222", "C", "Jane  Austen", 2001, 2))
+        system.add_book(Book("111", "A", "B", 2000, 1))
+        system.update_book("222", copies=7)
+        system.close()
+        reopened = LibrarySystem(data_file=DB_FILE, storage="sqlite")
+        self.assertEqual(list(reopened.books), ["222", "111"])
+        self.assertEqual(reopened.get_book("222").copies, 7)
+        reopened.delete_book("111")
+        backend = reopened.backend
+        self.assertIsNone(backend.get("111"))
+        self.assertEqual([b["isbn"] for b in backend.find_author("jane austen")], ["222"])
+        self.assertEqual(backend.count(), 1)
+        reopened.close()
+
+    def test_migrate_list_format(self):
+        with open(TEST_FILE, "w", encoding="utf-8") as f:
+            json.dump([{"isbn": "1", "title": "T", "author": "A", "year": 1999, "copies": 3},
+                       {"isbn": "2", "title": "U", "author": "B", "year": 2005}], f)
+        main(["--migrate-from", TEST_FILE, "--storage", "sqlite", "--data-file", DB_FILE])
+        backend = SqliteBackend(DB_FILE)
+        self.assertEqual([b["isbn"] for b in backend.year_range(1990, 2010)], ["1", "2"])
+        self.assertEqual(backend.get("2")["copies"], 1)
+        backend.close({})
+
+    def test_sqlite_defaults_to_a_database_file(self):
+        self.assertEqual(parse_args(["--storage", "sqlite"]).data_file, "books.db")
+        self.assertEqual(parse_args([]).data_file, "books.json")
+        with open(TEST_FILE, "w", encoding="utf-8") as f:
+            json.dump({"1": {"isbn": "1", "title": "T", "author": "A", "year": 1999, "copies": 3}}, f)
+        with self.assertRaises(SystemExit) as raised:
+            main(["--storage", "sqlite", "--data-file", TEST_FILE])
+        self.assertIn("SQLite database", str(raised.exception.code))
+
+
+WRITER = """
+import sys
+sys.path.insert(0, {root!r})
+from LMS import LibrarySystem, Book
+system = LibrarySystem(data_file={path!r}, storage={storage!r})
+for i in range({count}):
+    system.add_book(Book("p{proc}-%d" % i, "T", "A", 2000, 1))
+system.close()
+"""
+
+
+class TestConcurrentAccess(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+
+    def tearDown(self):
+        for path in (TEST_FILE, WAL_FILE, TEST_FILE + LOCK_SUFFIX, TEST_FILE + ".corrupt"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def run_writers(self, storage, procs=4, count=20):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        children = [subprocess.Popen([sys.executable, "-c", WRITER.format(
+            root=root, path=os.path.abspath(TEST_FILE), storage=storage, count=count, proc=p)])
+            for p in range(procs)]
+        for child in children:
+            self.assertEqual(child.wait(timeout=60), 0)
+        return LibrarySystem(data_file=TEST_FILE, storage=storage)
+
+    def test_processes_do_not_lose_writes(self):
+        for storage in ("json", "wal"):
+            with self.subTest(storage=storage):
+                self.tearDown()
+                self.assertEqual(len(self.run_writers(storage).books), 80)
+
+    def test_mutation_sees_other_writers_first(self):
+        first = LibrarySystem(data_file=TEST_FILE)
+        second = LibrarySystem(data_file=TEST_FILE)
+        first.add_book(Book("111", "A", "B", 2000, 1))
+        self.assertFalse(second.add_book(Book("111", "Other", "C", 2001, 1)))
+        second.add_book(Book("222", "C", "D", 2001, 2))
+        self.assertEqual(set(LibrarySystem(data_file=TEST_FILE).books), {"111", "222"})
+
+    def test_unsynced_log_is_shared_before_unlock(self):
+        first = LibrarySystem(data_file=TEST_FILE, storage="wal", durability="none")
+        second = LibrarySystem(data_file=TEST_FILE, storage="wal", durability="none")
+        first.add_book(Book("A1", "A", "B", 2000, 1))
+        second.add_book(Book("B1", "C", "D", 2001, 2))
+        first.update_book("A1", copies=3)
+        second.compact()
+        self.assertEqual(LibrarySystem(data_file=TEST_FILE, storage="wal").get_book("A1").copies, 3)
+        first.close()
+        second.close()
+
+    def test_group_commit_batches_concurrent_writers(self):
+        system = LibrarySystem(data_file=TEST_FILE, storage="wal", group_commit=0.01)
+        other = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        other.add_book(Book("outside", "T", "A", 2000, 1))  # committed by another writer meanwhile
+
+        def writer(t):
+            for i in range(10):
+                system.add_book(Book(f"t{t}-{i}", "T", "A", 2000, 1))
+
+        threads = [threading.Thread(target=writer, args=(t,)) for t in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLess(system.committer.flushes, 80)
+        system.close()
+        reopened = LibrarySystem(data_file=TEST_FILE, storage="wal")
+        self.assertEqual(len(reopened.books), 81)
+
+    def test_corrupt_file_is_kept(self):
+        with open(TEST_FILE, "w", encoding="utf-8") as f:
+            f.write('{"111": {"isbn": "111", "tit')
+        system = LibrarySystem(data_file=TEST_FILE)
+        self.assertEqual(len(system.books), 0)
+        with open(TEST_FILE + ".corrupt", encoding="utf-8") as f:
+            self.assertIn('"tit', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
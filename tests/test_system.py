@@ -1,18 +1,21 @@
 import unittest
 import os
 from LMS import LibrarySystem, Book
+from storage import LOCK_SUFFIX
 
 TEST_FILE = "test_books.json"
 
 class TestLibrarySystem(unittest.TestCase):
     def setUp(self):
-        if os.path.exists(TEST_FILE):
-            os.remove(TEST_FILE)
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
         self.system = LibrarySystem(data_file=TEST_FILE)
 
     def tearDown(self):
-        if os.path.exists(TEST_FILE):
-            os.remove(TEST_FILE)
+        for path in (TEST_FILE, TEST_FILE + LOCK_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
 
     def test_add_get_delete(self):
         b = Book("111", "A", "B", 2000, 1)
@@ -34,5 +37,26 @@ class TestLibrarySystem(unittest.TestCase):
         self.assertEqual(b2.title, "New")
         self.assertEqual(b2.copies, 5)
 
+    def test_bad_update_changes_nothing(self):
+        self.system.add_book(Book("222", "Old", "Auth", 1990, 1))
+        self.system.list_books(sort="title")  # build the sorted index
+        self.system.search("old", ranked=True)
+        with self.assertRaises(ValueError):
+            self.system.update_book("222", title="New", year="soon")
+        self.assertEqual(self.system.get_book("222").title, "Old")
+        self.assertEqual([b.isbn for b in self.system.search("old")], ["222"])
+        self.assertEqual([b.isbn for b in self.system.search("old", ranked=True)], ["222"])
+        self.assertEqual(self.system.search("new"), [])
+        self.assertEqual([b.title for b in self.system.list_books(sort="title", page_size=5)], ["Old"])
+
+    def test_reload_if_changed(self):
+        other = LibrarySystem(data_file=TEST_FILE)
+        self.assertFalse(other.reload_if_changed())
+        self.system.add_book(Book("333", "C", "D", 2010, 1))
+        self.assertFalse(self.system.reload_if_changed())  # own write
+        self.assertTrue(other.reload_if_changed())
+        self.assertEqual(other.search("c")[0].isbn, "333")
+        self.assertFalse(other.reload_if_changed())
+
 if __name__ == "__main__":
     unittest.main()